@@ -0,0 +1,49 @@
+import argparse
+import time
+
+from src.analysis.analyzer import FocusAnalyzer
+from src.analysis.columnar import ColumnarFocusAnalyzer
+from src.core.session_table import SessionTable
+from .suite import analyzer_methods
+from .synthetic import synthetic_sessions, synthetic_tasks
+
+
+def _best(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FocusAnalyzer vs ColumnarFocusAnalyzer")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    sessions = list(synthetic_sessions(args.sessions, synthetic_tasks(1000)))
+    table = SessionTable.from_sessions(sessions)
+    loop = FocusAnalyzer(sessions)
+    columnar = ColumnarFocusAnalyzer.from_table(table)
+
+    print(f"{args.sessions} sessions ({loop.work_session_count} work)")
+    print(f"{'build':<28} {_best(lambda: FocusAnalyzer(sessions), args.repeat):10.4f} s "
+          f"{_best(lambda: ColumnarFocusAnalyzer.from_table(table), args.repeat):10.4f} s")
+
+    total_loop = total_columnar = 0.0
+    for method in analyzer_methods():
+        expected = getattr(loop, method)()
+        assert getattr(columnar, method)() == expected, method
+        t_loop = _best(getattr(loop, method), args.repeat)
+        t_columnar = _best(getattr(columnar, method), args.repeat)
+        total_loop += t_loop
+        total_columnar += t_columnar
+        print(f"{method:<28} {t_loop:10.4f} s {t_columnar:10.4f} s {t_loop / t_columnar:8.1f}x")
+    print(f"{'all methods':<28} {total_loop:10.4f} s {total_columnar:10.4f} s "
+          f"{total_loop / total_columnar:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
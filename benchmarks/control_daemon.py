@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+
+from benchmarks.synthetic import synthetic_sessions, synthetic_tasks, write_session_log, write_task_file
+from src.cli.rpc import MAX_MESSAGE, encode, format_address, parse_address
+
+# (method, params) cycled through by every client.
+MIX = [
+    ("timer.status", {}),
+    ("timer.status", {}),
+    ("tasks.list", {}),
+    ("sessions.list", {"limit": 10}),
+    ("sessions.count", {}),
+]
+
+
+class PipelinedClient:
+    # Keeps up to `depth` requests in flight on one connection and matches
+    # responses by id.
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.notifications = 0
+        self._ids = count(1)
+        self._reading = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def open(cls, address):
+        if isinstance(address, tuple):
+            reader, writer = await asyncio.open_connection(address[0], address[1], limit=MAX_MESSAGE)
+        else:
+            reader, writer = await asyncio.open_unix_connection(str(address), limit=MAX_MESSAGE)
+        return cls(reader, writer)
+
+    def call(self, method: str, params: dict) -> asyncio.Future:
+        request_id = next(self._ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(encode({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        return future
+
+    async def close(self):
+        self.writer.close()
+        self._reading.cancel()
+
+    async def _read(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "id" not in message:
+                self.notifications += 1
+                continue
+            future = self.pending.pop(message["id"])
+            if "error" in message:
+                future.set_exception(RuntimeError(message["error"]["message"]))
+            else:
+                future.set_result(message["result"])
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("connection closed"))
+
+
+async def run_client(address, seconds: float, depth: int, latencies: list, errors: list):
+    client = await PipelinedClient.open(address)
+    deadline = time.perf_counter() + seconds
+    requests = count()
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            method, params = MIX[next(requests) % len(MIX)]
+            started = time.perf_counter()
+            try:
+                await client.call(method, params)
+            except (RuntimeError, ConnectionError) as e:
+                errors.append(str(e))
+                return
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(depth)))
+    await client.close()
+
+
+async def run_subscriber(address, stop: asyncio.Event) -> int:
+    client = await PipelinedClient.open(address)
+    await client.call("subscribe", {})
+    await stop.wait()
+    await client.close()
+    return client.notifications
+
+
+async def run_load(address, clients: int, depth: int, seconds: float, subscribers: int) -> dict:
+    stop = asyncio.Event()
+    watching = [asyncio.ensure_future(run_subscriber(address, stop)) for _ in range(subscribers)]
+    # Something for the subscribers to watch.
+    control = await PipelinedClient.open(address)
+    await control.call("timer.start", {})
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(address, seconds, depth, latencies, errors) for _ in range(clients)))
+    wall = time.perf_counter() - started
+    stop.set()
+    notifications = sum(await asyncio.gather(*watching))
+    await control.call("timer.reset", {})
+    await control.close()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "wall": wall,
+        "p50": percentile(0.50),
+        "p99": percentile(0.99),
+        "max": latencies[-1] * 1000 if latencies else 0.0,
+        "errors": len(errors),
+        "notifications": notifications,
+    }
+
+
+def start_daemon(data_dir: Path, address) -> subprocess.Popen:
+    # A daemon of our own on a scratch data directory, so the numbers do
+    # not depend on (or change) the real history.
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.cli.daemon", "--data-dir", str(data_dir), "--listen", format_address(address)],
+        stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("Listening on"):
+        process.kill()
+        raise RuntimeError(f"daemon did not start: {line}{process.stderr.read()}")
+    return process
+
+
+def seed(data_dir: Path, sessions: int):
+    tasks = synthetic_tasks(20)
+    write_task_file(data_dir / "tasks.json", tasks)
+    write_session_log(data_dir / "sessions.jsonl", synthetic_sessions(sessions, tasks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Requests per second and latency of the control daemon")
+    parser.add_argument("--address", type=parse_address,
+                        help="measure an already running daemon (socket path or host:port)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--depth", type=int, default=4, help="requests in flight per connection")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--subscribers", type=int, default=8, help="extra connections watching all events")
+    parser.add_argument("--sessions", type=int, default=10_000, help="history size for the daemon we start")
+    parser.add_argument("--tcp", action="store_true", help="start our daemon on a loopback port")
+    args = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as scratch:
+        address = args.address
+        if address is None:
+            data_dir = Path(scratch)
+            seed(data_dir, args.sessions)
+            if args.tcp or not hasattr(socket, "AF_UNIX"):
+                address = ("127.0.0.1", _free_port())
+            else:
+                address = data_dir / "control.sock"
+            process = start_daemon(data_dir, address)
+        try:
+            r = asyncio.run(run_load(address, args.clients, args.depth, args.seconds, args.subscribers))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(f"{format_address(address)}: {args.clients} clients x {args.depth} in flight, "
+          f"{args.subscribers} subscribers, {r['wall']:.1f} s")
+    print(f"{'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'events':>7}")
+    print(f"{r['requests'] / r['wall']:>11.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['max']:>8.2f} "
+          f"{r['errors']:>7} {r['notifications']:>7}")
+    return 1 if r["errors"] else 0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from src.analysis.aggregates import FocusAggregates, check_consistency
+from src.analysis.parallel import aggregate_log
+from src.data.storage import SessionStorage
+from .synthetic import synthetic_sessions, synthetic_tasks, write_session_log
+
+
+def _best(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process-pool analysis scaling across cores")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--workers", default=None,
+                        help="comma-separated worker counts (default: 1,2,4,... up to the core count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="pomodoro-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    log_path = workdir / f"sessions-{args.sessions}.jsonl"
+    write_session_log(log_path, synthetic_sessions(args.sessions, synthetic_tasks(1000)))
+    print(f"{args.sessions} sessions, {log_path.stat().st_size / 2**20:.1f} MiB, {os.cpu_count()} cores")
+
+    storage = SessionStorage(log_path)
+    sequential, expected = _best(lambda: FocusAggregates.from_sessions(storage.iter_sessions()), args.repeat)
+    print(f"{'sequential iter_sessions':<26} {sequential:8.3f} s")
+
+    for workers in counts:
+        seconds, result = _best(lambda: aggregate_log(log_path, workers), args.repeat)
+        assert not check_consistency(result, expected), workers
+        assert result.tasks.to_dict() == expected.tasks.to_dict(), workers
+        print(f"{f'aggregate_log workers={workers}':<26} {seconds:8.3f} s {sequential / seconds:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.core.session import SessionData
+from src.core.session_table import SessionTable
+from .synthetic import synthetic_records
+
+
+def measure(label: str, build):
+    # Timed and traced in separate runs: tracemalloc slows allocation-heavy
+    # code by several times and would distort the timing.
+    gc.collect()
+    t0 = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - t0
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:8.2f} s  {current / 2**20:10.1f} MiB retained  {peak / 2**20:10.1f} MiB peak")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare SessionData lists with SessionTable")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    records = list(synthetic_records(args.sessions))
+    print(f"{args.sessions} sessions")
+    sessions = measure("List[SessionData].from_dict", lambda: [SessionData.from_dict(r) for r in records])
+    del sessions
+    table = measure("SessionTable.from_dicts", lambda: SessionTable.from_dicts(records))
+    print(f"SessionTable column bytes: {table.nbytes() / 2**20:.1f} MiB")
+    assert table[len(table) - 1].to_dict() == records[-1]
+
+
+if __name__ == "__main__":
+    main()
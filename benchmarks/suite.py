@@ -0,0 +1,237 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.analysis.aggregates import FocusAggregates
+from src.analysis.analyzer import FocusAnalyzer
+from src.analysis.suggestions import SuggestionGenerator
+from src.data.storage import SessionStorage
+from src.data.task_storage import TaskStorage
+from .synthetic import synthetic_sessions, synthetic_tasks, write_session_log, write_task_file
+
+TIERS = {
+    "1k": {"sessions": 1_000, "tasks": 100},
+    "100k": {"sessions": 100_000, "tasks": 10_000},
+    "1m": {"sessions": 1_000_000, "tasks": 20_000},
+}
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def analyzer_methods(cls=FocusAnalyzer) -> List[str]:
+    # Every public analysis entry point, so new FocusAnalyzer methods are
+    # picked up without touching the suite.
+    return sorted(name for name in dir(cls)
+                  if name.startswith(("analyze_", "calculate_")) and callable(getattr(cls, name)))
+
+
+def _measure(name: str, tier: str, fn: Callable, ops: int = 1, repeat: int = 3,
+             trace_memory: bool = True) -> Dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "name": name,
+        "tier": tier,
+        "ops": ops,
+        "seconds": best,
+        "per_op_seconds": best / ops,
+        "peak_bytes": peak,
+    }
+
+
+def run_tier(tier: str, workdir: Path, repeat: int = 3, trace_memory: bool = True) -> List[Dict]:
+    sizes = TIERS[tier]
+    workdir.mkdir(parents=True, exist_ok=True)
+    sessions_path = workdir / f"sessions-{tier}.jsonl"
+    tasks_path = workdir / f"tasks-{tier}.json"
+
+    tasks = synthetic_tasks(sizes["tasks"])
+    write_task_file(tasks_path, tasks)
+    write_session_log(sessions_path, synthetic_sessions(sizes["sessions"], tasks))
+
+    storage = SessionStorage(sessions_path)
+    task_storage = TaskStorage(tasks_path)
+    results = []
+
+    sample = next(synthetic_sessions(1, tasks, seed=1))
+    appends = 200
+
+    def save_sessions():
+        for _ in range(appends):
+            storage.save_session(sample)
+
+    def truncate_appends():
+        # Keep the history size fixed between repeats.
+        with open(sessions_path, 'rb+') as f:
+            f.truncate(base_size)
+
+    base_size = sessions_path.stat().st_size
+    results.append(_measure("save_session", tier, lambda: (save_sessions(), truncate_appends()),
+                            ops=appends, repeat=repeat, trace_memory=trace_memory))
+    results.append(_measure("load_sessions", tier, storage.load_sessions,
+                            repeat=repeat, trace_memory=trace_memory))
+    results.append(_measure("iter_sessions_tail_10", tier,
+                            lambda: list(storage.iter_sessions(reverse=True, limit=10)),
+                            repeat=repeat, trace_memory=trace_memory))
+
+    lookups = [t.task_id for t in tasks[::max(1, len(tasks) // 100)]]
+    task_storage.get_task(lookups[0])
+    results.append(_measure("get_task", tier, lambda: [task_storage.get_task(i) for i in lookups],
+                            ops=len(lookups), repeat=repeat, trace_memory=trace_memory))
+    updated = task_storage.get_task(lookups[-1])
+    results.append(_measure("save_task", tier, lambda: task_storage.save_task(updated),
+                            repeat=repeat, trace_memory=trace_memory))
+    results.append(_measure("load_tasks", tier, task_storage.load_tasks,
+                            repeat=repeat, trace_memory=trace_memory))
+
+    sessions = storage.load_sessions()
+    results.append(_measure("FocusAnalyzer.__init__", tier, lambda: FocusAnalyzer(sessions),
+                            repeat=repeat, trace_memory=trace_memory))
+    analyzer = FocusAnalyzer(sessions)
+    for method in analyzer_methods():
+        results.append(_measure(f"FocusAnalyzer.{method}", tier, getattr(analyzer, method),
+                                repeat=repeat, trace_memory=trace_memory))
+    generator = SuggestionGenerator(analyzer)
+    for method in ("generate_insights", "generate_recommendations"):
+        results.append(_measure(f"SuggestionGenerator.{method}", tier, getattr(generator, method),
+                                repeat=repeat, trace_memory=trace_memory))
+
+    results.append(_measure("FocusAggregates.from_sessions", tier, lambda: FocusAggregates.from_sessions(sessions),
+                            repeat=repeat, trace_memory=trace_memory))
+    aggregates = FocusAggregates.from_sessions(sessions)
+    for method in analyzer_methods(FocusAggregates):
+        results.append(_measure(f"FocusAggregates.{method}", tier, getattr(aggregates, method),
+                                repeat=repeat, trace_memory=trace_memory))
+
+    try:
+        from src.analysis.columnar import ColumnarFocusAnalyzer
+    except ImportError:
+        ColumnarFocusAnalyzer = None
+    if ColumnarFocusAnalyzer is not None:
+        results.append(_measure("load_table", tier, storage.load_table,
+                                repeat=repeat, trace_memory=trace_memory))
+        table = storage.load_table()
+        results.append(_measure("ColumnarFocusAnalyzer.from_table", tier,
+                                lambda: ColumnarFocusAnalyzer.from_table(table),
+                                repeat=repeat, trace_memory=trace_memory))
+        columnar = ColumnarFocusAnalyzer.from_table(table)
+        for method in analyzer_methods():
+            results.append(_measure(f"ColumnarFocusAnalyzer.{method}", tier, getattr(columnar, method),
+                                    repeat=repeat, trace_memory=trace_memory))
+
+    for r in results:
+        r["sessions"] = sizes["sessions"]
+        r["tasks"] = sizes["tasks"]
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(tiers: List[str], workdir: Path, repeat: int = 3, trace_memory: bool = True) -> Dict:
+    results = []
+    for tier in tiers:
+        results.extend(run_tier(tier, workdir, repeat=repeat, trace_memory=trace_memory))
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def write_results(report: Dict, path: Optional[Path] = None) -> Path:
+    if path is None:
+        path = RESULTS_DIR / f"{report['revision'] or 'working-tree'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare_results(baseline: Dict, current: Dict, tolerance: float = 0.25) -> List[Dict]:
+    # A benchmark regresses when it is more than `tolerance` slower than the
+    # baseline run for the same name and tier.
+    previous = {(r["name"], r["tier"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = previous.get((r["name"], r["tier"]))
+        if old is None or old["seconds"] <= 0:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append({"name": r["name"], "tier": r["tier"], "baseline": old["seconds"],
+                                "current": r["seconds"], "ratio": ratio})
+    return regressions
+
+
+def _print_report(report: Dict):
+    for r in report["results"]:
+        peak = f"{r['peak_bytes'] / 2**20:9.2f} MiB" if r["peak_bytes"] is not None else "        -"
+        print(f"{r['tier']:>5} {r['name']:<42} {r['per_op_seconds'] * 1000:12.4f} ms/op {peak}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Storage and analysis benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    run.add_argument("--tiers", default="1k,100k", help=f"comma-separated subset of {','.join(TIERS)}")
+    run.add_argument("--workdir", type=Path, default=Path("bench_data"))
+    run.add_argument("--output", type=Path)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--no-memory", action="store_true")
+
+    compare = sub.add_parser("compare")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("current", type=Path)
+    compare.add_argument("--tolerance", type=float, default=0.25)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run_suite(args.tiers.split(","), args.workdir, args.repeat, not args.no_memory)
+        _print_report(report)
+        print(f"results written to {write_results(report, args.output)}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r['tier']} {r['name']}: {r['baseline']:.6f}s -> {r['current']:.6f}s "
+              f"({r['ratio']:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List
+
+from src.core.session import SessionData
+from src.core.task import Task
+from src.data.migrations import SCHEMA_VERSION, SESSION_LOG_HEADER, encode_session_line
+
+SESSIONS_BEFORE_LONG_BREAK = 4
+PLANNED = {"work": 1500, "short_break": 300, "long_break": 900}
+
+
+def synthetic_tasks(count: int, seed: int = 0) -> List[Task]:
+    rng = random.Random(seed)
+    created = datetime(2020, 1, 1, 9)
+    tasks = []
+    for i in range(count):
+        created += timedelta(minutes=rng.randint(1, 600))
+        task = Task(
+            task_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            name=f"Task {i}",
+            target_seconds=rng.choice((30, 60, 120, 240)) * 60,
+            created_at=created,
+        )
+        if rng.random() < 0.3:
+            task.is_completed = True
+            task.completed_at = created + timedelta(days=rng.randint(1, 30))
+        tasks.append(task)
+    return tasks
+
+
+def synthetic_sessions(count: int, tasks: List[Task] = None, seed: int = 0) -> Iterator[SessionData]:
+    # Workdays of work/break cycles between 08:00 and 20:00. Completion odds
+    # drop in the afternoon, on Fridays and with every pause, so the
+    # analyzers have real patterns to find.
+    rng = random.Random(seed)
+    day = datetime(2020, 1, 6)
+    clock = day.replace(hour=8)
+    phase = "work"
+    work_done = 0
+    for _ in range(count):
+        if clock.hour >= 20:
+            day += timedelta(days=rng.choice((1, 1, 1, 2)))
+            clock = day.replace(hour=rng.randint(7, 10), minute=rng.randint(0, 59))
+            phase = "work"
+            work_done = 0
+
+        planned = PLANNED[phase]
+        pauses = min(rng.expovariate(1.2), 8)
+        pause_count = int(pauses) if phase == "work" else 0
+        odds = 0.85 - 0.04 * pause_count - (0.1 if clock.hour >= 14 else 0) - (0.1 if clock.weekday() == 4 else 0)
+        completed = rng.random() < odds
+        actual = planned if completed else rng.randint(30, planned - 1)
+
+        task = None
+        if phase == "work" and tasks:
+            task = tasks[rng.randrange(len(tasks))]
+
+        start = clock + timedelta(microseconds=rng.randint(0, 999999))
+        yield SessionData(
+            session_type=phase,
+            start_time=start,
+            end_time=start + timedelta(seconds=actual + pause_count * rng.randint(10, 120)),
+            planned_duration=planned,
+            actual_duration=actual,
+            pause_count=pause_count,
+            was_skipped=not completed,
+            was_completed=completed,
+            task_id=task.task_id if task else None,
+            task_name=task.name if task else None,
+        )
+
+        clock = start + timedelta(seconds=actual + rng.randint(5, 600))
+        if phase == "work":
+            work_done += 1
+            phase = "long_break" if work_done % SESSIONS_BEFORE_LONG_BREAK == 0 else "short_break"
+        else:
+            phase = "work"
+
+
+def synthetic_records(count: int, seed: int = 0) -> Iterator[dict]:
+    tasks = synthetic_tasks(200, seed)
+    for session in synthetic_sessions(count, tasks, seed):
+        yield session.to_dict()
+
+
+def write_session_log(path: Path, sessions) -> int:
+    # Writes the JSON Lines format used by SessionStorage in one pass, which
+    # is far faster than calling save_session once per record.
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(SESSION_LOG_HEADER)
+        for session in sessions:
+            f.write(encode_session_line(session.to_dict()))
+            count += 1
+    return count
+
+
+def write_task_file(path: Path, tasks: List[Task]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"version": SCHEMA_VERSION, "tasks": [t.to_dict() for t in tasks]},
+                  f, indent=2, ensure_ascii=False)
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import time
+
+from src.core.config import PomodoroConfig
+from src.core.timer_engine import TimerEngine
+
+
+async def run_scenario(timers: int, seconds: float, visible: bool, minutes: int, coalesce: float) -> dict:
+    # `timers` state machines on one loop, started evenly over the first
+    # second and restarted when a phase ends, like a team service would.
+    loop = asyncio.get_running_loop()
+    engine = TimerEngine(loop, coalesce=coalesce)
+    config = PomodoroConfig(work_duration=minutes, short_break=minutes, long_break=minutes)
+    counts = {"updates": 0, "sessions": 0}
+
+    def on_update(_):
+        counts["updates"] += 1
+
+    for i in range(timers):
+        machine = engine.create_timer(config)
+        machine.set_display_visible(visible)
+        machine.time_updated.connect(on_update)
+
+        def on_session(_, machine=machine):
+            counts["sessions"] += 1
+            loop.call_soon(machine.start)
+        machine.session_completed.connect(on_session)
+        loop.call_later(i / timers, machine.start)
+
+    await asyncio.sleep(1.0)
+    wakeups, dispatched, updates = engine.wakeups, engine.scheduler.dispatched, counts["updates"]
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(seconds)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    result = {
+        "cpu": cpu,
+        "wall": wall,
+        "wakeups": engine.wakeups - wakeups,
+        "dispatched": engine.scheduler.dispatched - dispatched,
+        "updates": counts["updates"] - updates,
+        "sessions": counts["sessions"],
+    }
+    engine.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU cost of many concurrent TimerEngine timers")
+    parser.add_argument("--timers", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured run per scenario")
+    parser.add_argument("--minutes", type=int, default=1, help="length of every phase")
+    parser.add_argument("--coalesce", type=float, default=0.05,
+                        help="seconds the shared wakeup may be late to batch timers")
+    args = parser.parse_args(argv)
+
+    print(f"{args.timers} timers, {args.seconds:g} s per scenario, {args.minutes} min phases")
+    print(f"{'scenario':<20} {'cpu %':>7} {'us/timer/s':>11} {'wakeups/s':>10} {'timer wakes/s':>14} "
+          f"{'updates/s':>10} {'sessions':>9}")
+    scenarios = [("visible", True, 0.0), ("hidden", False, 0.0)]
+    if args.coalesce > 0:
+        scenarios.append((f"visible, {args.coalesce * 1000:g} ms batch", True, args.coalesce))
+    for name, visible, coalesce in scenarios:
+        r = asyncio.run(run_scenario(args.timers, args.seconds, visible, args.minutes, coalesce))
+        per_timer = r["cpu"] / r["wall"] / args.timers * 1e6
+        print(f"{name:<20} {r['cpu'] / r['wall'] * 100:>6.1f}% {per_timer:>11.2f} "
+              f"{r['wakeups'] / r['wall']:>10.0f} {r['dispatched'] / r['wall']:>14.0f} "
+              f"{r['updates'] / r['wall']:>10.0f} {r['sessions']:>9}")
+
+
+if __name__ == "__main__":
+    main()
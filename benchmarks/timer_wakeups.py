@@ -0,0 +1,88 @@
+import argparse
+import time
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from src.core.config import PomodoroConfig
+from src.core.timer import PomodoroTimer, qt_scheduler
+
+
+class CountdownTimer:
+    # The previous PomodoroTimer: a 1 s repeating QTimer that decrements a
+    # counter, kept here as the baseline.
+    def __init__(self, seconds: int):
+        self.remaining = seconds
+        self.wakeups = 0
+        self.completed_at = None
+        self.timer = QTimer()
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.timer.start(1000)
+
+    def _tick(self):
+        self.wakeups += 1
+        if self.remaining > 0:
+            self.remaining -= 1
+        else:
+            self.timer.stop()
+            self.completed_at = time.monotonic()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timer wakeups and completion error under event-loop stalls")
+    parser.add_argument("--minutes", type=int, default=1)
+    parser.add_argument("--stall-every", type=float, default=7.0, help="seconds between stalls (0: none)")
+    parser.add_argument("--stall", type=float, default=1.3, help="length of each stall in seconds")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    seconds = args.minutes * 60
+    results = {}
+
+    def deadline_timer(name: str, visible: bool) -> PomodoroTimer:
+        # A scheduler each, so wakeups are counted per timer.
+        timer = PomodoroTimer(PomodoroConfig(work_duration=args.minutes), scheduler=qt_scheduler())
+        timer.set_display_visible(visible)
+        counts = results[name] = {"updates": 0, "scheduler": timer.scheduler}
+        timer.time_updated.connect(lambda _: counts.__setitem__("updates", counts["updates"] + 1))
+
+        def completed(session):
+            counts["completed_at"] = time.monotonic()
+            counts["recorded"] = (session.end_time - session.start_time).total_seconds()
+        timer.session_completed.connect(completed)
+        return timer
+
+    visible = deadline_timer("deadline, visible", True)
+    hidden = deadline_timer("deadline, hidden", False)
+    baseline = CountdownTimer(seconds)
+
+    stalls = QTimer()
+    stalls.timeout.connect(lambda: time.sleep(args.stall))
+    if args.stall_every > 0:
+        stalls.start(int(args.stall_every * 1000))
+
+    started = time.monotonic()
+    for timer in (visible, hidden, baseline):
+        timer.start()
+
+    def check():
+        if baseline.completed_at is not None and all("completed_at" in r for r in results.values()):
+            app.quit()
+    poll = QTimer()
+    poll.timeout.connect(check)
+    poll.start(100)
+    app.exec()
+
+    print(f"{seconds} s session, {args.stall:.1f} s stall every {args.stall_every:.1f} s")
+    print(f"{'timer':<20} {'wakeups':>8} {'updates':>8} {'fired late':>11} {'recorded error':>15}")
+    for name, r in results.items():
+        late = r["completed_at"] - started - seconds
+        error = r["recorded"] - seconds
+        print(f"{name:<20} {r['scheduler'].wakeups:>8} {r['updates']:>8} {late:>10.3f}s {error:>14.3f}s")
+    late = baseline.completed_at - started - seconds
+    print(f"{'countdown (before)':<20} {baseline.wakeups:>8} {baseline.wakeups - 1:>8} {late:>10.3f}s {late:>14.3f}s")
+
+
+if __name__ == "__main__":
+    main()
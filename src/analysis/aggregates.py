@@ -0,0 +1,463 @@
+import copy
+import json
+import logging
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+from ..core.session import SessionData
+from .daily import ROLLING_WINDOWS, DayBuckets
+from .sketch import QuantileSketch, merged, sketches_from_dict, sketches_to_dict
+from .task_stats import TaskStatsIndex
+from ..data.writer import PersistenceWriter, atomic_write
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_VERSION = 5
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class FocusAggregates:
+    # Running counters behind every FocusAnalyzer metric. add() is O(1) per
+    # session and the analysis methods only touch the small per-hour/weekday/
+    # bucket tables, so results cost the same for 10 or 10 million sessions.
+    # Keys are kept in first-appearance order, which keeps dict order and
+    # max()/min() tie-breaking identical to FocusAnalyzer.
+    def __init__(self):
+        self.session_count = 0
+        self.work_count = 0
+        self.completed_count = 0
+        self.duration_sum = 0
+        self.pause_sum = 0
+        self.paused_count = 0
+        self.paused_completed = 0
+        # hour -> [total, completed, skipped]
+        self.hours: Dict[int, List[int]] = {}
+        # weekday -> [total, completed]
+        self.weekdays: Dict[int, List[int]] = {}
+        # planned duration rounded down to 5 minutes -> [total, completed]
+        self.duration_buckets: Dict[int, List[int]] = {}
+        self.tasks = TaskStatsIndex()
+        self.days = DayBuckets()
+        # Quantile sketches of actual_duration and pause_count per hour and
+        # per weekday; bounded size whatever the history length.
+        self.hour_durations: Dict[int, QuantileSketch] = {}
+        self.hour_pauses: Dict[int, QuantileSketch] = {}
+        self.weekday_durations: Dict[int, QuantileSketch] = {}
+        self.weekday_pauses: Dict[int, QuantileSketch] = {}
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[SessionData]) -> 'FocusAggregates':
+        aggregates = cls()
+        for session in sessions:
+            aggregates.add(session)
+        return aggregates
+
+    @property
+    def work_session_count(self) -> int:
+        return self.work_count
+
+    def add(self, session: SessionData):
+        self.session_count += 1
+        if session.session_type == "work":
+            self._add_work(session.start_time, session.planned_duration, session.actual_duration,
+                           session.pause_count, session.was_completed, session.was_skipped)
+            if session.task_id is not None:
+                self.tasks.add(session.task_id, session.actual_duration, session.pause_count,
+                               session.was_completed, session.end_time or session.start_time)
+
+    def add_record(self, record: dict):
+        # Same as add(SessionData.from_dict(record)) without building the
+        # dataclass; only the start time needs parsing.
+        self.session_count += 1
+        if record["session_type"] == "work":
+            start_time = datetime.fromisoformat(record["start_time"])
+            self._add_work(start_time, record.get("planned_duration", 0),
+                           record.get("actual_duration", 0), record.get("pause_count", 0),
+                           record.get("was_completed", False), record.get("was_skipped", False))
+            if record.get("task_id") is not None:
+                end_time = record.get("end_time")
+                self.tasks.add(record["task_id"], record.get("actual_duration", 0),
+                               record.get("pause_count", 0), record.get("was_completed", False),
+                               datetime.fromisoformat(end_time) if end_time else start_time)
+
+    def _add_work(self, start_time: datetime, planned_duration: int, actual_duration: int,
+                  pause_count: int, was_completed: bool, was_skipped: bool):
+        completed = 1 if was_completed else 0
+        self.work_count += 1
+        self.completed_count += completed
+        self.duration_sum += actual_duration
+        self.pause_sum += pause_count
+        if pause_count > 0:
+            self.paused_count += 1
+            self.paused_completed += completed
+
+        hour_key = start_time.hour
+        hour = self.hours.get(hour_key)
+        if hour is None:
+            hour = self.hours[hour_key] = [0, 0, 0]
+            self.hour_durations[hour_key] = QuantileSketch()
+            self.hour_pauses[hour_key] = QuantileSketch()
+        hour[0] += 1
+        hour[1] += completed
+        if not completed and was_skipped:
+            hour[2] += 1
+        self.hour_durations[hour_key].add(actual_duration)
+        self.hour_pauses[hour_key].add(pause_count)
+
+        weekday_key = start_time.weekday()
+        weekday = self.weekdays.get(weekday_key)
+        if weekday is None:
+            weekday = self.weekdays[weekday_key] = [0, 0]
+            self.weekday_durations[weekday_key] = QuantileSketch()
+            self.weekday_pauses[weekday_key] = QuantileSketch()
+        weekday[0] += 1
+        weekday[1] += completed
+        self.weekday_durations[weekday_key].add(actual_duration)
+        self.weekday_pauses[weekday_key].add(pause_count)
+
+        bucket = self.duration_buckets.setdefault((planned_duration // 300) * 300, [0, 0])
+        bucket[0] += 1
+        bucket[1] += completed
+
+        self.days.add(start_time.date(), actual_duration, was_completed)
+
+    def merge(self, other: 'FocusAggregates'):
+        # Merging partial aggregates in chronological order gives the same
+        # counters as adding every session to one instance; the quantile
+        # sketches stay within their usual error bound.
+        self.session_count += other.session_count
+        self.work_count += other.work_count
+        self.completed_count += other.completed_count
+        self.duration_sum += other.duration_sum
+        self.pause_sum += other.pause_sum
+        self.paused_count += other.paused_count
+        self.paused_completed += other.paused_completed
+        for mine, theirs in ((self.hours, other.hours), (self.weekdays, other.weekdays),
+                             (self.duration_buckets, other.duration_buckets)):
+            for key, counts in theirs.items():
+                target = mine.setdefault(key, [0] * len(counts))
+                for i, value in enumerate(counts):
+                    target[i] += value
+        self.tasks.merge(other.tasks)
+        self.days.merge(other.days)
+        for mine, theirs in ((self.hour_durations, other.hour_durations), (self.hour_pauses, other.hour_pauses),
+                             (self.weekday_durations, other.weekday_durations),
+                             (self.weekday_pauses, other.weekday_pauses)):
+            for key, sketch in theirs.items():
+                mine.setdefault(key, QuantileSketch(sketch.k)).merge(sketch)
+
+    def to_dict(self) -> dict:
+        return {
+            "session_count": self.session_count,
+            "work_count": self.work_count,
+            "completed_count": self.completed_count,
+            "duration_sum": self.duration_sum,
+            "pause_sum": self.pause_sum,
+            "paused_count": self.paused_count,
+            "paused_completed": self.paused_completed,
+            # JSON object keys are strings; lists of pairs keep the ints.
+            "hours": [[k, list(v)] for k, v in self.hours.items()],
+            "weekdays": [[k, list(v)] for k, v in self.weekdays.items()],
+            "duration_buckets": [[k, list(v)] for k, v in self.duration_buckets.items()],
+            "tasks": self.tasks.to_dict(),
+            "days": self.days.to_dict(),
+            "hour_durations": sketches_to_dict(self.hour_durations),
+            "hour_pauses": sketches_to_dict(self.hour_pauses),
+            "weekday_durations": sketches_to_dict(self.weekday_durations),
+            "weekday_pauses": sketches_to_dict(self.weekday_pauses),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'FocusAggregates':
+        aggregates = cls()
+        for name in ("session_count", "work_count", "completed_count", "duration_sum",
+                     "pause_sum", "paused_count", "paused_completed"):
+            setattr(aggregates, name, int(data[name]))
+        aggregates.hours = {int(k): [int(n) for n in v] for k, v in data["hours"]}
+        aggregates.weekdays = {int(k): [int(n) for n in v] for k, v in data["weekdays"]}
+        aggregates.duration_buckets = {int(k): [int(n) for n in v] for k, v in data["duration_buckets"]}
+        aggregates.tasks = TaskStatsIndex.from_dict(data["tasks"])
+        aggregates.days = DayBuckets.from_dict(data["days"])
+        aggregates.hour_durations = sketches_from_dict(data["hour_durations"])
+        aggregates.hour_pauses = sketches_from_dict(data["hour_pauses"])
+        aggregates.weekday_durations = sketches_from_dict(data["weekday_durations"])
+        aggregates.weekday_pauses = sketches_from_dict(data["weekday_pauses"])
+        return aggregates
+
+    def analyze_time_of_day(self) -> Dict:
+        hour_stats = {h: {"total": t, "completed": c, "skipped": s} for h, (t, c, s) in self.hours.items()}
+        completion_rates = {h: c / t for h, (t, c, _) in self.hours.items() if t > 0}
+
+        return {
+            "hour_stats": hour_stats,
+            "completion_rates": completion_rates,
+            "best_hour": max(completion_rates.items(), key=lambda x: x[1])[0] if completion_rates else None
+        }
+
+    def analyze_duration_patterns(self) -> Dict:
+        if not self.work_count:
+            return {"average_duration": 0, "completion_rate_by_duration": {}}
+
+        return {
+            "average_duration": _mean(self.duration_sum, self.work_count),
+            "completion_rate_by_duration": {d: c / t for d, (t, c) in self.duration_buckets.items() if t > 0}
+        }
+
+    def calculate_completion_rate(self) -> float:
+        if not self.work_count:
+            return 0.0
+        return self.completed_count / self.work_count
+
+    def analyze_weekly_pattern(self) -> Dict:
+        return {
+            "weekday_stats": {d: {"total": t, "completed": c} for d, (t, c) in self.weekdays.items()},
+            "completion_by_weekday": {d: c / t for d, (t, c) in self.weekdays.items() if t > 0}
+        }
+
+    def analyze_pause_patterns(self) -> Dict:
+        if not self.work_count:
+            return {"average_pauses": 0, "pause_impact": 0}
+
+        no_pause_count = self.work_count - self.paused_count
+        no_pause_completed = self.completed_count - self.paused_completed
+        paused_completion = self.paused_completed / self.paused_count if self.paused_count else 0
+        no_pause_completion = no_pause_completed / no_pause_count if no_pause_count else 0
+
+        return {
+            "average_pauses": _mean(self.pause_sum, self.work_count),
+            "paused_completion_rate": paused_completion,
+            "no_pause_completion_rate": no_pause_completion,
+            "pause_impact": no_pause_completion - paused_completion
+        }
+
+    def analyze_rolling_windows(self, windows: Sequence[int] = ROLLING_WINDOWS,
+                                today: Optional[date] = None) -> Dict:
+        return self.days.rolling_windows(windows, today)
+
+    def analyze_quantiles(self, quantiles=QUANTILES) -> Dict:
+        # Approximate (KLL) percentiles of work session length in seconds and
+        # of pauses, overall and per hour/weekday, keyed "p50", "p90", ...
+        def summary(durations: QuantileSketch, pauses: QuantileSketch) -> Dict:
+            return {
+                "duration": {_label(q): durations.quantile(q) for q in quantiles},
+                "pauses": {_label(q): pauses.quantile(q) for q in quantiles},
+            }
+
+        return {
+            "overall": summary(merged(self.hour_durations.values()), merged(self.hour_pauses.values())),
+            "by_hour": {h: summary(self.hour_durations[h], self.hour_pauses[h]) for h in self.hours},
+            "by_weekday": {d: summary(self.weekday_durations[d], self.weekday_pauses[d]) for d in self.weekdays},
+        }
+
+
+class AggregateStore:
+    # Keeps FocusAggregates in sync with a session storage and snapshots them
+    # to a small JSON file next to the session log. The aggregates cover the
+    # log up to a position (a byte offset, or a row id with SQLite), which
+    # the snapshot records together with a check of the log at that point:
+    # catching up folds in exactly the sessions saved after it, by this
+    # process or any other (a crash between the two writes, the control
+    # daemon), and a log rewritten before it (cleared history) triggers a
+    # rebuild. Loading is deferred to first use so startup never waits on
+    # the log, and may run on a worker thread: sync() never blocks on it, it
+    # only flags that the load has to catch up with the log once more.
+    def __init__(self, storage, snapshot_path: Path = None, writer: Optional[PersistenceWriter] = None,
+                 workers: int = 1):
+        if snapshot_path is None:
+            snapshot_path = Path(__file__).parent.parent / 'data' / 'analytics.json'
+        self.storage = storage
+        # Worker processes for rebuilding from a JSON Lines log; 0 = per core.
+        self.workers = workers
+        self.snapshot_path = snapshot_path
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        self.writer = writer
+        self._aggregates: Optional[FocusAggregates] = None
+        self._position = None
+        self._check = None
+        self._missed = False
+        # _lock guards the published aggregates and is only held briefly;
+        # _load_lock serializes the (possibly long) loads themselves.
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self) -> FocusAggregates:
+        return self._load(rebuild=False)
+
+    def rebuild(self) -> FocusAggregates:
+        with self._lock:
+            self._aggregates = None
+        return self._load(rebuild=True)
+
+    def snapshot(self) -> FocusAggregates:
+        # An independent copy, safe to read while sessions keep being added.
+        # Caught up first: another process (the control daemon) may have
+        # logged sessions since our last sync().
+        while True:
+            self.load()
+            self.sync()
+            with self._lock:
+                if self._aggregates is not None:
+                    return FocusAggregates.from_dict(self._aggregates.to_dict())
+
+    def sync(self):
+        # Call after saving a session: folds in everything the log gained
+        # since, whoever saved it. Reading the log waits for queued writes,
+        # so run it off the GUI thread; task_stats() is never held up by it.
+        with self._lock:
+            if self._aggregates is None:
+                # Not loaded yet: loading reads it from the log.
+                self._missed = True
+                return
+        with self._load_lock:
+            with self._lock:
+                aggregates, position, check = self._aggregates, self._position, self._check
+                if aggregates is None:
+                    self._missed = True
+                    return
+            if self.storage.position_check(position) != check:
+                added = None
+            else:
+                added = list(self.storage.iter_sessions_from(position))
+                if added:
+                    position = added[-1][1]
+                    check = self.storage.position_check(position)
+            with self._lock:
+                if self._aggregates is not aggregates:
+                    # Reset meanwhile.
+                    return
+                if added is None:
+                    # The log was rewritten under us; the next load rebuilds.
+                    self._aggregates = None
+                    return
+                if not added:
+                    return
+                for session, _ in added:
+                    aggregates.add(session)
+                self._position, self._check = position, check
+                self._save_locked()
+
+    def reset(self):
+        # Call after clearing the history.
+        with self._lock:
+            self._aggregates = FocusAggregates()
+            self._position = None
+            self._check = self.storage.position_check(None)
+            self._missed = True
+            self._save_locked()
+
+    def task_stats(self, task_id: str):
+        # None until the aggregates are loaded or when the task has no
+        # logged work; never blocks on the log.
+        with self._lock:
+            if self._aggregates is None:
+                return None
+            stats = self._aggregates.tasks.get(task_id)
+            return copy.copy(stats) if stats is not None else None
+
+    def verify(self) -> List[str]:
+        # Names of the analysis methods whose incremental result differs from
+        # a full FocusAnalyzer recompute over the log; empty when consistent.
+        from .analyzer import FocusAnalyzer
+        return check_consistency(self.snapshot(), FocusAnalyzer(self.storage.iter_sessions()))
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _load(self, rebuild: bool) -> FocusAggregates:
+        with self._load_lock:
+            with self._lock:
+                if self._aggregates is not None:
+                    return self._aggregates
+                self._missed = False
+
+            state = None if rebuild else self._load_snapshot()
+            while True:
+                if state is not None:
+                    state = self._catch_up(state)
+                if state is None:
+                    # No snapshot, or the log was rewritten since it.
+                    state = self._catch_up(self._build())
+                    if state is None:
+                        # Cleared while building.
+                        continue
+                with self._lock:
+                    if not self._missed:
+                        self._aggregates, self._position, self._check = state
+                        self._save_locked()
+                        return self._aggregates
+                    # Sessions were saved or cleared meanwhile; re-check the log.
+                    self._missed = False
+
+    def _catch_up(self, state):
+        # (aggregates, position, check) moved to the end of the log, or None
+        # when the log no longer matches the check at that position.
+        aggregates, position, check = state
+        if self.storage.position_check(position) != check:
+            return None
+        for session, position in self.storage.iter_sessions_from(position):
+            aggregates.add(session)
+        return aggregates, position, self.storage.position_check(position)
+
+    def _build(self):
+        from .parallel import PARALLEL_MIN_BYTES, aggregate_log, complete_length
+        log_path = getattr(self.storage, 'storage_path', None)
+        if self.workers != 1 and log_path is not None:
+            self.storage.flush()
+            if log_path.exists() and log_path.stat().st_size >= PARALLEL_MIN_BYTES:
+                # Bounded at a line end, which is a position to catch up from.
+                end = complete_length(log_path)
+                return aggregate_log(log_path, self.workers, size=end), end, self.storage.position_check(end)
+        return FocusAggregates(), None, self.storage.position_check(None)
+
+    def _save_locked(self):
+        # Encoding and submitting under the lock keeps snapshots in order.
+        data = {"version": AGGREGATES_VERSION, "log_position": self._position, "log_check": self._check,
+                **self._aggregates.to_dict()}
+        if self.writer is not None:
+            self.writer.submit_replace(self.snapshot_path, lambda: _encode(data))
+        else:
+            atomic_write(self.snapshot_path, _encode(data))
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning("Rebuilding analytics, unreadable snapshot %s: %s", self.snapshot_path, e)
+            return None
+        if not isinstance(data, dict) or data.get("version") != AGGREGATES_VERSION:
+            return None
+        try:
+            return FocusAggregates.from_dict(data), data["log_position"], data["log_check"]
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Rebuilding analytics, invalid snapshot %s: %s", self.snapshot_path, e)
+            return None
+
+
+ANALYSIS_METHODS = ("analyze_time_of_day", "analyze_duration_patterns", "calculate_completion_rate",
+                    "analyze_weekly_pattern", "analyze_pause_patterns", "analyze_rolling_windows")
+
+
+def check_consistency(aggregates: FocusAggregates, analyzer) -> List[str]:
+    mismatches = [name for name in ANALYSIS_METHODS
+                  if getattr(aggregates, name)() != getattr(analyzer, name)()]
+    if aggregates.work_session_count != analyzer.work_session_count:
+        mismatches.append("work_session_count")
+    return mismatches
+
+
+def _label(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def _mean(total: int, count: int):
+    # statistics.mean() on ints returns an int when the mean is exact.
+    return total // count if total % count == 0 else total / count
+
+
+def _encode(data: dict) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
@@ -1,14 +1,47 @@
-from typing import List, Dict
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 import statistics
 from ..core.session import SessionData
+from .daily import ROLLING_WINDOWS, DayBuckets
+
+# Histories at least this large use the NumPy engine when it is installed.
+COLUMNAR_THRESHOLD = 5000
+
+
+def create_analyzer(sessions: List[SessionData]):
+    if len(sessions) >= COLUMNAR_THRESHOLD:
+        try:
+            from .columnar import ColumnarFocusAnalyzer
+        except ImportError:
+            pass
+        else:
+            return ColumnarFocusAnalyzer.from_sessions(sessions)
+    return FocusAnalyzer(sessions)
 
 
 class FocusAnalyzer:
-    def __init__(self, sessions: List[SessionData]):
-        self.sessions = sessions
-        self.work_sessions = [s for s in sessions if s.session_type == "work"]
+    def __init__(self, sessions: Iterable[SessionData]):
+        # A copy: add_session() must not grow the caller's list.
+        self.sessions = list(sessions)
+        self.work_sessions = [s for s in self.sessions if s.session_type == "work"]
+        # Day buckets cover work_sessions[:_bucketed]; later sessions are
+        # folded in on the next analyze_rolling_windows() call.
+        self._days = DayBuckets()
+        self._bucketed = 0
+
+    @property
+    def session_count(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def work_session_count(self) -> int:
+        return len(self.work_sessions)
+
+    def add_session(self, session: SessionData):
+        self.sessions.append(session)
+        if session.session_type == "work":
+            self.work_sessions.append(session)
 
     def analyze_time_of_day(self) -> Dict:
         hour_stats = defaultdict(lambda: {"total": 0, "completed": 0, "skipped": 0})
@@ -101,3 +134,10 @@ class FocusAnalyzer:
             "no_pause_completion_rate": no_pause_completion,
             "pause_impact": no_pause_completion - paused_completion
         }
+
+    def analyze_rolling_windows(self, windows: Sequence[int] = ROLLING_WINDOWS,
+                                today: Optional[date] = None) -> Dict:
+        for session in self.work_sessions[self._bucketed:]:
+            self._days.add(session.start_time.date(), session.actual_duration, session.was_completed)
+        self._bucketed = len(self.work_sessions)
+        return self._days.rolling_windows(windows, today)
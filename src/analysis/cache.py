@@ -0,0 +1,120 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+from ..data.writer import PersistenceWriter, atomic_write
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+class CachedAnalyzer:
+    # Memoizes an analyzer's zero-argument methods and attributes, so
+    # SuggestionGenerator's repeated calls within one analysis are computed
+    # once. Results are saved under `key` (a storage generation) and reused
+    # by later runs until the key changes. `analyzer` may be a callable that
+    # builds it; it is only called on a cache miss, so a warm cache never
+    # touches the session history. `key` may be a callable too, called (and
+    # the cache file read) on the first lookup rather than here.
+    def __init__(self, analyzer: Union[Any, Callable[[], Any]],
+                 key: Union[None, str, Callable[[], Optional[str]]] = None,
+                 cache_path: Path = None, writer: Optional[PersistenceWriter] = None):
+        if cache_path is None:
+            cache_path = Path(__file__).parent.parent / 'data' / 'analysis_cache.json'
+        self._source = analyzer
+        self._analyzer = None
+        self.key = key
+        self.cache_path = cache_path
+        self.writer = writer
+        self._dirty = False
+        self._results: Optional[Dict[str, Any]] = None
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = self._source() if callable(self._source) else self._source
+        return self._analyzer
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        results = self._cached()
+        call_key = name + '()'
+        if call_key in results:
+            return lambda: results[call_key]
+        if name in results:
+            return results[name]
+
+        value = getattr(self.analyzer, name)
+        if callable(value):
+            def method():
+                if call_key not in results:
+                    self._store(call_key, value())
+                return results[call_key]
+            return method
+        self._store(name, value)
+        return value
+
+    def save(self):
+        if self.key is None or not self._dirty:
+            return
+        data = _encode({"version": CACHE_VERSION, "key": self.key,
+                        "results": {name: _to_json(v) for name, v in self._results.items()}})
+        if self.writer is not None:
+            self.writer.submit_replace(self.cache_path, data)
+        else:
+            atomic_write(self.cache_path, data)
+        self._dirty = False
+
+    def _cached(self) -> Dict[str, Any]:
+        if self._results is None:
+            if callable(self.key):
+                self.key = self.key()
+            self._results = self._load() if self.key is not None else {}
+        return self._results
+
+    def _store(self, name: str, value):
+        self._cached()[name] = value
+        self._dirty = True
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning("Ignoring unreadable analysis cache %s: %s", self.cache_path, e)
+            return {}
+        if (not isinstance(data, dict) or data.get("version") != CACHE_VERSION
+                or data.get("key") != self.key):
+            return {}
+        try:
+            return {name: _from_json(v) for name, v in data["results"].items()}
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning("Ignoring invalid analysis cache %s: %s", self.cache_path, e)
+            return {}
+
+
+# Analysis results are dicts keyed by ints (hours, weekdays, durations),
+# which plain JSON would turn into strings. Dicts are stored as tagged lists
+# of [key, value] pairs so keys, value types and order all round-trip.
+def _to_json(value):
+    if isinstance(value, dict):
+        return {"items": [[k, _to_json(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict):
+        return {k: _from_json(v) for k, v in value["items"]}
+    if isinstance(value, list):
+        return [_from_json(v) for v in value]
+    return value
+
+
+def _encode(data: dict) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,201 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..core.session import SessionData
+from ..core.session_table import EPOCH, FLAG_COMPLETED, FLAG_SKIPPED, PHASES, US_PER_DAY, SessionTable
+from .daily import ROLLING_WINDOWS, DayBuckets
+
+US_PER_HOUR = 3_600_000_000
+# 1970-01-01 was a Thursday (datetime.weekday() == 3).
+EPOCH_WEEKDAY = 3
+EPOCH_ORDINAL = EPOCH.toordinal()
+DENSE_KEY_LIMIT = 1 << 16
+
+
+class ColumnarFocusAnalyzer:
+    # Same API and results as FocusAnalyzer, computed from one set of NumPy
+    # columns for the work sessions with grouped bincount aggregations.
+    # Group keys keep first-appearance order so dict iteration order, and
+    # therefore tie-breaking in best_hour/best day, match the loop version.
+    def __init__(self, hour: np.ndarray, weekday: np.ndarray, planned_duration: np.ndarray,
+                 actual_duration: np.ndarray, pause_count: np.ndarray,
+                 completed: np.ndarray, skipped: np.ndarray, day: Optional[np.ndarray] = None):
+        self.hour = hour
+        self.weekday = weekday
+        self.planned_duration = planned_duration
+        self.actual_duration = actual_duration
+        self.pause_count = pause_count
+        self.completed = completed
+        self.skipped = skipped
+        # Days since 1970-01-01; rolling windows need it.
+        self.day = day
+        self._buckets: Optional[DayBuckets] = None
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[SessionData]) -> 'ColumnarFocusAnalyzer':
+        work = [s for s in sessions if s.session_type == "work"]
+        return cls(
+            hour=np.fromiter((s.start_time.hour for s in work), np.int64, len(work)),
+            weekday=np.fromiter((s.start_time.weekday() for s in work), np.int64, len(work)),
+            planned_duration=np.fromiter((s.planned_duration for s in work), np.int64, len(work)),
+            actual_duration=np.fromiter((s.actual_duration for s in work), np.int64, len(work)),
+            pause_count=np.fromiter((s.pause_count for s in work), np.int64, len(work)),
+            completed=np.fromiter((s.was_completed for s in work), bool, len(work)),
+            skipped=np.fromiter((s.was_skipped for s in work), bool, len(work)),
+            day=np.fromiter((s.start_time.toordinal() - EPOCH_ORDINAL for s in work), np.int64, len(work)),
+        )
+
+    @classmethod
+    def from_table(cls, table: SessionTable) -> 'ColumnarFocusAnalyzer':
+        work_code = table.phase_names.index("work")
+        mask = np.frombuffer(table.phase, dtype=np.int8) == work_code if len(table) else np.zeros(0, bool)
+
+        def column(values, dtype):
+            if not len(values):
+                return np.zeros(0, dtype)
+            return np.frombuffer(values, dtype=dtype)[mask]
+
+        return cls._from_columns(
+            start_us=column(table.start_us, np.int64),
+            planned=column(table.planned_duration, np.int32),
+            actual=column(table.actual_duration, np.int32),
+            pauses=column(table.pause_count, np.int32),
+            flags=column(table.flags, np.uint8),
+        )
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> 'ColumnarFocusAnalyzer':
+        # Structured array as returned by SessionArchive.records().
+        work = records[records['phase'] == PHASES.index("work")]
+        return cls._from_columns(work['start_us'], work['planned_duration'],
+                                 work['actual_duration'], work['pause_count'], work['flags'])
+
+    @classmethod
+    def _from_columns(cls, start_us, planned, actual, pauses, flags) -> 'ColumnarFocusAnalyzer':
+        start_us = np.asarray(start_us, dtype=np.int64)
+        return cls(
+            hour=(start_us // US_PER_HOUR) % 24,
+            weekday=(start_us // US_PER_DAY + EPOCH_WEEKDAY) % 7,
+            planned_duration=np.asarray(planned, dtype=np.int64),
+            actual_duration=np.asarray(actual, dtype=np.int64),
+            pause_count=np.asarray(pauses, dtype=np.int64),
+            completed=(np.asarray(flags) & FLAG_COMPLETED) != 0,
+            skipped=(np.asarray(flags) & FLAG_SKIPPED) != 0,
+            day=start_us // US_PER_DAY,
+        )
+
+    @property
+    def work_session_count(self) -> int:
+        return len(self.hour)
+
+    def analyze_time_of_day(self) -> Dict:
+        # FocusAnalyzer counts a session as skipped only if it was not completed.
+        groups = _group_counts(self.hour, self.completed, self.skipped & ~self.completed)
+        hour_stats = {h: {"total": t, "completed": c, "skipped": s} for h, t, c, s in groups}
+        completion_rates = {h: c / t for h, t, c, _ in groups if t > 0}
+
+        return {
+            "hour_stats": hour_stats,
+            "completion_rates": completion_rates,
+            "best_hour": max(completion_rates.items(), key=lambda x: x[1])[0] if completion_rates else None
+        }
+
+    def analyze_duration_patterns(self) -> Dict:
+        if not self.work_session_count:
+            return {"average_duration": 0, "completion_rate_by_duration": {}}
+
+        buckets = (self.planned_duration // 300) * 300
+        groups = _group_counts(buckets, self.completed)
+        return {
+            "average_duration": _mean(self.actual_duration),
+            "completion_rate_by_duration": {d: c / t for d, t, c, _ in groups if t > 0}
+        }
+
+    def calculate_completion_rate(self) -> float:
+        if not self.work_session_count:
+            return 0.0
+        return int(np.count_nonzero(self.completed)) / self.work_session_count
+
+    def analyze_weekly_pattern(self) -> Dict:
+        groups = _group_counts(self.weekday, self.completed)
+        return {
+            "weekday_stats": {d: {"total": t, "completed": c} for d, t, c, _ in groups},
+            "completion_by_weekday": {d: c / t for d, t, c, _ in groups if t > 0}
+        }
+
+    def analyze_pause_patterns(self) -> Dict:
+        if not self.work_session_count:
+            return {"average_pauses": 0, "pause_impact": 0}
+
+        paused = self.pause_count > 0
+        paused_total = int(np.count_nonzero(paused))
+        no_pause_total = self.work_session_count - paused_total
+        paused_done = int(np.count_nonzero(self.completed & paused))
+        no_pause_done = int(np.count_nonzero(self.completed & ~paused))
+
+        paused_completion = paused_done / paused_total if paused_total else 0
+        no_pause_completion = no_pause_done / no_pause_total if no_pause_total else 0
+
+        return {
+            "average_pauses": _mean(self.pause_count),
+            "paused_completion_rate": paused_completion,
+            "no_pause_completion_rate": no_pause_completion,
+            "pause_impact": no_pause_completion - paused_completion
+        }
+
+    def analyze_rolling_windows(self, windows: Sequence[int] = ROLLING_WINDOWS,
+                                today: Optional[date] = None) -> Dict:
+        return self._day_buckets().rolling_windows(windows, today)
+
+    def _day_buckets(self) -> DayBuckets:
+        # Built on first use and kept: the columns never change.
+        if self._buckets is None:
+            buckets = DayBuckets()
+            if self.day is not None and len(self.day):
+                first = int(self.day.min())
+                offsets = self.day - first
+                buckets.first_day = EPOCH.date() + timedelta(days=first)
+                buckets.totals = np.bincount(offsets).tolist()
+                buckets.completed = np.bincount(offsets, weights=self.completed).astype(np.int64).tolist()
+                buckets.focus_seconds = np.bincount(offsets, weights=self.actual_duration).astype(np.int64).tolist()
+            self._buckets = buckets
+        return self._buckets
+
+
+def _group_counts(keys: np.ndarray, completed: np.ndarray, skipped: np.ndarray = None) -> List:
+    # [(key, total, completed, skipped)] in order of each key's first appearance.
+    if not len(keys):
+        return []
+    if keys.min() >= 0 and keys.max() < DENSE_KEY_LIMIT:
+        # Small non-negative keys (hours, weekdays, 5-minute buckets): count
+        # directly by key. Assigning positions in reverse leaves each slot
+        # holding the key's first occurrence.
+        size = int(keys.max()) + 1
+        positions = np.arange(len(keys))
+        first_index = np.full(size, len(keys))
+        first_index[keys[::-1]] = positions[::-1]
+        present = np.flatnonzero(first_index < len(keys))
+        uniques, first_index = present, first_index[present]
+        index = keys
+    else:
+        uniques, first_index, index = np.unique(keys, return_index=True, return_inverse=True)
+        present = np.arange(len(uniques))
+        size = len(uniques)
+
+    totals = np.bincount(index, minlength=size)[present]
+    done = np.bincount(index, weights=completed, minlength=size)[present].astype(np.int64)
+    if skipped is not None:
+        skips = np.bincount(index, weights=skipped, minlength=size)[present].astype(np.int64)
+    else:
+        skips = np.zeros(len(present), np.int64)
+    return [(int(uniques[i]), int(totals[i]), int(done[i]), int(skips[i]))
+            for i in np.argsort(first_index, kind="stable")]
+
+
+def _mean(values: np.ndarray):
+    # statistics.mean() on ints returns an int when the mean is exact.
+    total = int(values.sum())
+    count = len(values)
+    return total // count if total % count == 0 else total / count
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+ROLLING_WINDOWS = (7, 30)
+
+
+class DayBuckets:
+    # Work session totals per calendar day, stored densely from the first
+    # active day on, so day i of the history is index i. Appending a session
+    # on or after the last day is O(1) amortized; rolling windows are one
+    # O(days) pass with running sums instead of a rescan per window.
+    def __init__(self):
+        self.first_day: Optional[date] = None
+        self.totals: List[int] = []
+        self.completed: List[int] = []
+        self.focus_seconds: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    @property
+    def last_day(self) -> Optional[date]:
+        if self.first_day is None:
+            return None
+        return self.first_day + timedelta(days=len(self.totals) - 1)
+
+    def add(self, day: date, actual_duration: int, completed: bool):
+        index = self._index(day)
+        self.totals[index] += 1
+        self.completed[index] += 1 if completed else 0
+        self.focus_seconds[index] += actual_duration
+
+    def merge(self, other: 'DayBuckets'):
+        if other.first_day is None:
+            return
+        start = self._index(other.first_day)
+        self._index(other.last_day)
+        for i in range(len(other.totals)):
+            self.totals[start + i] += other.totals[i]
+            self.completed[start + i] += other.completed[i]
+            self.focus_seconds[start + i] += other.focus_seconds[i]
+
+    def rolling_windows(self, windows: Sequence[int] = ROLLING_WINDOWS, today: Optional[date] = None) -> Dict:
+        # Daily series from the first active day through `today` (default:
+        # the last active day). completion_rate[w][i] is the work session
+        # completion rate over the w days ending on day i. A streak is a run
+        # of days with at least one completed work session; the current
+        # streak is the one still alive on the last day, allowing that day
+        # itself to have no sessions yet.
+        if self.first_day is None:
+            return {"days": [], "completed": [], "focus_minutes": [],
+                    "completion_rate": {w: [] for w in windows}, "current_streak": 0, "longest_streak": 0}
+
+        padding = max(0, (today - self.last_day).days) if today is not None else 0
+        totals = self.totals + [0] * padding
+        completed = self.completed + [0] * padding
+        focus_seconds = self.focus_seconds + [0] * padding
+        count = len(totals)
+
+        rates = {}
+        for window in windows:
+            series = []
+            window_total = window_done = 0
+            for i in range(count):
+                window_total += totals[i]
+                window_done += completed[i]
+                if i >= window:
+                    window_total -= totals[i - window]
+                    window_done -= completed[i - window]
+                series.append(window_done / window_total if window_total else 0.0)
+            rates[window] = series
+
+        longest = run = 0
+        for done in completed:
+            run = run + 1 if done else 0
+            longest = max(longest, run)
+        if completed[-1]:
+            current = run
+        else:
+            current = 0
+            for done in reversed(completed[:-1]):
+                if not done:
+                    break
+                current += 1
+
+        return {
+            "days": [(self.first_day + timedelta(days=i)).isoformat() for i in range(count)],
+            "completed": completed,
+            "focus_minutes": [seconds / 60 for seconds in focus_seconds],
+            "completion_rate": rates,
+            "current_streak": current,
+            "longest_streak": longest,
+        }
+
+    def to_dict(self) -> dict:
+        # Copies: snapshots are encoded later, on the writer thread.
+        return {"first_day": self.first_day.isoformat() if self.first_day else None,
+                "totals": list(self.totals), "completed": list(self.completed),
+                "focus_seconds": list(self.focus_seconds)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DayBuckets':
+        buckets = cls()
+        if data["first_day"] is not None:
+            buckets.first_day = date.fromisoformat(data["first_day"])
+            buckets.totals = [int(n) for n in data["totals"]]
+            buckets.completed = [int(n) for n in data["completed"]]
+            buckets.focus_seconds = [int(n) for n in data["focus_seconds"]]
+        return buckets
+
+    def _index(self, day: date) -> int:
+        # Index of `day`, growing the arrays at either end to include it.
+        if self.first_day is None:
+            self.first_day = day
+        offset = (day - self.first_day).days
+        if offset < 0:
+            # Out-of-order history; rare, so shifting is fine.
+            self.totals[:0] = [0] * -offset
+            self.completed[:0] = [0] * -offset
+            self.focus_seconds[:0] = [0] * -offset
+            self.first_day = day
+            offset = 0
+        if offset >= len(self.totals):
+            grow = offset + 1 - len(self.totals)
+            self.totals.extend([0] * grow)
+            self.completed.extend([0] * grow)
+            self.focus_seconds.extend([0] * grow)
+        return offset
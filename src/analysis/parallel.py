@@ -0,0 +1,106 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+from .aggregates import FocusAggregates
+from ..data.migrations import is_header
+
+# Logs smaller than this are aggregated in-process; starting workers costs
+# more than the pass itself.
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+# Partitions per worker, so a slow partition does not hold up the reduce.
+PARTITIONS_PER_WORKER = 4
+
+
+def resolve_workers(workers: int) -> int:
+    # 0 means one worker per core.
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def complete_length(path: Path) -> int:
+    # Bytes up to the end of the last newline-terminated line; a line still
+    # being appended is left out.
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        position = size
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def partition_log(path: Path, count: int, size: Optional[int] = None) -> List[Tuple[int, int]]:
+    # Split the first `size` bytes (default: all) of a JSON Lines file into up
+    # to `count` contiguous byte ranges, each starting at the beginning of a
+    # line. Ranges are in file order.
+    if size is None:
+        size = os.path.getsize(path)
+    if size == 0:
+        return []
+    boundaries = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, count):
+            offset = size * i // count
+            if offset <= boundaries[-1]:
+                continue
+            f.seek(offset - 1)
+            f.readline()
+            offset = f.tell()
+            if offset >= size:
+                break
+            if offset > boundaries[-1]:
+                boundaries.append(offset)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def aggregate_range(path: Path, start: int, end: int) -> FocusAggregates:
+    # Worker entry point: aggregate the lines in [start, end).
+    aggregates = FocusAggregates()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            position += len(line)
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append.
+                    record = None
+                if record is not None and not is_header(record):
+                    aggregates.add_record(record)
+            if position >= end:
+                break
+    return aggregates
+
+
+def aggregate_log(path: Path, workers: int = 0, partitions: Optional[int] = None,
+                  size: Optional[int] = None) -> FocusAggregates:
+    # Map-reduce over a session log: each partition is aggregated in a
+    # worker process and the partial results are merged in file order, which
+    # gives exactly the counters of one sequential pass (quantile sketches
+    # agree within their error bound).
+    workers = resolve_workers(workers)
+    if partitions is None:
+        partitions = workers * PARTITIONS_PER_WORKER if workers > 1 else 1
+    ranges = partition_log(path, partitions, size)
+    result = FocusAggregates()
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            result.merge(aggregate_range(path, start, end))
+        return result
+
+    # spawn: the GUI process has live threads, which fork does not copy safely.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as pool:
+        for partial in pool.map(aggregate_range, [path] * len(ranges),
+                                [start for start, _ in ranges], [end for _, end in ranges]):
+            result.merge(partial)
+    return result
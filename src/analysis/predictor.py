@@ -0,0 +1,270 @@
+import json
+import logging
+import math
+import pickle
+import queue
+import threading
+import zlib
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+from ..core.session import SessionData
+from ..data.writer import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+RECENT_SESSIONS = 10
+TASK_BUCKETS = 64
+BATCH_SIZE = 10_000
+TRAINING_EPOCHS = 3
+
+# Feature layout: one-hot hour and weekday, planned duration in hours, mean
+# pauses over the last RECENT_SESSIONS work sessions, then one slot for "no
+# task" and TASK_BUCKETS hashed task slots.
+HOUR_OFFSET = 0
+WEEKDAY_OFFSET = 24
+PLANNED_INDEX = 31
+PAUSE_RATE_INDEX = 32
+NO_TASK_INDEX = 33
+TASK_OFFSET = 34
+FEATURE_COUNT = TASK_OFFSET + TASK_BUCKETS
+
+
+def feature_slots(hour: int, weekday: int, task_id: Optional[str]) -> List[int]:
+    if task_id is None:
+        task_slot = NO_TASK_INDEX
+    else:
+        task_slot = TASK_OFFSET + zlib.crc32(task_id.encode('utf-8')) % TASK_BUCKETS
+    return [HOUR_OFFSET + hour, WEEKDAY_OFFSET + weekday, task_slot]
+
+
+class CompletionPredictor:
+    # Estimates the probability that a work session completes. Training uses
+    # scikit-learn's SGDClassifier (logistic loss) on a background thread,
+    # pickled between runs so new sessions are folded in with partial_fit.
+    # After every update the coefficients are also exported to a small JSON
+    # file; predict() reads only that, so inference is a handful of
+    # additions and never imports sklearn.
+    def __init__(self, model_path: Path = None):
+        if model_path is None:
+            model_path = Path(__file__).parent.parent / 'data' / 'completion_model.json'
+        self.model_path = model_path
+        self.state_path = model_path.with_suffix('.pkl')
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._weights: Optional[List[float]] = None
+        self._intercept = 0.0
+        self._recent_pauses = deque(maxlen=RECENT_SESSIONS)
+        self._trained_sessions = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_trained(self) -> bool:
+        self._ensure_loaded()
+        return self._weights is not None
+
+    @property
+    def trained_sessions(self) -> int:
+        self._ensure_loaded()
+        return self._trained_sessions
+
+    def predict(self, start_time: datetime, planned_duration: int,
+                task_id: Optional[str] = None) -> Optional[float]:
+        # Probability in [0, 1], or None until a model has been trained.
+        self._ensure_loaded()
+        weights = self._weights
+        if weights is None:
+            return None
+        with self._lock:
+            pause_rate = _mean(self._recent_pauses)
+        z = self._intercept + weights[PLANNED_INDEX] * planned_duration / 3600
+        z += weights[PAUSE_RATE_INDEX] * pause_rate
+        for slot in feature_slots(start_time.hour, start_time.weekday(), task_id):
+            z += weights[slot]
+        return 1 / (1 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def observe(self, session: SessionData):
+        # Queue a finished work session for the next partial_fit.
+        if session.session_type != "work":
+            return
+        self._ensure_loaded()
+        with self._lock:
+            pause_rate = _mean(self._recent_pauses)
+            self._recent_pauses.append(session.pause_count)
+        self._queue.put((session, pause_rate))
+
+    def start(self, storage=None) -> 'CompletionPredictor':
+        # Start the training thread. Without a saved model it first trains
+        # on the whole history in `storage`.
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(storage,),
+                                            name='CompletionPredictor', daemon=True)
+            self._thread.start()
+        return self
+
+    def train(self, sessions: Iterable[SessionData], epochs: int = TRAINING_EPOCHS) -> Optional[datetime]:
+        # Fit from scratch on a chronological session history. Examples are
+        # kept as compact columns (a few bytes each), not SessionData.
+        # Returns the start time of the last work session trained on.
+        import numpy as np
+        recent = deque(maxlen=RECENT_SESSIONS)
+        last = None
+
+        def tracked():
+            nonlocal last
+            for session, pause_rate in _examples(sessions):
+                recent.append(session.pause_count)
+                last = session.start_time
+                yield session, pause_rate
+
+        columns = _columns(tracked())
+        count = len(columns[-1])
+        model = _new_model()
+        rng = np.random.default_rng(0)
+        for _ in range(epochs):
+            order = rng.permutation(count)
+            for i in range(0, count, BATCH_SIZE):
+                _fit_rows(model, columns, order[i:i + BATCH_SIZE])
+        with self._lock:
+            self._recent_pauses = recent
+            self._trained_sessions = 0
+        if count == 0:
+            # No work sessions yet: nothing to publish until one is observed.
+            return last
+        self._publish(model, count)
+        return last
+
+    def wait_idle(self):
+        # Blocks until every observed session has been trained on.
+        self._queue.join()
+
+    def _run(self, storage):
+        # Sessions observed before or during the initial training were saved
+        # before it read them, so they are already in the history.
+        trained_until = None
+        try:
+            model = self._load_state()
+            if model is None and storage is not None:
+                trained_until = self.train(storage.iter_sessions())
+                model = self._load_state()
+        except Exception:
+            logger.exception("Completion model training failed")
+            model = None
+
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            new = [item for item in batch if trained_until is None or item[0].start_time > trained_until]
+            trained_until = None
+            try:
+                if new:
+                    if model is None:
+                        model = _new_model()
+                    _fit_rows(model, _columns(new), range(len(new)))
+                    self._publish(model, len(new))
+            except Exception:
+                logger.exception("Completion model update failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _publish(self, model, trained: int):
+        weights = [float(w) for w in model.coef_[0]]
+        intercept = float(model.intercept_[0])
+        with self._lock:
+            self._weights = weights
+            self._intercept = intercept
+            self._trained_sessions += trained
+            data = {
+                "version": MODEL_VERSION,
+                "weights": weights,
+                "intercept": intercept,
+                "recent_pauses": list(self._recent_pauses),
+                "trained_sessions": self._trained_sessions,
+            }
+        atomic_write(self.state_path, pickle.dumps(model))
+        atomic_write(self.model_path, json.dumps(data).encode('utf-8'))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.model_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning("Ignoring unreadable completion model %s: %s", self.model_path, e)
+            return
+        if data.get("version") != MODEL_VERSION or len(data.get("weights", ())) != FEATURE_COUNT:
+            return
+        with self._lock:
+            self._weights = [float(w) for w in data["weights"]]
+            self._intercept = float(data["intercept"])
+            self._recent_pauses = deque(data.get("recent_pauses", ()), maxlen=RECENT_SESSIONS)
+            self._trained_sessions = int(data.get("trained_sessions", 0))
+
+    def _load_state(self):
+        if not self.state_path.exists() or not self.is_trained:
+            return None
+        try:
+            with open(self.state_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning("Retraining, could not load %s: %s", self.state_path, e)
+            return None
+
+
+def _examples(sessions: Iterable[SessionData]):
+    # (session, mean pauses of the previous work sessions) for each work
+    # session, in order.
+    recent = deque(maxlen=RECENT_SESSIONS)
+    for session in sessions:
+        if session.session_type != "work":
+            continue
+        yield session, _mean(recent)
+        recent.append(session.pause_count)
+
+
+def _new_model():
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+
+
+def _columns(examples):
+    # -> (one-hot slots, planned hours, pause rate, label) as NumPy columns
+    import numpy as np
+    slots, planned, pauses, labels = [], [], [], []
+    for session, pause_rate in examples:
+        slots.extend(feature_slots(session.start_time.hour, session.start_time.weekday(), session.task_id))
+        planned.append(session.planned_duration / 3600)
+        pauses.append(pause_rate)
+        labels.append(1 if session.was_completed else 0)
+    return (np.array(slots, dtype=np.int16).reshape(-1, 3), np.array(planned, dtype=np.float32),
+            np.array(pauses, dtype=np.float32), np.array(labels, dtype=np.int8))
+
+
+def _fit_rows(model, columns, rows):
+    import numpy as np
+    slots, planned, pauses, labels = columns
+    rows = np.asarray(rows)
+    X = np.zeros((len(rows), FEATURE_COUNT))
+    index = np.arange(len(rows))[:, None]
+    X[index, slots[rows]] = 1.0
+    X[:, PLANNED_INDEX] = planned[rows]
+    X[:, PAUSE_RATE_INDEX] = pauses[rows]
+    model.partial_fit(X, labels[rows], classes=np.array([0, 1]))
+
+
+def _mean(values) -> float:
+    return sum(values) / len(values) if values else 0.0
@@ -0,0 +1,138 @@
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_K = 128
+# Each level below the top holds c times the items of the level above it,
+# but at least MIN_WIDTH so the bottom levels are not compacted every add.
+LEVEL_RATIO = 2 / 3
+MIN_WIDTH = 8
+
+
+class QuantileSketch:
+    # KLL quantile sketch (Karnin, Lang & Liberty 2016). Items live in a stack
+    # of compactors; an item at level h stands for 2**h inputs. A full level
+    # is sorted and every other item is promoted to the level above, so the
+    # sketch holds O(k) items however many values it has seen. Ranks are
+    # within roughly 1.7/k of exact. Levels alternate the offset of the kept
+    # items instead of flipping a coin, which keeps sketches deterministic
+    # and serializable. Sketches with the same k can be merged.
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.count = 0
+        self.levels: List[List] = [[]]
+        self._offsets: List[int] = [0]
+        self._size = 0
+        self._capacities = [self.k]
+        self._max_size = self.k
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update(self, values: Iterable):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.k != self.k:
+            raise ValueError(f"cannot merge sketches with k={self.k} and k={other.k}")
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for level, items in zip(self.levels, other.levels):
+            level.extend(items)
+        self.count += other.count
+        self._size = sum(len(level) for level in self.levels)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def quantile(self, q: float):
+        # Smallest retained value whose estimated rank reaches q * count.
+        if not self.count:
+            return None
+        weighted = self._weighted()
+        target = q * sum(w for _, w in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def quantiles(self, qs: Sequence[float]) -> List:
+        return [self.quantile(q) for q in qs]
+
+    def rank(self, value) -> float:
+        # Estimated fraction of inputs <= value.
+        if not self.count:
+            return 0.0
+        weighted = self._weighted()
+        total = sum(w for _, w in weighted)
+        return sum(w for v, w in weighted if v <= value) / total
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "count": self.count, "levels": [list(level) for level in self.levels],
+                "offsets": list(self._offsets)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        sketch = cls(int(data["k"]))
+        for _ in range(len(data["levels"]) - 1):
+            sketch._grow()
+        sketch.levels = [list(level) for level in data["levels"]]
+        sketch._offsets = [int(o) for o in data["offsets"]]
+        sketch.count = int(data["count"])
+        sketch._size = sum(len(level) for level in sketch.levels)
+        return sketch
+
+    def _weighted(self) -> List[Tuple]:
+        weighted = [(value, 1 << h) for h, level in enumerate(self.levels) for value in level]
+        weighted.sort(key=lambda item: item[0])
+        return weighted
+
+    def _grow(self):
+        self.levels.append([])
+        self._offsets.append(0)
+        height = len(self.levels)
+        self._capacities = [max(MIN_WIDTH, int(math.ceil(self.k * LEVEL_RATIO ** (height - h - 1))))
+                            for h in range(height)]
+        self._max_size = sum(self._capacities)
+
+    def _compress(self):
+        for h, level in enumerate(self.levels):
+            if len(level) < self._capacities[h]:
+                continue
+            if h + 1 == len(self.levels):
+                self._grow()
+            level.sort()
+            # With an odd count the largest item stays behind.
+            keep = level.pop() if len(level) % 2 else None
+            offset = self._offsets[h]
+            self._offsets[h] = 1 - offset
+            self.levels[h + 1].extend(level[offset::2])
+            self._size -= len(level) // 2
+            level.clear()
+            if keep is not None:
+                level.append(keep)
+            if self._size < self._max_size:
+                break
+
+
+def merged(sketches: Iterable[QuantileSketch], k: int = DEFAULT_K) -> QuantileSketch:
+    result = QuantileSketch(k)
+    for sketch in sketches:
+        result.merge(sketch)
+    return result
+
+
+def sketches_to_dict(sketches: Dict[int, QuantileSketch]) -> list:
+    return [[key, sketch.to_dict()] for key, sketch in sketches.items()]
+
+
+def sketches_from_dict(data: Optional[list]) -> Dict[int, QuantileSketch]:
+    return {int(key): QuantileSketch.from_dict(sketch) for key, sketch in data or ()}
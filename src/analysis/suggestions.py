@@ -1,29 +1,46 @@
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional, Union
+from .aggregates import FocusAggregates
 from .analyzer import FocusAnalyzer
+from .predictor import CompletionPredictor
 
 
 class SuggestionGenerator:
-    def __init__(self, analyzer: FocusAnalyzer):
+    def __init__(self, analyzer: Union[FocusAnalyzer, FocusAggregates],
+                 predictor: Optional[CompletionPredictor] = None, planned_duration: int = 25 * 60):
         self.analyzer = analyzer
+        self.predictor = predictor
+        self.planned_duration = planned_duration
 
     def generate_insights(self) -> List[str]:
-        insights = []
+        return (self.completion_insights() + self.time_of_day_insights() + self.pause_insights()
+                + self.weekly_insights() + self.duration_insights() + self.length_insights()
+                + self.consistency_insights())
 
+    def completion_insights(self) -> List[str]:
         completion_rate = self.analyzer.calculate_completion_rate()
-        insights.append(f"Overall completion rate: {completion_rate * 100:.1f}%")
+        return [f"Overall completion rate: {completion_rate * 100:.1f}%"]
 
+    def time_of_day_insights(self) -> List[str]:
+        insights = []
         time_analysis = self.analyzer.analyze_time_of_day()
         if time_analysis["best_hour"] is not None:
             best_hour = time_analysis["best_hour"]
             best_rate = time_analysis["completion_rates"][best_hour] * 100
             insights.append(f"Your focus is strongest at {best_hour}:00 ({best_rate:.1f}% completion)")
+        return insights
 
+    def pause_insights(self) -> List[str]:
+        insights = []
         pause_analysis = self.analyzer.analyze_pause_patterns()
         if pause_analysis["pause_impact"] > 0.1:
             insights.append(f"Sessions without pauses have {pause_analysis['pause_impact'] * 100:.1f}% higher completion rate")
         elif pause_analysis["pause_impact"] < -0.1:
             insights.append("Taking breaks during sessions may help maintain focus")
+        return insights
 
+    def weekly_insights(self) -> List[str]:
+        insights = []
         weekly_analysis = self.analyzer.analyze_weekly_pattern()
         if weekly_analysis["completion_by_weekday"]:
             weekday_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -32,12 +49,46 @@ class SuggestionGenerator:
 
             insights.append(f"Best day: {weekday_names[best_day[0]]} ({best_day[1] * 100:.1f}% completion)")
             insights.append(f"Most challenging day: {weekday_names[worst_day[0]]} ({worst_day[1] * 100:.1f}% completion)")
+        return insights
 
+    def duration_insights(self) -> List[str]:
+        insights = []
         duration_analysis = self.analyzer.analyze_duration_patterns()
         if duration_analysis["average_duration"] > 0:
             avg_minutes = duration_analysis["average_duration"] / 60
             insights.append(f"Average session duration: {avg_minutes:.1f} minutes")
+        return insights
 
+    def length_insights(self) -> List[str]:
+        # Only the incremental aggregates keep duration/pause sketches.
+        if not hasattr(self.analyzer, "analyze_quantiles"):
+            return []
+        overall = self.analyzer.analyze_quantiles()["overall"]
+        durations, pauses = overall["duration"], overall["pauses"]
+        if durations["p50"] is None:
+            return []
+        return [
+            f"Typical session length: {durations['p50'] / 60:.1f} minutes "
+            f"(90th percentile {durations['p90'] / 60:.1f}, 99th {durations['p99'] / 60:.1f})",
+            f"90% of sessions have {pauses['p90']} or fewer pauses",
+        ]
+
+    def consistency_insights(self, today: Optional[date] = None) -> List[str]:
+        rolling = self.analyzer.analyze_rolling_windows()
+        if not rolling["days"]:
+            return []
+        today = today or date.today()
+        # The series ends on the last active day, which may be in the past.
+        gap = (today - date.fromisoformat(rolling["days"][-1])).days
+        alive = gap == 0 or (gap == 1 and rolling["completed"][-1] > 0)
+        current = rolling["current_streak"] if alive else 0
+        insights = [f"Current streak: {current} day{'s' if current != 1 else ''} "
+                    f"(longest: {rolling['longest_streak']})"]
+        if gap <= 1:
+            week, month = rolling["completion_rate"][7][-1], rolling["completion_rate"][30][-1]
+            minutes = sum(rolling["focus_minutes"][-7:]) / 7
+            insights.append(f"Last 7 days: {week * 100:.1f}% completion (30 days: {month * 100:.1f}%), "
+                            f"{minutes:.0f} focus minutes per day")
         return insights
 
     def generate_recommendations(self) -> List[str]:
@@ -60,4 +111,22 @@ class SuggestionGenerator:
         if pause_analysis["pause_impact"] > 0.2:
             recommendations.append("Minimize interruptions - your uninterrupted sessions are much more successful")
 
+        recommendations.extend(self.prediction_recommendations())
+        return recommendations
+
+    def prediction_recommendations(self, now: Optional[datetime] = None) -> List[str]:
+        if self.predictor is None or not self.predictor.is_trained:
+            return []
+        now = now or datetime.now()
+        chance_now = self.predictor.predict(now, self.planned_duration)
+        recommendations = [f"A session started now has a {chance_now * 100:.0f}% chance of completing"]
+
+        # Only hours the user actually works in are worth suggesting.
+        hours = [h for h in self.analyzer.analyze_time_of_day()["hour_stats"] if h > now.hour]
+        if hours:
+            chances = {h: self.predictor.predict(now.replace(hour=h), self.planned_duration) for h in hours}
+            best_hour = max(chances, key=chances.get)
+            if chances[best_hour] > chance_now + 0.05:
+                recommendations.append(f"Later today, {best_hour}:00 looks best ({chances[best_hour] * 100:.0f}% "
+                                       f"predicted completion)")
         return recommendations
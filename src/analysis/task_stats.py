@@ -0,0 +1,147 @@
+import argparse
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+@dataclass
+class TaskStats:
+    sessions: int = 0
+    completed: int = 0
+    total_seconds: int = 0
+    pause_count: int = 0
+    last_worked: Optional[datetime] = None
+
+    @property
+    def completion_rate(self) -> float:
+        return self.completed / self.sessions if self.sessions else 0.0
+
+    @property
+    def average_pauses(self) -> float:
+        return self.pause_count / self.sessions if self.sessions else 0.0
+
+
+class TaskStatsIndex:
+    # Per-task work session statistics keyed by task_id: O(1) to update and
+    # to look up. Built from the session log, so it is the reference for
+    # Task.total_seconds (see reconcile_tasks).
+    def __init__(self):
+        self._stats: Dict[str, TaskStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._stats
+
+    def get(self, task_id: str) -> Optional[TaskStats]:
+        return self._stats.get(task_id)
+
+    def items(self):
+        return self._stats.items()
+
+    def add(self, task_id: str, actual_duration: int, pause_count: int, completed: bool,
+            worked_at: datetime):
+        stats = self._stats.get(task_id)
+        if stats is None:
+            stats = self._stats[task_id] = TaskStats()
+        stats.sessions += 1
+        stats.completed += 1 if completed else 0
+        stats.total_seconds += actual_duration
+        stats.pause_count += pause_count
+        if stats.last_worked is None or worked_at > stats.last_worked:
+            stats.last_worked = worked_at
+
+    def merge(self, other: 'TaskStatsIndex'):
+        for task_id, theirs in other._stats.items():
+            mine = self._stats.get(task_id)
+            if mine is None:
+                mine = self._stats[task_id] = TaskStats()
+            mine.sessions += theirs.sessions
+            mine.completed += theirs.completed
+            mine.total_seconds += theirs.total_seconds
+            mine.pause_count += theirs.pause_count
+            if theirs.last_worked is not None and (mine.last_worked is None
+                                                   or theirs.last_worked > mine.last_worked):
+                mine.last_worked = theirs.last_worked
+
+    def to_dict(self) -> dict:
+        return {task_id: [s.sessions, s.completed, s.total_seconds, s.pause_count,
+                          s.last_worked.isoformat() if s.last_worked else None]
+                for task_id, s in self._stats.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TaskStatsIndex':
+        index = cls()
+        for task_id, (sessions, completed, total_seconds, pause_count, last_worked) in data.items():
+            index._stats[task_id] = TaskStats(
+                int(sessions), int(completed), int(total_seconds), int(pause_count),
+                datetime.fromisoformat(last_worked) if last_worked else None)
+        return index
+
+
+@dataclass
+class TaskDrift:
+    task_id: str
+    name: str
+    stored_seconds: int
+    logged_seconds: int
+
+    @property
+    def difference(self) -> int:
+        return self.stored_seconds - self.logged_seconds
+
+
+def find_drift(tasks, index: TaskStatsIndex) -> Iterator[TaskDrift]:
+    for task in tasks:
+        stats = index.get(task.task_id)
+        logged = stats.total_seconds if stats is not None else 0
+        if task.total_seconds != logged:
+            yield TaskDrift(task.task_id, task.name, task.total_seconds, logged)
+
+
+def reconcile_tasks(task_storage, index: TaskStatsIndex, apply: bool = False) -> List[TaskDrift]:
+    # Compares every task's stored total with the seconds logged against it
+    # and, with apply=True, rewrites the drifted totals in one bulk save.
+    # Clearing the history leaves tasks with no logged sessions, so their
+    # totals show up as drift too.
+    tasks = task_storage.load_tasks(include_completed=True)
+    drift = list(find_drift(tasks, index))
+    if apply and drift:
+        logged = {d.task_id: d.logged_seconds for d in drift}
+        updated = [t for t in tasks if t.task_id in logged]
+        for task in updated:
+            task.total_seconds = logged[task.task_id]
+        task_storage.save_tasks(updated)
+    return drift
+
+
+def main(argv=None):
+    from ..core.config import ConfigManager
+    from ..data.backends import create_storages
+    from .aggregates import AggregateStore
+
+    parser = argparse.ArgumentParser(description="Rebuild task totals from the session log")
+    parser.add_argument("--data-dir", type=Path, default=Path(__file__).parent.parent / 'data')
+    parser.add_argument("--apply", action="store_true", help="rewrite drifted task totals")
+    parser.add_argument("--workers", type=int, help="worker processes (default: from config)")
+    args = parser.parse_args(argv)
+
+    config = ConfigManager(args.data_dir / 'config.json').load()
+    storage, task_storage = create_storages(config, args.data_dir)
+    workers = args.workers if args.workers is not None else config.analysis_workers
+    index = AggregateStore(storage, args.data_dir / 'analytics.json', workers=workers).rebuild().tasks
+
+    drift = reconcile_tasks(task_storage, index, apply=args.apply)
+    for d in drift:
+        print(f"{d.task_id} {d.name!r}: stored {d.stored_seconds}s, logged {d.logged_seconds}s "
+              f"({d.difference:+d}s)")
+    action = "fixed" if args.apply else "found"
+    print(f"{len(index)} tasks in the log, {len(drift)} with drift {action}")
+    return 1 if drift and not args.apply else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
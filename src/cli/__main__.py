@@ -0,0 +1,221 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Quick actions without the window. Kept cheap to start: only argparse at
+# import time, each command imports what it needs, and nothing here may pull
+# in PySide6 (or NumPy/pandas/scikit-learn for anything but `stats` on a
+# large history). tests/test_cli_imports.py holds it to that.
+
+DEFAULT_DATA_DIR = Path(__file__).parent.parent / 'data'
+
+
+class CliError(Exception):
+    pass
+
+
+def connect(args, required: bool = False):
+    # A client for the control daemon, or None when none is listening.
+    from .rpc import RpcClient, default_address, format_address
+    address = args.address if args.address is not None else default_address(args.data_dir)
+    try:
+        return RpcClient(address, timeout=2.0)
+    except OSError:
+        if required:
+            raise CliError(f"no daemon is listening on {format_address(address)}; "
+                           f"start one with: python -m src.cli.daemon")
+        return None
+
+
+def format_seconds(seconds: float) -> str:
+    seconds = max(0, int(seconds))
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def format_status(phase: str, remaining: float, running: bool, started: bool, cycle: int,
+                  task: str = None) -> str:
+    state = "running" if running else "paused" if started else "not started"
+    line = f"{phase.replace('_', ' ')}: {format_seconds(remaining)} left, {state}"
+    line += f" ({cycle} work session{'s' if cycle != 1 else ''} this cycle)"
+    if task:
+        line += f"\ntask: {task}"
+    return line
+
+
+def cmd_status(args) -> int:
+    client = connect(args)
+    if client is not None:
+        with client:
+            status = client.call("timer.status")
+        task = status["task"]["name"] if status["task"] else None
+        print("daemon " + format_status(status["phase"], status["remaining"], status["running"],
+                                        status["session_start"] is not None,
+                                        status["completed_work_sessions"], task))
+        return 0
+
+    # No daemon: the window's timer as it last journaled itself.
+    import time
+    from ..data.journal import TimerJournal
+    record = TimerJournal(args.data_dir / 'timer.journal').last_record()
+    if record is None:
+        print("no timer has run yet")
+        return 0
+    task = None
+    if record.task_id is not None:
+        task = stores(args)[1].get_task(record.task_id)
+    print("app " + format_status(record.phase, record.remaining_at(time.time()), record.running,
+                                 record.session_start is not None, record.completed_work_sessions,
+                                 task.name if task else None))
+    return 0
+
+
+def cmd_start(args) -> int:
+    with connect(args, required=True) as client:
+        task_id = None
+        if args.task is not None:
+            task_id = find_task(client.call("tasks.list"), args.task)["task_id"]
+        from .rpc import RpcError
+        try:
+            status = client.call("timer.start", task_id=task_id)
+        except RpcError as e:
+            raise CliError(e.message)
+    task = status["task"]["name"] if status["task"] else None
+    print("daemon " + format_status(status["phase"], status["remaining"], status["running"],
+                                    status["session_start"] is not None,
+                                    status["completed_work_sessions"], task))
+    return 0
+
+
+def find_task(tasks: list, query: str) -> dict:
+    # By id, then by name ignoring case, then by a unique name prefix.
+    for task in tasks:
+        if task["task_id"] == query:
+            return task
+    folded = query.casefold()
+    named = [t for t in tasks if t["name"].casefold() == folded]
+    if not named:
+        named = [t for t in tasks if t["name"].casefold().startswith(folded)]
+    if len(named) == 1:
+        return named[0]
+    if not named:
+        raise CliError(f"no open task matches {query!r}")
+    raise CliError(f"{query!r} matches {len(named)} tasks: " + ", ".join(t["name"] for t in named))
+
+
+def cmd_log(args) -> int:
+    sessions = list(history(args).iter_sessions(since=args.since, reverse=True, limit=args.limit))
+    sessions.reverse()
+    for session in sessions:
+        status = "completed" if session.was_completed else "skipped" if session.was_skipped else "stopped"
+        minutes = session.actual_duration / 60
+        task = f"  {session.task_name}" if session.task_name else ""
+        print(f"{session.start_time:%Y-%m-%d %H:%M}  {session.session_type:<11}  {status:<9}  "
+              f"{minutes:5.1f} min{task}")
+    if not sessions:
+        print("no sessions")
+    return 0
+
+
+def cmd_stats(args) -> int:
+    from datetime import date
+    if args.archive is not None:
+        # Scanned as NumPy columns over the archive's memory map, without
+        # building a SessionData per record.
+        from ..analysis.columnar import ColumnarFocusAnalyzer
+        from ..core.session_table import datetime_to_us
+        records = history(args).records()
+        if args.since is not None:
+            records = records[records['start_us'] >= datetime_to_us(args.since)]
+        analyzer = ColumnarFocusAnalyzer.from_records(records)
+        total = len(records)
+    else:
+        from ..analysis.analyzer import create_analyzer
+        sessions = list(stores(args)[0].iter_sessions(since=args.since))
+        analyzer = create_analyzer(sessions)
+        total = len(sessions)
+    work = analyzer.work_session_count
+    scope = f"since {args.since:%Y-%m-%d}" if args.since is not None else "all time"
+    print(f"{scope}: {total} sessions, {work} work")
+    if not work:
+        return 0
+    durations = analyzer.analyze_duration_patterns()
+    # Padded up to today, so a streak that has lapsed reads 0.
+    windows = analyzer.analyze_rolling_windows(today=date.today())
+    best_hour = analyzer.analyze_time_of_day()["best_hour"]
+    print(f"completion rate: {analyzer.calculate_completion_rate() * 100:.0f}%")
+    print(f"focus: {sum(windows['focus_minutes']) / 60:.1f} h, "
+          f"{durations['average_duration'] / 60:.1f} min per work session")
+    if best_hour is not None:
+        print(f"best hour: {best_hour:02d}:00")
+    print(f"streak: {windows['current_streak']} days (longest {windows['longest_streak']})")
+    return 0
+
+
+def stores(args):
+    # Read-only: a quick look never creates, migrates or imports anything,
+    # and a data dir without history just has no sessions.
+    from ..core.config import ConfigManager, PomodoroConfig
+    from ..data.backends import create_storages
+    config_path = args.data_dir / 'config.json'
+    config = ConfigManager(config_path).load() if config_path.exists() else PomodoroConfig()
+    return create_storages(config, args.data_dir, read_only=True)
+
+
+def history(args):
+    # The session store to read: --archive if given, else the data dir's.
+    if args.archive is None:
+        return stores(args)[0]
+    from ..data.archive import SessionArchive
+    if not args.archive.exists():
+        raise CliError(f"no session archive at {args.archive}")
+    try:
+        return SessionArchive(args.archive, read_only=True)
+    except ValueError as e:
+        raise CliError(str(e))
+
+
+def parse_since(text: str):
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date: {text!r}")
+
+
+def parse_address(text: str):
+    from .rpc import parse_address
+    return parse_address(text)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Pomodoro quick actions")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="data directory (default: the app's)")
+    parser.add_argument("--address", type=parse_address, help="control daemon socket path or host:port")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="show the timer (the daemon's if one is running, else the app's)")
+
+    start = commands.add_parser("start", help="start or resume the daemon's timer")
+    start.add_argument("task", nargs="?", help="task id, name or unique name prefix for a new work session")
+
+    log = commands.add_parser("log", help="list recent sessions")
+    log.add_argument("-n", "--limit", type=int, default=20)
+    log.add_argument("--since", type=parse_since, help="only sessions started on or after this date")
+    log.add_argument("--archive", type=Path, help="read sessions from this .psar archive instead")
+
+    stats = commands.add_parser("stats", help="summarize sessions")
+    stats.add_argument("--since", type=parse_since, help="only sessions started on or after this date")
+    stats.add_argument("--archive", type=Path, help="read sessions from this .psar archive instead")
+
+    args = parser.parse_args(argv)
+    handlers = {"status": cmd_status, "start": cmd_start, "log": cmd_log, "stats": cmd_stats}
+    try:
+        return handlers[args.command](args)
+    except CliError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Headless: nothing imported here (or in the worker processes) may pull in
+# PySide6, so this runs on machines without a display or Qt installed.
+from ..analysis.aggregates import FocusAggregates
+from ..analysis.parallel import resolve_workers
+from ..analysis.task_stats import find_drift
+from ..core.config import ConfigManager
+from ..core.task import Task
+from ..data.migrations import iter_session_records
+
+# Session stores in the order create_storages() prefers them.
+SESSION_STORES = ('sessions.jsonl', 'sessions.json')
+SQLITE_STORE = 'pomodoro.db'
+# Profiles handed to a worker at a time; most profiles are small, so this
+# amortizes the pickling round trip.
+PROFILES_PER_CHUNK = 16
+
+
+@dataclass
+class ProfileReport:
+    profile: str
+    sessions: int = 0
+    work_sessions: int = 0
+    completion_rate: float = 0.0
+    best_hour: Optional[int] = None
+    tasks: int = 0
+    open_tasks: int = 0
+    drifted_tasks: int = 0
+    error: Optional[str] = None
+
+
+def find_profiles(root: Path) -> List[Path]:
+    # Every directory under root holding a session store, sorted so reports
+    # are stable across runs.
+    profiles = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        names = set(filenames)
+        if SQLITE_STORE in names or any(name in names for name in SESSION_STORES):
+            profiles.append(Path(dirpath))
+        dirnames.sort()
+    profiles.sort()
+    return profiles
+
+
+def session_store(profile: Path) -> Optional[Path]:
+    config = ConfigManager(profile / 'config.json').load()
+    if config.storage_backend == 'sqlite' and (profile / SQLITE_STORE).exists():
+        return profile / SQLITE_STORE
+    for name in SESSION_STORES:
+        if (profile / name).exists():
+            return profile / name
+    return None
+
+
+def load_tasks(profile: Path) -> List[Task]:
+    try:
+        with open(profile / 'tasks.json', 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [Task.from_dict(t) for t in data.get("tasks", [])]
+
+
+def analyze_profile(profile: Path, root: Path) -> Tuple[ProfileReport, Optional[FocusAggregates]]:
+    # Worker entry point. Files are only read, never migrated; a profile
+    # that fails to parse is reported instead of aborting the batch.
+    report = ProfileReport(str(profile.relative_to(root)) if profile != root else '.')
+    try:
+        aggregates = FocusAggregates()
+        store = session_store(profile)
+        if store is not None:
+            for record in iter_session_records(store):
+                aggregates.add_record(record)
+        tasks = load_tasks(profile)
+    except Exception as e:
+        report.error = f"{type(e).__name__}: {e}"
+        return report, None
+
+    report.sessions = aggregates.session_count
+    report.work_sessions = aggregates.work_count
+    report.completion_rate = aggregates.calculate_completion_rate()
+    report.best_hour = aggregates.analyze_time_of_day()["best_hour"]
+    report.tasks = len(tasks)
+    report.open_tasks = sum(1 for t in tasks if not t.is_completed)
+    report.drifted_tasks = sum(1 for _ in find_drift(tasks, aggregates.tasks))
+    return report, aggregates
+
+
+def _analyze_chunk(profiles: List[Path], root: Path) -> List[Tuple[ProfileReport, Optional[FocusAggregates]]]:
+    return [analyze_profile(profile, root) for profile in profiles]
+
+
+def _chunks(items: List[Path], size: int) -> Iterator[List[Path]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def analyze_profiles(profiles: List[Path], root: Path,
+                     workers: int = 0) -> Iterator[Tuple[ProfileReport, Optional[FocusAggregates]]]:
+    # (report, aggregates) per profile, in the order given.
+    workers = resolve_workers(workers)
+    chunks = list(_chunks(profiles, PROFILES_PER_CHUNK))
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _analyze_chunk(chunk, root)
+        return
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+        for results in pool.map(_analyze_chunk, chunks, [root] * len(chunks)):
+            yield from results
+
+
+def team_report(results: Iterable[Tuple[ProfileReport, Optional[FocusAggregates]]]) -> dict:
+    # Merges the per-profile aggregates into team-wide FocusAnalyzer results.
+    team = FocusAggregates()
+    profiles = []
+    for report, aggregates in results:
+        profiles.append(report)
+        if aggregates is not None:
+            team.merge(aggregates)
+    return {
+        "profiles": [asdict(p) for p in profiles],
+        "failed": sum(1 for p in profiles if p.error is not None),
+        "team": {
+            "sessions": team.session_count,
+            "work_sessions": team.work_count,
+            "completion_rate": team.calculate_completion_rate(),
+            "time_of_day": team.analyze_time_of_day(),
+            "weekly_pattern": team.analyze_weekly_pattern(),
+            "pause_patterns": team.analyze_pause_patterns(),
+            "duration_patterns": team.analyze_duration_patterns(),
+            "quantiles": team.analyze_quantiles(),
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    team = report["team"]
+    pauses = team["pause_patterns"]
+    lengths = team["quantiles"]["overall"]["duration"]
+    lines = [
+        f"Profiles: {len(report['profiles'])} ({report['failed']} failed)",
+        f"Sessions: {team['sessions']} ({team['work_sessions']} work)",
+        f"Team completion rate: {team['completion_rate']:.1%}",
+        f"Best hour: {_hour(team['time_of_day']['best_hour'])}",
+        f"Average pauses per session: {pauses['average_pauses']:.2f}",
+        "Work session length p50/p90/p99: " + " / ".join(_minutes(lengths[q]) for q in ("p50", "p90", "p99")),
+        "",
+        f"{'profile':<32} {'sessions':>9} {'work':>8} {'done':>6} {'best':>6} {'tasks':>6} {'drift':>6}",
+    ]
+    for p in report["profiles"]:
+        if p["error"] is not None:
+            lines.append(f"{p['profile']:<32} error: {p['error']}")
+            continue
+        lines.append(f"{p['profile']:<32} {p['sessions']:>9} {p['work_sessions']:>8} "
+                     f"{p['completion_rate']:>6.0%} {_hour(p['best_hour']):>6} {p['tasks']:>6} "
+                     f"{p['drifted_tasks']:>6}")
+    return "\n".join(lines)
+
+
+def _hour(hour: Optional[int]) -> str:
+    return f"{hour}:00" if hour is not None else "-"
+
+
+def _minutes(seconds: Optional[int]) -> str:
+    return f"{seconds / 60:.1f}m" if seconds is not None else "-"
+
+
+def _json_keys(value):
+    # Analysis tables are keyed by int hour/weekday; JSON wants strings.
+    if isinstance(value, dict):
+        return {str(k): _json_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_keys(v) for v in value]
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many collected profile directories")
+    parser.add_argument("root", type=Path, help="directory tree holding one data directory per profile")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: one per core)")
+    parser.add_argument("--json", type=Path, help="also write the full report to this file")
+    parser.add_argument("--quiet", action="store_true", help="print only the team summary")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    profiles = find_profiles(args.root)
+    report = team_report(analyze_profiles(profiles, args.root, args.workers))
+    elapsed = time.perf_counter() - started
+
+    text = format_report(report)
+    if args.quiet:
+        text = text.split("\n\n", 1)[0]
+    print(text)
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(_json_keys(report), f, indent=2, ensure_ascii=False)
+    rate = len(profiles) / elapsed if elapsed > 0 else 0.0
+    print(f"{len(profiles)} profiles in {elapsed:.2f}s ({rate:.1f} profiles/s, "
+          f"{resolve_workers(args.workers)} workers)", file=sys.stderr)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
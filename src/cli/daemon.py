@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import signal
+import socket
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+# Headless like batch.py: no PySide6 here.
+from ..core.config import ConfigManager
+from ..core.session import SessionData
+from ..core.task import Task
+from ..core.timer_engine import TimerEngine
+from ..data.backends import create_storages
+from ..data.journal import TimerJournal
+from ..data.writer import PersistenceWriter
+from .rpc import (INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, MAX_MESSAGE, METHOD_NOT_FOUND,
+                  PARSE_ERROR, SERVER_ERROR, Address, RpcError, default_address, encode,
+                  format_address, parse_address)
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ("time_updated", "phase_changed", "session_completed")
+# Events are dropped for a subscriber whose unsent output passes this, so a
+# client that stops reading cannot grow the daemon's memory.
+SUBSCRIBER_BUFFER_LIMIT = 256 * 1024
+
+
+class _Connection:
+    __slots__ = ('writer', 'events', 'dropped')
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.events: Set[str] = set()
+        self.dropped = 0
+
+
+class ControlDaemon:
+    # Serves one timer and the task and session stores to local clients over
+    # newline-delimited JSON-RPC 2.0 (see rpc.py). Connections stay open for
+    # any number of requests; requests on one connection are answered in
+    # order. Clients that subscribe get timer events pushed as notifications.
+    # Nobody subscribed to time_updated means the timer is treated as hidden
+    # and only wakes up at phase ends.
+    def __init__(self, data_dir: Optional[Path] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        if data_dir is None:
+            data_dir = Path(__file__).parent.parent / 'data'
+        self.data_dir = data_dir
+        self.writer = PersistenceWriter()
+        self.config = ConfigManager(data_dir / 'config.json', writer=self.writer).load()
+        self.storage, self.task_storage = create_storages(self.config, data_dir, writer=self.writer)
+        self.engine = TimerEngine(loop)
+        self.timer = self.engine.create_timer(self.config, 'main')
+        self.timer.set_display_visible(False)
+        self.current_task: Optional[Task] = None
+        self.connections: Set[_Connection] = set()
+        self.subscribers: Dict[str, Set[_Connection]] = {event: set() for event in EVENTS}
+        self.requests = 0
+        # (generation, count): counting a JSONL log reads all of it.
+        self._session_count = (None, 0)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.address: Optional[Address] = None
+
+        self.timer.time_updated.connect(lambda remaining: self._publish("time_updated", {"remaining": remaining}))
+        self.timer.phase_changed.connect(
+            lambda phase: self._publish("phase_changed", {"phase": phase, "total": self.timer.total_seconds}))
+        self.timer.session_completed.connect(self._on_session_completed)
+
+        # Its own journal: the window and the daemon are separate timers.
+        self.journal = TimerJournal(data_dir / 'daemon.journal')
+        record = self.journal.last_record()
+        if record is not None:
+            if record.task_id is not None:
+                self.current_task = self.task_storage.get_task(record.task_id)
+            self.journal.restore(self.timer, record)
+            self.journal.compact()
+        self.journal.attach(self.timer, lambda: self.current_task.task_id if self.current_task else None)
+
+        self.methods: Dict[str, Callable] = {
+            "timer.status": self.timer_status,
+            "timer.start": self.timer_start,
+            "timer.pause": self.timer_pause,
+            "timer.skip": self.timer_skip,
+            "timer.reset": self.timer_reset,
+            "tasks.list": self.tasks_list,
+            "tasks.get": self.tasks_get,
+            "tasks.create": self.tasks_create,
+            "tasks.update": self.tasks_update,
+            "tasks.delete": self.tasks_delete,
+            "sessions.list": self.sessions_list,
+            "sessions.count": self.sessions_count,
+            "subscribe": self.subscribe,
+            "unsubscribe": self.unsubscribe,
+        }
+        self._signatures = {name: inspect.signature(method) for name, method in self.methods.items()}
+
+    async def start(self, address: Optional[Address] = None):
+        if address is None:
+            address = default_address(self.data_dir)
+        if isinstance(address, tuple):
+            self.server = await asyncio.start_server(self._serve, address[0], address[1], limit=MAX_MESSAGE)
+            address = self.server.sockets[0].getsockname()[:2]
+        else:
+            _remove_stale_socket(address)
+            self.server = await asyncio.start_unix_server(self._serve, str(address), limit=MAX_MESSAGE)
+        self.address = address
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for connection in list(self.connections):
+                connection.writer.close()
+            await self.server.wait_closed()
+            if not isinstance(self.address, tuple):
+                _remove_stale_socket(self.address)
+            self.server = None
+        self.engine.close()
+        self.journal.close()
+        self.writer.close()
+
+    # Timer
+
+    def timer_status(self) -> dict:
+        session = self.timer.current_session
+        return {
+            "phase": self.timer.current_phase,
+            "remaining": self.timer.remaining_seconds,
+            "total": self.timer.total_seconds,
+            "running": self.timer.is_running,
+            "completed_work_sessions": self.timer.completed_work_sessions,
+            "pause_count": self.timer.pause_count,
+            "session_start": session.start_time.isoformat() if session is not None else None,
+            "task": _task_dict(self.current_task),
+        }
+
+    def timer_start(self, task_id: Optional[str] = None) -> dict:
+        if task_id is not None:
+            if self.timer.current_session is not None or self.timer.current_phase != "work":
+                raise RpcError(SERVER_ERROR, "a task can only be chosen before a work session starts")
+            self.current_task = self._get_task(task_id)
+        self.timer.start()
+        return self.timer_status()
+
+    def timer_pause(self) -> dict:
+        self.timer.pause()
+        return self.timer_status()
+
+    def timer_skip(self) -> dict:
+        self.timer.skip()
+        return self.timer_status()
+
+    def timer_reset(self) -> dict:
+        self.timer.reset()
+        self.current_task = None
+        return self.timer_status()
+
+    def _on_session_completed(self, session: SessionData):
+        # Same bookkeeping as the window's on_session_completed.
+        if self.current_task and session.session_type == "work":
+            session.task_id = self.current_task.task_id
+            session.task_name = self.current_task.name
+            self.current_task.add_session(session.actual_duration)
+            self.task_storage.save_task(self.current_task)
+            self.current_task = None
+        self.storage.save_session(session)
+        self._publish("session_completed", session.to_dict())
+
+    # Tasks
+
+    def tasks_list(self, include_completed: bool = False) -> list:
+        return [_task_dict(task) for task in self.task_storage.load_tasks(include_completed)]
+
+    def tasks_get(self, task_id: str) -> dict:
+        return _task_dict(self._get_task(task_id))
+
+    def tasks_create(self, name: str, target_minutes: int) -> dict:
+        task = Task.create(_check(name, str, "name"), _check(target_minutes, int, "target_minutes"))
+        self.task_storage.save_task(task)
+        return _task_dict(task)
+
+    def tasks_update(self, task_id: str, name: Optional[str] = None, target_minutes: Optional[int] = None,
+                     completed: Optional[bool] = None) -> dict:
+        task = self._get_task(task_id)
+        if name is not None:
+            task.name = _check(name, str, "name")
+        if target_minutes is not None:
+            task.target_seconds = _check(target_minutes, int, "target_minutes") * 60
+        if completed is not None and _check(completed, bool, "completed") != task.is_completed:
+            if completed:
+                task.mark_completed()
+            else:
+                task.is_completed = False
+                task.completed_at = None
+        self.task_storage.save_task(task)
+        if self.current_task is not None and self.current_task.task_id == task_id:
+            self.current_task = task
+        return _task_dict(task)
+
+    def tasks_delete(self, task_id: str) -> bool:
+        self._get_task(task_id)
+        self.task_storage.delete_task(task_id)
+        return True
+
+    def _get_task(self, task_id: str) -> Task:
+        task = self.task_storage.get_task(_check(task_id, str, "task_id"))
+        if task is None:
+            raise RpcError(SERVER_ERROR, f"no task {task_id!r}")
+        return task
+
+    # Sessions
+
+    def sessions_list(self, since: Optional[str] = None, until: Optional[str] = None,
+                      session_type: Optional[str] = None, reverse: bool = True, limit: int = 100) -> list:
+        # Newest first by default; since/until are ISO dates or datetimes on
+        # start_time, since inclusive and until exclusive.
+        sessions = self.storage.iter_sessions(since=_parse_time(since, "since"), until=_parse_time(until, "until"),
+                                              session_type=session_type, reverse=reverse,
+                                              limit=_check(limit, int, "limit"))
+        return [session.to_dict() for session in sessions]
+
+    def sessions_count(self) -> int:
+        generation = self.storage.generation()
+        if self._session_count[0] != generation:
+            self._session_count = (generation, self.storage.count_sessions())
+        return self._session_count[1]
+
+    # Subscriptions (connection-scoped; the daemon passes the connection in)
+
+    def subscribe(self, connection: _Connection, events: Optional[list] = None) -> list:
+        for event in _check_events(events):
+            connection.events.add(event)
+            self.subscribers[event].add(connection)
+        self._update_visibility()
+        return sorted(connection.events)
+
+    def unsubscribe(self, connection: _Connection, events: Optional[list] = None) -> list:
+        for event in _check_events(events):
+            connection.events.discard(event)
+            self.subscribers[event].discard(connection)
+        self._update_visibility()
+        return sorted(connection.events)
+
+    def _update_visibility(self):
+        self.timer.set_display_visible(bool(self.subscribers["time_updated"]))
+
+    def _publish(self, event: str, params: dict):
+        subscribers = self.subscribers[event]
+        if not subscribers:
+            return
+        data = encode({"jsonrpc": "2.0", "method": event, "params": params})
+        for connection in subscribers:
+            transport = connection.writer.transport
+            if transport.is_closing() or transport.get_write_buffer_size() > SUBSCRIBER_BUFFER_LIMIT:
+                connection.dropped += 1
+                continue
+            connection.writer.write(data)
+
+    # Protocol
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = _Connection(writer)
+        self.connections.add(connection)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(encode(_error_response(None, RpcError(INVALID_REQUEST, "message too long"))))
+                    break
+                if not line:
+                    break
+                response = self.handle_message(line, connection)
+                if response is not None:
+                    writer.write(response)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(connection)
+            for event in connection.events:
+                self.subscribers[event].discard(connection)
+            self._update_visibility()
+            writer.close()
+
+    def handle_message(self, line: bytes, connection: Optional[_Connection] = None) -> Optional[bytes]:
+        # One line in, the encoded response line out (None for notifications).
+        if not line.strip():
+            return None
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return encode(_error_response(None, RpcError(PARSE_ERROR, "invalid JSON")))
+        if isinstance(message, list):
+            if not message:
+                return encode(_error_response(None, RpcError(INVALID_REQUEST, "empty batch")))
+            responses = [r for r in (self._dispatch(m, connection) for m in message) if r is not None]
+            return encode(responses) if responses else None
+        response = self._dispatch(message, connection)
+        return encode(response) if response is not None else None
+
+    def _dispatch(self, message: Any, connection: Optional[_Connection]) -> Optional[dict]:
+        self.requests += 1
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" \
+                or not isinstance(message.get("method"), str):
+            return _error_response(message.get("id") if isinstance(message, dict) else None,
+                                   RpcError(INVALID_REQUEST, "not a JSON-RPC 2.0 request"))
+        request_id = message.get("id")
+        # A notification is never answered, not even with an error.
+        notification = "id" not in message
+        try:
+            result = self._call(message["method"], message.get("params"), connection)
+        except RpcError as e:
+            return None if notification else _error_response(request_id, e)
+        except Exception:
+            logger.exception("%s failed", message["method"])
+            if notification:
+                return None
+            return _error_response(request_id, RpcError(INTERNAL_ERROR, "internal error"))
+        if notification:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _call(self, name: str, params: Any, connection: Optional[_Connection]) -> Any:
+        method = self.methods.get(name)
+        if method is None:
+            raise RpcError(METHOD_NOT_FOUND, f"unknown method {name!r}")
+        args, kwargs = [], {}
+        if isinstance(params, list):
+            args = params
+        elif isinstance(params, dict):
+            kwargs = params
+        elif params is not None:
+            raise RpcError(INVALID_REQUEST, "params must be an array or an object")
+        if name in ("subscribe", "unsubscribe"):
+            if connection is None:
+                raise RpcError(SERVER_ERROR, f"{name} needs a connection")
+            args = [connection, *args]
+        try:
+            self._signatures[name].bind(*args, **kwargs)
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        return method(*args, **kwargs)
+
+
+def _error_response(request_id: Any, error: RpcError) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": error.to_dict()}
+
+
+def _check(value: Any, kind: type, name: str) -> Any:
+    # bool is an int subclass; an int parameter should not accept true.
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise RpcError(INVALID_PARAMS, f"{name} must be {kind.__name__}")
+    return value
+
+
+def _check_events(events: Optional[list]) -> list:
+    if events is None:
+        return list(EVENTS)
+    if not isinstance(events, list) or any(event not in EVENTS for event in events):
+        raise RpcError(INVALID_PARAMS, f"events must be a list of {', '.join(EVENTS)}")
+    return events
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(_check(value, str, name))
+    except ValueError:
+        raise RpcError(INVALID_PARAMS, f"{name} must be an ISO date or datetime")
+
+
+def _task_dict(task: Optional[Task]) -> Optional[dict]:
+    if task is None:
+        return None
+    data = task.to_dict()
+    data["progress"] = task.get_progress()
+    return data
+
+
+def _remove_stale_socket(path: Path):
+    # A socket file left by a daemon that died is removed; one that still
+    # accepts connections belongs to a running daemon.
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+    else:
+        raise RuntimeError(f"a daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+async def serve(data_dir: Optional[Path], address: Optional[Address]):
+    daemon = ControlDaemon(data_dir)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass
+    try:
+        await daemon.start(address)
+        print(f"Listening on {format_address(daemon.address)}", file=sys.stderr, flush=True)
+        await stop.wait()
+    finally:
+        await daemon.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the timer, tasks and sessions to local clients")
+    parser.add_argument("--data-dir", type=Path, help="data directory (default: the app's)")
+    parser.add_argument("--listen", type=parse_address,
+                        help="socket path, or host:port for TCP (default: control.sock in the data dir)")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.data_dir, args.listen))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
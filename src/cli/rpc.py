@@ -0,0 +1,115 @@
+import json
+import socket
+from itertools import count
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+# Newline-delimited JSON-RPC 2.0: one message per line, in both directions,
+# over a Unix socket or a loopback TCP port. Events the daemon pushes are
+# notifications (no "id").
+DEFAULT_PORT = 7345
+SOCKET_NAME = 'control.sock'
+# Longest message line either side accepts.
+MAX_MESSAGE = 1024 * 1024
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+# Application errors (unknown task, session already running, ...).
+SERVER_ERROR = -32000
+
+Address = Union[Path, Tuple[str, int]]
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> dict:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def default_address(data_dir: Optional[Path] = None) -> Address:
+    if data_dir is None:
+        data_dir = Path(__file__).parent.parent / 'data'
+    if hasattr(socket, 'AF_UNIX'):
+        return data_dir / SOCKET_NAME
+    return ('127.0.0.1', DEFAULT_PORT)
+
+
+def parse_address(text: str) -> Address:
+    # "host:port" or ":port" is TCP, anything else a socket path.
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return Path(text)
+
+
+def format_address(address: Address) -> str:
+    if isinstance(address, tuple):
+        return f"{address[0]}:{address[1]}"
+    return str(address)
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class RpcClient:
+    # Blocking client for scripts: one connection, kept open across calls.
+    # Notifications that arrive while waiting for a response are kept in
+    # `notifications`.
+    def __init__(self, address: Optional[Address] = None, timeout: Optional[float] = 5.0):
+        self.address = default_address() if address is None else address
+        if isinstance(self.address, tuple):
+            self.sock = socket.create_connection(self.address, timeout=timeout)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            try:
+                self.sock.connect(str(self.address))
+            except OSError:
+                self.sock.close()
+                raise
+        self.file = self.sock.makefile('rb')
+        self.notifications: List[dict] = []
+        self._ids = count(1)
+
+    def call(self, method: str, **params) -> Any:
+        request_id = next(self._ids)
+        self.sock.sendall(encode({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        while True:
+            message = self.receive()
+            if message is None:
+                raise ConnectionError("connection closed by the daemon")
+            if "id" not in message:
+                self.notifications.append(message)
+            elif message["id"] == request_id:
+                if "error" in message:
+                    error = message["error"]
+                    raise RpcError(error["code"], error["message"], error.get("data"))
+                return message.get("result")
+
+    def receive(self) -> Optional[dict]:
+        line = self.file.readline(MAX_MESSAGE)
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,7 +1,14 @@
 import json
-from dataclasses import dataclass, asdict
+import logging
+from dataclasses import dataclass, asdict, fields
 from pathlib import Path
 from typing import Optional
+from .fileio import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Version written to config.json; data.migrations upgrades older files.
+CONFIG_VERSION = 2
 
 @dataclass
 class PomodoroConfig:
@@ -9,19 +16,35 @@ class PomodoroConfig:
     short_break: int = 5
     long_break: int = 15
     sessions_before_long_break: int = 4
+    storage_backend: str = "json"
+    # Worker processes for full-history analysis passes; 0 = one per core.
+    analysis_workers: int = 0
 
     def to_dict(self) -> dict:
         return asdict(self)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'PomodoroConfig':
-        return cls(**data)
+        # Unknown keys (including "version") are ignored and a value of the
+        # wrong type falls back to that field's default only, not the whole
+        # config.
+        kwargs = {}
+        for field in fields(cls):
+            if field.name not in data:
+                continue
+            value = data[field.name]
+            if type(value) is not type(field.default):
+                logger.warning("Ignoring invalid config value %s=%r", field.name, value)
+                continue
+            kwargs[field.name] = value
+        return cls(**kwargs)
     
 class ConfigManager:
-    def __init__(self, config_path: Optional[Path] = None):
+    def __init__(self, config_path: Optional[Path] = None, writer=None):
         if config_path is None:
             config_path = Path(__file__).parent.parent / 'data' / 'config.json'
         self.config_path = config_path
+        self.writer = writer
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
 
     def load(self) -> PomodoroConfig:
@@ -31,12 +54,22 @@ class ConfigManager:
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return PomodoroConfig.from_dict(data)
-        except (json.JSONDecodeError, KeyError, TypeError):
+        except json.JSONDecodeError as e:
+            logger.warning("Could not read %s, using defaults: %s", self.config_path, e)
+            return PomodoroConfig()
+        if not isinstance(data, dict):
+            logger.warning("Could not read %s, using defaults", self.config_path)
             return PomodoroConfig()
+        if data.get("version", 1) > CONFIG_VERSION:
+            logger.warning("%s was written by a newer version", self.config_path)
+        return PomodoroConfig.from_dict(data)
 
     def save(self, config: PomodoroConfig):
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(config.to_dict(), f, indent=2, ensure_ascii=False)
+        payload = {"version": CONFIG_VERSION, **config.to_dict()}
+        data = json.dumps(payload, indent=2, ensure_ascii=False).encode('utf-8')
+        if self.writer is not None:
+            self.writer.submit_replace(self.config_path, data)
+        else:
+            atomic_write(self.config_path, data)
             
                 
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rebuild the heap once stale entries outnumber live ones by this factor.
+COMPACT_RATIO = 2
+COMPACT_MIN = 64
+
+
+class TimerScheduler:
+    # Serves the wakeups of many PomodoroStateMachines from one min-heap of
+    # (time, sequence, machine) entries, so the host needs a single wakeup
+    # source, armed for the earliest entry. A machine has at most one live
+    # entry: rescheduling pushes a new one and pause/reset/skip just forget
+    # the old one (lazy deletion), so every operation is O(log n).
+    # With `coalesce` > 0 the source is armed that much after the earliest
+    # entry and everything due by then runs in one wakeup; display updates
+    # are that much late, phase ends are still recorded at their deadline.
+    # A driver sets on_rearm and calls run_due() at the time it is given.
+    def __init__(self, clock: Callable[[], float] = time.monotonic, coalesce: float = 0.0):
+        self.clock = clock
+        self.coalesce = coalesce
+        self.on_rearm: Optional[Callable[[Optional[float]], None]] = None
+        # Host wakeups and the machine wakeups they dispatched.
+        self.wakeups = 0
+        self.dispatched = 0
+        self._heap: List[Tuple[float, int, object]] = []
+        # machine -> (sequence, time) of its live entry
+        self._live: Dict[object, Tuple[int, float]] = {}
+        self._callbacks: Dict[object, Callable] = {}
+        self._sequence = 0
+        self._armed: Optional[float] = None
+        self._dispatching = False
+
+    def __len__(self) -> int:
+        return len(self._callbacks)
+
+    @property
+    def pending(self) -> int:
+        return len(self._live)
+
+    def add(self, machine):
+        if machine in self._callbacks:
+            return
+        callback = self._callbacks[machine] = lambda when: self._set(machine, when)
+        machine.wakeup_changed.connect(callback)
+        if machine.is_running:
+            self._set(machine, self.clock())
+
+    def remove(self, machine):
+        callback = self._callbacks.pop(machine, None)
+        if callback is not None:
+            machine.wakeup_changed.disconnect(callback)
+            self._set(machine, None)
+
+    def next_wakeup(self) -> Optional[float]:
+        heap = self._heap
+        while heap and self._live.get(heap[0][2], (None,))[0] != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        # Wakes every machine whose entry is due; returns how many.
+        if now is None:
+            now = self.clock()
+        self.wakeups += 1
+        # Whatever was armed has fired (or fired early).
+        self._armed = None
+        heap, live = self._heap, self._live
+        count = 0
+        self._dispatching = True
+        try:
+            while heap and heap[0][0] <= now:
+                when, sequence, machine = heapq.heappop(heap)
+                if live.get(machine, (None,))[0] != sequence:
+                    continue
+                del live[machine]
+                count += 1
+                machine.wake()
+        finally:
+            self._dispatching = False
+            self.dispatched += count
+            self._rearm()
+        return count
+
+    def _set(self, machine, when: Optional[float]):
+        if when is None:
+            self._live.pop(machine, None)
+        else:
+            self._sequence += 1
+            self._live[machine] = (self._sequence, when)
+            heapq.heappush(self._heap, (when, self._sequence, machine))
+        self._compact()
+        if not self._dispatching:
+            self._rearm()
+
+    def _compact(self):
+        if len(self._heap) > COMPACT_RATIO * len(self._live) + COMPACT_MIN:
+            self._heap = [(when, sequence, machine) for machine, (sequence, when) in self._live.items()]
+            heapq.heapify(self._heap)
+
+    def _rearm(self):
+        head = self.next_wakeup()
+        target = head + self.coalesce if head is not None else None
+        if target != self._armed:
+            self._armed = target
+            if self.on_rearm is not None:
+                self.on_rearm(target)
+
+
+class AsyncioSchedulerDriver:
+    # Runs a TimerScheduler on an asyncio loop with one pending handle. The
+    # scheduler must use the loop's clock.
+    def __init__(self, scheduler: TimerScheduler, loop: asyncio.AbstractEventLoop):
+        self.scheduler = scheduler
+        self.loop = loop
+        self._handle: Optional[asyncio.TimerHandle] = None
+        scheduler.on_rearm = self._arm
+
+    def close(self):
+        self.scheduler.on_rearm = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _arm(self, when: Optional[float]):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if when is not None:
+            self._handle = self.loop.call_at(when, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        self.scheduler.run_due()
@@ -0,0 +1,185 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .session import SessionData
+
+EPOCH = datetime(1970, 1, 1)
+ONE_US = timedelta(microseconds=1)
+US_PER_SECOND = 1_000_000
+US_PER_DAY = 86_400 * US_PER_SECOND
+
+FLAG_SKIPPED = 1
+FLAG_COMPLETED = 2
+FLAG_HAS_END = 4
+
+PHASES = ("work", "short_break", "long_break")
+
+
+def datetime_to_us(value: datetime) -> int:
+    # Naive local wall-clock time as microseconds since 1970-01-01 (no tz math).
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return (value - EPOCH) // ONE_US
+
+
+def us_to_datetime(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+class SessionTable:
+    # Column-oriented store for many sessions. Each row costs ~34 bytes in
+    # typed arrays instead of a dataclass instance plus two datetimes, and the
+    # integer columns can be wrapped by NumPy without copying.
+    def __init__(self):
+        self.start_us = array('q')
+        self.end_us = array('q')
+        self.planned_duration = array('i')
+        self.actual_duration = array('i')
+        self.pause_count = array('i')
+        self.phase = array('b')
+        self.flags = array('B')
+        self.task_index = array('i')
+
+        self.phase_names: List[str] = list(PHASES)
+        self._phase_codes: Dict[str, int] = {p: i for i, p in enumerate(PHASES)}
+        self.tasks: List[Tuple[Optional[str], Optional[str]]] = []
+        self._task_codes: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.start_us)
+
+    def __getitem__(self, index: int) -> SessionData:
+        return self.session_at(index)
+
+    def __iter__(self) -> Iterator[SessionData]:
+        for i in range(len(self)):
+            yield self.session_at(i)
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[SessionData]) -> 'SessionTable':
+        table = cls()
+        for session in sessions:
+            table.append(session)
+        return table
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[dict]) -> 'SessionTable':
+        table = cls()
+        table.extend_dicts(records)
+        return table
+
+    def append(self, session: SessionData):
+        flags = FLAG_SKIPPED if session.was_skipped else 0
+        if session.was_completed:
+            flags |= FLAG_COMPLETED
+        end = 0
+        if session.end_time is not None:
+            flags |= FLAG_HAS_END
+            end = datetime_to_us(session.end_time)
+        self.append_row(datetime_to_us(session.start_time), end, session.planned_duration,
+                         session.actual_duration, session.pause_count,
+                         self._phase_code(session.session_type), flags,
+                         self.intern_task(session.task_id, session.task_name))
+
+    def extend_dicts(self, records: Iterable[dict]):
+        # Bulk decode straight from to_dict()/JSON records without building
+        # SessionData objects or keeping any datetimes alive.
+        fromisoformat = datetime.fromisoformat
+        phase_codes = self._phase_codes
+        task_codes = self._task_codes
+        add_start, add_end = self.start_us.append, self.end_us.append
+        add_planned, add_actual = self.planned_duration.append, self.actual_duration.append
+        add_pauses, add_phase = self.pause_count.append, self.phase.append
+        add_flags, add_task = self.flags.append, self.task_index.append
+        for d in records:
+            get = d.get
+            flags = FLAG_SKIPPED if get('was_skipped') else 0
+            if get('was_completed'):
+                flags |= FLAG_COMPLETED
+            end_time = get('end_time')
+            if end_time:
+                flags |= FLAG_HAS_END
+                end_dt = fromisoformat(end_time)
+                if end_dt.tzinfo is not None:
+                    end_dt = end_dt.replace(tzinfo=None)
+                add_end((end_dt - EPOCH) // ONE_US)
+            else:
+                add_end(0)
+            start_dt = fromisoformat(d['start_time'])
+            if start_dt.tzinfo is not None:
+                start_dt = start_dt.replace(tzinfo=None)
+            add_start((start_dt - EPOCH) // ONE_US)
+            add_planned(get('planned_duration', 0))
+            add_actual(get('actual_duration', 0))
+            add_pauses(get('pause_count', 0))
+
+            phase = d['session_type']
+            code = phase_codes.get(phase)
+            add_phase(code if code is not None else self._phase_code(phase))
+            add_flags(flags)
+
+            task_id, task_name = get('task_id'), get('task_name')
+            if task_id is None and task_name is None:
+                add_task(-1)
+            else:
+                code = task_codes.get((task_id, task_name))
+                add_task(code if code is not None else self.intern_task(task_id, task_name))
+
+    def session_at(self, index: int) -> SessionData:
+        flags = self.flags[index]
+        task_id, task_name = (None, None)
+        if self.task_index[index] >= 0:
+            task_id, task_name = self.tasks[self.task_index[index]]
+        return SessionData(
+            session_type=self.phase_names[self.phase[index]],
+            start_time=us_to_datetime(self.start_us[index]),
+            end_time=us_to_datetime(self.end_us[index]) if flags & FLAG_HAS_END else None,
+            planned_duration=self.planned_duration[index],
+            actual_duration=self.actual_duration[index],
+            pause_count=self.pause_count[index],
+            was_skipped=bool(flags & FLAG_SKIPPED),
+            was_completed=bool(flags & FLAG_COMPLETED),
+            task_id=task_id,
+            task_name=task_name,
+        )
+
+    def iter_dicts(self) -> Iterator[dict]:
+        for session in self:
+            yield session.to_dict()
+
+    def to_sessions(self) -> List[SessionData]:
+        return list(self)
+
+    def nbytes(self) -> int:
+        columns = (self.start_us, self.end_us, self.planned_duration, self.actual_duration,
+                   self.pause_count, self.phase, self.flags, self.task_index)
+        return sum(c.itemsize * len(c) for c in columns)
+
+    def append_row(self, start, end, planned, actual, pauses, phase, flags, task):
+        self.start_us.append(start)
+        self.end_us.append(end)
+        self.planned_duration.append(planned)
+        self.actual_duration.append(actual)
+        self.pause_count.append(pauses)
+        self.phase.append(phase)
+        self.flags.append(flags)
+        self.task_index.append(task)
+
+    def _phase_code(self, phase: str) -> int:
+        code = self._phase_codes.get(phase)
+        if code is None:
+            code = len(self.phase_names)
+            self.phase_names.append(phase)
+            self._phase_codes[phase] = code
+        return code
+
+    def intern_task(self, task_id: Optional[str], task_name: Optional[str]) -> int:
+        if task_id is None and task_name is None:
+            return -1
+        key = (task_id, task_name)
+        code = self._task_codes.get(key)
+        if code is None:
+            code = len(self.tasks)
+            self.tasks.append(key)
+            self._task_codes[key] = code
+        return code
@@ -1,114 +1,133 @@
-from PySide6.QtCore import QObject, Signal, QTimer
-from datetime import datetime
+import math
+import time
+from PySide6.QtCore import QObject, Qt, Signal, QTimer
+from typing import Optional
 from .session import SessionData
 from .config import PomodoroConfig
+from .scheduler import TimerScheduler
+from .timer_engine import PomodoroStateMachine
 
+# QTimer intervals are int milliseconds; longer waits wake up early and
+# reschedule.
+MAX_INTERVAL_MS = 2 ** 31 - 1
 
+_shared_scheduler: Optional[TimerScheduler] = None
+
+
+class QtSchedulerDriver:
+    # Runs a TimerScheduler on the Qt event loop with one single-shot QTimer.
+    def __init__(self, scheduler: TimerScheduler):
+        self.scheduler = scheduler
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(scheduler.run_due)
+        scheduler.on_rearm = self._arm
+
+    def _arm(self, when: Optional[float]):
+        if when is None:
+            self.timer.stop()
+            return
+        wait = when - self.scheduler.clock()
+        self.timer.start(min(MAX_INTERVAL_MS, max(0, math.ceil(wait * 1000))))
+
+
+def qt_scheduler(clock=time.monotonic) -> TimerScheduler:
+    # A new scheduler driven by its own QTimer.
+    scheduler = TimerScheduler(clock)
+    # Kept alive by scheduler.on_rearm.
+    QtSchedulerDriver(scheduler)
+    return scheduler
+
+
+def shared_scheduler() -> TimerScheduler:
+    # The process-wide scheduler every PomodoroTimer uses by default, so
+    # any number of timers cost one QTimer.
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = qt_scheduler()
+    return _shared_scheduler
+
+
+# Qt adapter over PomodoroStateMachine: forwards its events as signals and
+# has its wakeups served by a TimerScheduler.
 class PomodoroTimer(QObject):
     time_updated = Signal(int)
     phase_changed = Signal(str)
     session_completed = Signal(SessionData)
 
-    def __init__(self, config: PomodoroConfig):
+    def __init__(self, config: PomodoroConfig, clock=time.monotonic,
+                 scheduler: Optional[TimerScheduler] = None):
         super().__init__()
-        self.config = config
-        self.timer = QTimer()
-        self.timer.timeout.connect(self._tick)
+        if scheduler is None:
+            scheduler = shared_scheduler() if clock is time.monotonic else qt_scheduler(clock)
+        self.scheduler = scheduler
+        self.machine = PomodoroStateMachine(config, scheduler.clock)
+        scheduler.add(self.machine)
 
-        self.current_phase = "work"
-        self.remaining_seconds = config.work_duration * 60
-        self.total_seconds = self.remaining_seconds
-        self.completed_work_sessions = 0
-        self.is_running = False
+        self.machine.time_updated.connect(self.time_updated.emit)
+        self.machine.phase_changed.connect(self.phase_changed.emit)
+        self.machine.session_completed.connect(self.session_completed.emit)
 
-        self.current_session = None
-        self.pause_count = 0
+    @property
+    def config(self) -> PomodoroConfig:
+        return self.machine.config
+
+    @config.setter
+    def config(self, config: PomodoroConfig):
+        self.machine.config = config
+
+    @property
+    def current_phase(self) -> str:
+        return self.machine.current_phase
+
+    @property
+    def total_seconds(self) -> int:
+        return self.machine.total_seconds
+
+    @property
+    def remaining_seconds(self) -> int:
+        return self.machine.remaining_seconds
+
+    @property
+    def is_running(self) -> bool:
+        return self.machine.is_running
+
+    @property
+    def display_visible(self) -> bool:
+        return self.machine.display_visible
+
+    @property
+    def completed_work_sessions(self) -> int:
+        return self.machine.completed_work_sessions
+
+    @property
+    def current_session(self) -> Optional[SessionData]:
+        return self.machine.current_session
+
+    @property
+    def pause_count(self) -> int:
+        return self.machine.pause_count
 
     def start(self):
-        if not self.is_running:
-            if self.current_session is None:
-                self.current_session = SessionData(
-                    session_type=self.current_phase,
-                    start_time=datetime.now(),
-                    planned_duration=self.total_seconds
-                )
-            self.is_running = True
-            self.timer.start(1000)
+        self.machine.start()
 
     def pause(self):
-        if self.is_running:
-            self.is_running = False
-            self.timer.stop()
-            self.pause_count += 1
+        self.machine.pause()
 
     def reset(self):
-        self.timer.stop()
-        self.is_running = False
-        self._set_phase(self.current_phase)
-        if self.current_session:
-            self.current_session = None
-        self.pause_count = 0
+        self.machine.reset()
 
     def skip(self):
-        if self.current_session:
-            self.current_session.was_skipped = True
-            self.current_session.end_time = datetime.now()
-            self.current_session.actual_duration = self.total_seconds - self.remaining_seconds
-            self.current_session.pause_count = self.pause_count
-            self.session_completed.emit(self.current_session)
-
-        self._advance_phase()
-        self.current_session = None
-        self.pause_count = 0
+        self.machine.skip()
 
     def get_current_phase(self) -> str:
-        return self.current_phase
+        return self.machine.current_phase
 
     def get_remaining_time(self) -> int:
-        return self.remaining_seconds
-
-    def _tick(self):
-        if self.remaining_seconds > 0:
-            self.remaining_seconds -= 1
-            self.time_updated.emit(self.remaining_seconds)
-        else:
-            self._complete_session()
-
-    def _complete_session(self):
-        self.timer.stop()
-        self.is_running = False
-
-        if self.current_session:
-            self.current_session.was_completed = True
-            self.current_session.end_time = datetime.now()
-            self.current_session.actual_duration = self.total_seconds
-            self.current_session.pause_count = self.pause_count
-            self.session_completed.emit(self.current_session)
-
-        self._advance_phase()
-        self.current_session = None
-        self.pause_count = 0
-
-    def _advance_phase(self):
-        if self.current_phase == "work":
-            self.completed_work_sessions += 1
-            if self.completed_work_sessions % self.config.sessions_before_long_break == 0:
-                self._set_phase("long_break")
-            else:
-                self._set_phase("short_break")
-        else:
-            self._set_phase("work")
-
-    def _set_phase(self, phase: str):
-        self.current_phase = phase
-
-        if phase == "work":
-            self.total_seconds = self.config.work_duration * 60
-        elif phase == "short_break":
-            self.total_seconds = self.config.short_break * 60
-        elif phase == "long_break":
-            self.total_seconds = self.config.long_break * 60
-
-        self.remaining_seconds = self.total_seconds
-        self.phase_changed.emit(phase)
-        self.time_updated.emit(self.remaining_seconds)
+        return self.machine.remaining_seconds
+
+    def set_display_visible(self, visible: bool):
+        # While hidden (minimized, another virtual desktop) time_updated is
+        # not emitted and the only wakeup is the deadline itself.
+        self.machine.set_display_visible(visible)
@@ -0,0 +1,266 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from .session import SessionData
+from .config import PomodoroConfig
+from .scheduler import AsyncioSchedulerDriver, TimerScheduler
+
+# Wake this long after a second boundary so the displayed value has
+# already changed when the wakeup runs.
+BOUNDARY_SLACK = 0.002
+
+
+class Event:
+    # Minimal signal: callbacks run synchronously, in connection order.
+    def __init__(self):
+        self._callbacks: List[Callable] = []
+
+    def connect(self, callback: Callable):
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback: Callable):
+        self._callbacks.remove(callback)
+
+    def emit(self, *args):
+        for callback in self._callbacks:
+            callback(*args)
+
+
+class PomodoroStateMachine:
+    # One Pomodoro timer without an event loop. Remaining time is derived
+    # from a monotonic deadline, never counted down, so late wakeups cannot
+    # add drift. Whoever drives it connects to wakeup_changed, which carries
+    # the clock() time of the next wakeup it needs (None: none), and calls
+    # wake() then. While display_visible is False the only wakeup is the
+    # deadline itself and time_updated is not emitted. `transition` names
+    # each state change ("start", "resume", "pause", "skip", "complete",
+    # "reset") once it is done, for journaling.
+    def __init__(self, config: PomodoroConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self.clock = clock
+        self.time_updated = Event()
+        self.phase_changed = Event()
+        self.session_completed = Event()
+        self.wakeup_changed = Event()
+        self.transition = Event()
+
+        self.current_phase = "work"
+        self.total_seconds = config.work_duration * 60
+        # Exact remaining time while stopped; the deadline while running.
+        self._remaining = float(self.total_seconds)
+        self._deadline: Optional[float] = None
+        self._shown = self.total_seconds
+        self.display_visible = True
+        self.completed_work_sessions = 0
+        self.is_running = False
+
+        self.current_session: Optional[SessionData] = None
+        self.pause_count = 0
+
+    @property
+    def remaining_seconds(self) -> int:
+        # Whole seconds, rounded up: a session shows 25:00 until one second
+        # has passed and reaches 0 exactly at its deadline.
+        return max(0, math.ceil(self._exact_remaining() - 1e-9))
+
+    @property
+    def deadline(self) -> Optional[float]:
+        return self._deadline
+
+    @property
+    def exact_remaining(self) -> float:
+        return self._exact_remaining()
+
+    def start(self):
+        if not self.is_running:
+            kind = "resume"
+            if self.current_session is None:
+                kind = "start"
+                self.current_session = SessionData(
+                    session_type=self.current_phase,
+                    start_time=datetime.now(),
+                    planned_duration=self.total_seconds
+                )
+            self.is_running = True
+            self._deadline = self.clock() + self._remaining
+            self._schedule()
+            self.transition.emit(kind)
+
+    def pause(self):
+        if self.is_running:
+            self._remaining = self._exact_remaining()
+            self._stop()
+            self.pause_count += 1
+            self.transition.emit("pause")
+
+    def reset(self):
+        self._stop()
+        self._set_phase(self.current_phase)
+        if self.current_session:
+            self.current_session = None
+        self.pause_count = 0
+        self.transition.emit("reset")
+
+    def restore(self, phase: str, total_seconds: int, completed_work_sessions: int,
+                remaining: float, running: bool, session: Optional[SessionData], pause_count: int):
+        # Puts back a state saved by a previous process. A running session
+        # whose `remaining` is already negative completes on the first wakeup,
+        # recorded as ending when it should have.
+        self._stop()
+        self.current_phase = phase
+        self.total_seconds = total_seconds
+        self.completed_work_sessions = completed_work_sessions
+        self.current_session = session
+        self.pause_count = pause_count
+        self._remaining = max(0.0, remaining)
+        self.phase_changed.emit(phase)
+        self._emit_time()
+        if running and session is not None:
+            self.is_running = True
+            self._deadline = self.clock() + remaining
+            self._schedule()
+
+    def skip(self):
+        if self.current_session:
+            self.current_session.was_skipped = True
+            self.current_session.end_time = datetime.now()
+            self.current_session.actual_duration = round(self.total_seconds - self._exact_remaining())
+            self.current_session.pause_count = self.pause_count
+            self.session_completed.emit(self.current_session)
+
+        self._stop()
+        self._advance_phase()
+        self.current_session = None
+        self.pause_count = 0
+        self.transition.emit("skip")
+
+    def set_display_visible(self, visible: bool):
+        if visible == self.display_visible:
+            return
+        self.display_visible = visible
+        if self.is_running:
+            if visible:
+                self._emit_time()
+            self._schedule()
+
+    def wake(self):
+        if not self.is_running:
+            return
+        overdue = self.clock() - self._deadline
+        if overdue >= 0:
+            self._complete_session(overdue)
+            return
+        if self.display_visible and self.remaining_seconds != self._shown:
+            self._emit_time()
+        self._schedule()
+
+    def _exact_remaining(self) -> float:
+        if self._deadline is None:
+            return self._remaining
+        return max(0.0, self._deadline - self.clock())
+
+    def _stop(self):
+        self._deadline = None
+        self.is_running = False
+        self.wakeup_changed.emit(None)
+
+    def _schedule(self):
+        now = self.clock()
+        left = self._deadline - now
+        if left <= 0 or not self.display_visible:
+            self.wakeup_changed.emit(self._deadline)
+            return
+        # Time until the rounded-up value next changes, i.e. until `left`
+        # drops to the integer below it.
+        wait = left - math.ceil(left - 1e-9) + 1
+        self.wakeup_changed.emit(now + min(wait, left) + BOUNDARY_SLACK)
+
+    def _emit_time(self):
+        self._shown = self.remaining_seconds
+        self.time_updated.emit(self._shown)
+
+    def _complete_session(self, overdue: float = 0.0):
+        self._stop()
+
+        if self.current_session:
+            self.current_session.was_completed = True
+            # A stalled event loop only delays this call; the session ended
+            # at the deadline.
+            self.current_session.end_time = datetime.now() - timedelta(seconds=overdue)
+            self.current_session.actual_duration = self.total_seconds
+            self.current_session.pause_count = self.pause_count
+            self.session_completed.emit(self.current_session)
+
+        self._advance_phase()
+        self.current_session = None
+        self.pause_count = 0
+        self.transition.emit("complete")
+
+    def _advance_phase(self):
+        if self.current_phase == "work":
+            self.completed_work_sessions += 1
+            if self.completed_work_sessions % self.config.sessions_before_long_break == 0:
+                self._set_phase("long_break")
+            else:
+                self._set_phase("short_break")
+        else:
+            self._set_phase("work")
+
+    def _set_phase(self, phase: str):
+        self.current_phase = phase
+
+        if phase == "work":
+            self.total_seconds = self.config.work_duration * 60
+        elif phase == "short_break":
+            self.total_seconds = self.config.short_break * 60
+        elif phase == "long_break":
+            self.total_seconds = self.config.long_break * 60
+
+        self._remaining = float(self.total_seconds)
+        self.phase_changed.emit(phase)
+        self._emit_time()
+
+
+class TimerEngine:
+    # Drives any number of state machines from one asyncio event loop
+    # through a TimerScheduler, so all of them share one pending loop handle.
+    # The machines use the loop's clock, so wakeup times need no conversion.
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, coalesce: float = 0.0):
+        self.loop = loop or asyncio.get_running_loop()
+        self.timers: Dict[str, PomodoroStateMachine] = {}
+        self.scheduler = TimerScheduler(clock=self.loop.time, coalesce=coalesce)
+        self._driver = AsyncioSchedulerDriver(self.scheduler, self.loop)
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    @property
+    def wakeups(self) -> int:
+        return self.scheduler.wakeups
+
+    def create_timer(self, config: PomodoroConfig, timer_id: Optional[str] = None) -> PomodoroStateMachine:
+        if timer_id is None:
+            self._next_id += 1
+            timer_id = str(self._next_id)
+        if timer_id in self.timers:
+            raise ValueError(f"timer {timer_id!r} already exists")
+        machine = PomodoroStateMachine(config, clock=self.loop.time)
+        self.scheduler.add(machine)
+        self.timers[timer_id] = machine
+        return machine
+
+    def get_timer(self, timer_id: str) -> Optional[PomodoroStateMachine]:
+        return self.timers.get(timer_id)
+
+    def remove_timer(self, timer_id: str) -> PomodoroStateMachine:
+        machine = self.timers.pop(timer_id)
+        self.scheduler.remove(machine)
+        return machine
+
+    def close(self):
+        for timer_id in list(self.timers):
+            self.remove_timer(timer_id)
+        self._driver.close()
@@ -0,0 +1,221 @@
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..core.session import SessionData
+from ..core.session_table import (PHASES, FLAG_COMPLETED, FLAG_HAS_END, FLAG_SKIPPED,
+                                  SessionTable, datetime_to_us, us_to_datetime)
+
+MAGIC = b'PSAR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8x')
+RECORD = struct.Struct('<qqiiHBBi')
+
+# NumPy equivalent of RECORD, used for zero-copy views over the mapping.
+RECORD_FIELDS = [
+    ('start_us', '<i8'),
+    ('end_us', '<i8'),
+    ('planned_duration', '<i4'),
+    ('actual_duration', '<i4'),
+    ('pause_count', '<u2'),
+    ('phase', 'u1'),
+    ('flags', 'u1'),
+    ('task_index', '<i4'),
+]
+
+
+class SessionArchive:
+    # Fixed-width binary session log: a 16-byte header followed by 32-byte
+    # records. Task ids/names are interned in a JSON Lines string table next
+    # to the archive and referenced by index (-1 for no task). read_only
+    # opens an existing archive as it is: torn tails are skipped, not
+    # truncated, and appends raise.
+    def __init__(self, archive_path: Path = None, read_only: bool = False):
+        if archive_path is None:
+            archive_path = Path(__file__).parent.parent / 'data' / 'sessions.psar'
+        self.archive_path = archive_path
+        self.strings_path = archive_path.with_suffix(archive_path.suffix + '.strings')
+        self.read_only = read_only
+
+        if not read_only:
+            self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.archive_path.exists():
+                self._init_archive()
+        self._check_header()
+        if not read_only:
+            self._truncate_partial_record()
+
+        self.tasks: List[Tuple[Optional[str], Optional[str]]] = []
+        self._task_codes: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self._load_strings()
+
+    def _init_archive(self):
+        with open(self.archive_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        open(self.strings_path, 'w', encoding='utf-8').close()
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.archive_path) - HEADER.size) // RECORD.size
+
+    def append(self, session: SessionData):
+        self.extend([session])
+
+    def extend(self, sessions: Iterable[SessionData]):
+        if self.read_only:
+            raise PermissionError(f'{self.archive_path} is open read-only')
+        chunk = bytearray()
+        for session in sessions:
+            chunk += self._pack(session)
+        with open(self.archive_path, 'ab') as f:
+            f.write(chunk)
+
+    def import_from(self, sessions: Iterable[SessionData], batch_size: int = 10_000) -> int:
+        count = 0
+        batch = []
+        for session in sessions:
+            batch.append(session)
+            if len(batch) >= batch_size:
+                self.extend(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.extend(batch)
+            count += len(batch)
+        return count
+
+    def records(self):
+        # Structured NumPy array backed directly by the memory-mapped file.
+        # Re-call after appending to see new records.
+        import numpy as np
+        count = len(self)
+        dtype = np.dtype(RECORD_FIELDS)
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        with open(self.archive_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(mapped, dtype=dtype, count=count, offset=HEADER.size)
+
+    def iter_sessions(self, since: Optional[datetime] = None, reverse: bool = False,
+                      limit: Optional[int] = None) -> Iterator[SessionData]:
+        # In append order (newest first with reverse=True); since is
+        # inclusive on start_time, as for the other session stores.
+        if limit is not None and limit <= 0:
+            return
+        total = len(self)
+        if total == 0:
+            return
+        since_us = datetime_to_us(since) if since is not None else None
+        yielded = 0
+        with open(self.archive_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for n in range(total):
+                    index = total - 1 - n if reverse else n
+                    row = RECORD.unpack_from(mapped, HEADER.size + index * RECORD.size)
+                    if since_us is not None and row[0] < since_us:
+                        continue
+                    yield self._unpack(row)
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+
+    def to_table(self) -> SessionTable:
+        table = SessionTable()
+        for task_id, task_name in self.tasks:
+            table.intern_task(task_id, task_name)
+        with open(self.archive_path, 'rb') as f:
+            f.seek(HEADER.size)
+            data = f.read(len(self) * RECORD.size)
+        for row in RECORD.iter_unpack(data):
+            table.append_row(*row)
+        return table
+
+    def _pack(self, session: SessionData) -> bytes:
+        if session.session_type not in PHASES:
+            raise ValueError(f'Unknown session type {session.session_type!r}; '
+                             f'an archive stores {", ".join(PHASES)}')
+        flags = FLAG_SKIPPED if session.was_skipped else 0
+        if session.was_completed:
+            flags |= FLAG_COMPLETED
+        end = 0
+        if session.end_time is not None:
+            flags |= FLAG_HAS_END
+            end = datetime_to_us(session.end_time)
+        return RECORD.pack(
+            datetime_to_us(session.start_time), end,
+            session.planned_duration, session.actual_duration,
+            min(session.pause_count, 0xFFFF), PHASES.index(session.session_type), flags,
+            self._intern(session.task_id, session.task_name),
+        )
+
+    def _unpack(self, row: tuple) -> SessionData:
+        start, end, planned, actual, pauses, phase, flags, task_index = row
+        task_id, task_name = self.tasks[task_index] if task_index >= 0 else (None, None)
+        return SessionData(
+            session_type=PHASES[phase],
+            start_time=us_to_datetime(start),
+            end_time=us_to_datetime(end) if flags & FLAG_HAS_END else None,
+            planned_duration=planned,
+            actual_duration=actual,
+            pause_count=pauses,
+            was_skipped=bool(flags & FLAG_SKIPPED),
+            was_completed=bool(flags & FLAG_COMPLETED),
+            task_id=task_id,
+            task_name=task_name,
+        )
+
+    def _intern(self, task_id: Optional[str], task_name: Optional[str]) -> int:
+        if task_id is None and task_name is None:
+            return -1
+        key = (task_id, task_name)
+        code = self._task_codes.get(key)
+        if code is None:
+            # The string is persisted before any record refers to it.
+            with open(self.strings_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps([task_id, task_name], ensure_ascii=False) + '\n')
+            code = len(self.tasks)
+            self.tasks.append(key)
+            self._task_codes[key] = code
+        return code
+
+    def _load_strings(self):
+        valid_bytes = 0
+        try:
+            with open(self.strings_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        task_id, task_name = json.loads(line)
+                    except (json.JSONDecodeError, ValueError):
+                        break
+                    valid_bytes += len(line)
+                    self._task_codes[(task_id, task_name)] = len(self.tasks)
+                    self.tasks.append((task_id, task_name))
+                torn = f.tell() != valid_bytes
+        except FileNotFoundError:
+            return
+        if torn and not self.read_only:
+            with open(self.strings_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def _check_header(self):
+        with open(self.archive_path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f'{self.archive_path} is not a session archive')
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f'{self.archive_path} is not a session archive')
+        if version > VERSION:
+            raise ValueError(f'{self.archive_path} uses unsupported archive version {version}')
+
+    def _truncate_partial_record(self):
+        # Drop the tail of a record torn by an interrupted append.
+        size = os.path.getsize(self.archive_path)
+        excess = (size - HEADER.size) % RECORD.size
+        if excess:
+            with open(self.archive_path, 'r+b') as f:
+                f.truncate(size - excess)
@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Optional, Tuple
+from ..core.config import PomodoroConfig
+from .storage import SessionStorage
+from .task_storage import TaskStorage
+from .migrations import MigrationRunner
+from .writer import PersistenceWriter
+
+BACKENDS = ('json', 'sqlite')
+
+
+def create_storages(config: PomodoroConfig, data_dir: Optional[Path] = None,
+                    writer: Optional[PersistenceWriter] = None,
+                    migrations: Optional[MigrationRunner] = None, read_only: bool = False) -> Tuple:
+    # read_only opens the stores as they are, for quick looks: nothing is
+    # created, migrated or imported, and missing files read as empty.
+    if data_dir is None:
+        data_dir = Path(__file__).parent.parent / 'data'
+
+    if config.storage_backend == 'sqlite' and read_only:
+        db_path = data_dir / 'pomodoro.db'
+        if db_path.exists():
+            from .sqlite_storage import SqliteDatabase, SqliteSessionStorage, SqliteTaskStorage
+            db = SqliteDatabase(db_path, read_only=True)
+            return SqliteSessionStorage(db), SqliteTaskStorage(db)
+        # Never opened in SQLite mode: the history is still in the JSON files.
+    elif config.storage_backend == 'sqlite':
+        from .sqlite_storage import (SqliteDatabase, SqliteSessionStorage, SqliteTaskStorage,
+                                     import_json_files, json_import_pending)
+        db = SqliteDatabase(data_dir / 'pomodoro.db')
+        # Picks up whatever was saved in JSON mode since the last import.
+        tasks_path = data_dir / 'tasks.json'
+        if json_import_pending(db, _sessions_file(data_dir), tasks_path):
+            if migrations is not None:
+                migrations.wait()
+            import_json_files(db, _sessions_file(data_dir), tasks_path)
+        return SqliteSessionStorage(db), SqliteTaskStorage(db)
+
+    return (SessionStorage(data_dir / 'sessions.jsonl', writer=writer, migrations=migrations,
+                           read_only=read_only),
+            TaskStorage(data_dir / 'tasks.json', writer=writer, migrations=migrations, read_only=read_only))
+
+
+def _sessions_file(data_dir: Path) -> Path:
+    # The log, or a legacy sessions.json not migrated yet.
+    path = data_dir / 'sessions.jsonl'
+    return path if path.exists() else data_dir / 'sessions.json'
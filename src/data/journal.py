@@ -0,0 +1,216 @@
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+# Reading the journal is on the CLI's startup path (python -m src.cli status),
+# so this module only imports what reading needs; see restore() and compact().
+MAGIC = b'PTJL'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8x')
+# kind, phase, pause count, completed work sessions, event time (wall clock
+# us), remaining us at that time, phase length s, session start (wall clock
+# us, 0 = none), task id (UTF-8, NUL padded), then a CRC-32 of the rest.
+RECORD_BODY = struct.Struct('<BBHIqqiq36s')
+RECORD = struct.Struct('<%dsI' % RECORD_BODY.size)
+TASK_ID_BYTES = 36
+
+KINDS = ("start", "resume", "pause", "skip", "complete", "reset")
+# Part of the file format, so not shared with session_table.PHASES.
+PHASES = ("work", "short_break", "long_break")
+RUNNING_KINDS = ("start", "resume")
+# Rewrite the journal down to its last record after this many appends.
+COMPACT_RECORDS = 256
+
+
+class JournalRecord:
+    __slots__ = ('kind', 'phase', 'pause_count', 'completed_work_sessions', 'recorded_at',
+                 'remaining', 'total_seconds', 'session_start', 'task_id')
+
+    def __init__(self, kind: str, phase: str, pause_count: int, completed_work_sessions: int,
+                 recorded_at: float, remaining: float, total_seconds: int,
+                 session_start: Optional[datetime], task_id: Optional[str]):
+        self.kind = kind
+        self.phase = phase
+        self.pause_count = pause_count
+        self.completed_work_sessions = completed_work_sessions
+        self.recorded_at = recorded_at
+        self.remaining = remaining
+        self.total_seconds = total_seconds
+        self.session_start = session_start
+        self.task_id = task_id
+
+    @property
+    def running(self) -> bool:
+        return self.kind in RUNNING_KINDS and self.session_start is not None
+
+    def remaining_at(self, now: float) -> float:
+        # Remaining seconds at wall-clock time `now`; a clock that went
+        # backwards counts as no time passed.
+        if not self.running:
+            return self.remaining
+        return self.remaining - max(0.0, now - self.recorded_at)
+
+
+class TimerJournal:
+    # Append-only log of timer transitions in fixed-size records. Every
+    # record is a full snapshot of the timer after the event, so startup
+    # only needs the last intact record (a torn or corrupt tail is skipped
+    # by its CRC). Appends are single os.write calls on an open descriptor:
+    # they survive the process being killed, not a power cut.
+    def __init__(self, journal_path: Path = None):
+        if journal_path is None:
+            journal_path = Path(__file__).parent.parent / 'data' / 'timer.journal'
+        self.journal_path = journal_path
+        # Created on first write only: reading (CLI status) changes nothing.
+        self._fd: Optional[int] = None
+        self._appended = 0
+        self._last: Optional[bytes] = None
+
+    def last_record(self) -> Optional[JournalRecord]:
+        # The newest intact record, reading at most a few records from the end.
+        try:
+            with open(self.journal_path, 'rb') as f:
+                header = f.read(HEADER.size)
+                if not _valid_header(header):
+                    return None
+                size = os.fstat(f.fileno()).st_size
+                count = (size - HEADER.size) // RECORD.size
+                for index in range(count - 1, -1, -1):
+                    f.seek(HEADER.size + index * RECORD.size)
+                    record = _unpack(f.read(RECORD.size))
+                    if record is not None:
+                        return record
+        except FileNotFoundError:
+            pass
+        return None
+
+    def records(self) -> Iterator[JournalRecord]:
+        try:
+            with open(self.journal_path, 'rb') as f:
+                if not _valid_header(f.read(HEADER.size)):
+                    return
+                while True:
+                    data = f.read(RECORD.size)
+                    if len(data) < RECORD.size:
+                        return
+                    record = _unpack(data)
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    def append(self, kind: str, machine, task_id: Optional[str] = None):
+        data = _pack(kind, machine, task_id)
+        if self._fd is None:
+            self._open()
+        os.write(self._fd, data)
+        self._last = data
+        self._appended += 1
+        if self._appended >= COMPACT_RECORDS:
+            self.compact()
+
+    def compact(self):
+        # Replace the journal with a header and its newest record.
+        from .writer import atomic_write
+        last = self._last
+        if last is None:
+            record = self.last_record()
+            last = _repack(record) if record is not None else None
+        self.close()
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.journal_path, HEADER.pack(MAGIC, VERSION, RECORD.size) + (last or b''))
+        self._appended = 0
+
+    def attach(self, machine, task_id: Callable[[], Optional[str]] = lambda: None):
+        # Journal every transition of `machine`; `task_id` is asked for the
+        # task being worked on at that moment.
+        machine.transition.connect(lambda kind: self.append(kind, machine, task_id()))
+
+    def restore(self, machine, record: JournalRecord, now: Optional[float] = None):
+        from ..core.session import SessionData
+        session = None
+        if record.session_start is not None:
+            session = SessionData(session_type=record.phase, start_time=record.session_start,
+                                  planned_duration=record.total_seconds, task_id=record.task_id)
+        machine.restore(record.phase, record.total_seconds, record.completed_work_sessions,
+                        record.remaining_at(time.time() if now is None else now), record.running,
+                        session, record.pause_count)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _open(self):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        size = os.fstat(fd).st_size
+        if size == 0:
+            os.write(fd, HEADER.pack(MAGIC, VERSION, RECORD.size))
+        elif size < HEADER.size or (size - HEADER.size) % RECORD.size:
+            # A torn append from a crash: drop the partial record so later
+            # records stay aligned.
+            os.close(fd)
+            with open(self.journal_path, 'r+b') as f:
+                header = f.read(HEADER.size)
+                if not _valid_header(header):
+                    f.seek(0)
+                    f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+                    f.truncate(HEADER.size)
+                else:
+                    f.truncate(size - (size - HEADER.size) % RECORD.size)
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND)
+        self._fd = fd
+
+
+def _valid_header(header: bytes) -> bool:
+    if len(header) < HEADER.size:
+        return False
+    magic, version, record_size = HEADER.unpack(header)
+    return magic == MAGIC and version == VERSION and record_size == RECORD.size
+
+
+def _pack(kind: str, machine, task_id: Optional[str]) -> bytes:
+    session = machine.current_session
+    session_start = _datetime_to_us(session.start_time) if session is not None else 0
+    task = (task_id or '').encode('utf-8')
+    if len(task) > TASK_ID_BYTES:
+        task = b''
+    body = RECORD_BODY.pack(KINDS.index(kind), PHASES.index(machine.current_phase), machine.pause_count,
+                            machine.completed_work_sessions, time.time_ns() // 1000,
+                            round(machine.exact_remaining * 1_000_000), machine.total_seconds,
+                            session_start, task)
+    return RECORD.pack(body, zlib.crc32(body))
+
+
+def _repack(record: JournalRecord) -> bytes:
+    body = RECORD_BODY.pack(
+        KINDS.index(record.kind), PHASES.index(record.phase), record.pause_count,
+        record.completed_work_sessions, round(record.recorded_at * 1_000_000),
+        round(record.remaining * 1_000_000), record.total_seconds,
+        _datetime_to_us(record.session_start) if record.session_start else 0,
+        (record.task_id or '').encode('utf-8'))
+    return RECORD.pack(body, zlib.crc32(body))
+
+
+def _unpack(data: bytes) -> Optional[JournalRecord]:
+    if len(data) < RECORD.size:
+        return None
+    body, crc = RECORD.unpack(data)
+    if zlib.crc32(body) != crc:
+        return None
+    kind, phase, pauses, cycle, recorded_us, remaining_us, total, start_us, task = RECORD_BODY.unpack(body)
+    if kind >= len(KINDS) or phase >= len(PHASES):
+        return None
+    task_id = task.rstrip(b'\0').decode('utf-8') or None
+    return JournalRecord(KINDS[kind], PHASES[phase], pauses, cycle, recorded_us / 1_000_000,
+                         remaining_us / 1_000_000, total,
+                         datetime.fromtimestamp(start_us / 1_000_000) if start_us else None, task_id)
+
+
+def _datetime_to_us(value: datetime) -> int:
+    return round(value.timestamp() * 1_000_000)
@@ -0,0 +1,412 @@
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+from .writer import atomic_write
+
+# Version 1 is everything written before stores carried a version: the
+# {"sessions": [...]} file, header-less JSON Lines logs, and unversioned
+# tasks.json/config.json. Version 2 adds the version markers below.
+SCHEMA_VERSION = 2
+SESSION_LOG_HEADER = b'{"schema":"sessions","version":2}\n'
+
+READ_CHUNK_SIZE = 64 * 1024
+CHECKPOINT_EVERY = 10_000
+
+_WHITESPACE = ' \t\r\n'
+
+
+def is_header(record: dict) -> bool:
+    return 'schema' in record
+
+
+def session_log_version(path: Path) -> Optional[int]:
+    try:
+        with open(path, 'rb') as f:
+            first = f.readline()
+    except FileNotFoundError:
+        return None
+    if not first.strip():
+        return 1
+    try:
+        record = json.loads(first)
+    except json.JSONDecodeError:
+        return 1
+    if isinstance(record, dict) and is_header(record):
+        return record.get('version', 1)
+    return 1
+
+
+def json_file_version(path: Path) -> Optional[int]:
+    # tasks.json and config.json are written with "version" first, so the
+    # head is usually enough. Anything else (hand-edited files, or legacy
+    # ones without a version) is parsed in full.
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(256).decode('utf-8', errors='ignore')
+            match = re.match(r'\s*\{\s*"version"\s*:\s*(\d+)\s*[,}]', head)
+            if match:
+                return int(match.group(1))
+            f.seek(0)
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return 1
+    version = data.get('version') if isinstance(data, dict) else None
+    return version if type(version) is int else 1
+
+
+def iter_json_array(path: Path, key: str, start_offset: Optional[int] = None) -> Iterator[Tuple[object, int]]:
+    # Streams the items of the array stored under `key` in a JSON object as
+    # (item, byte offset just past the item) pairs, holding only one chunk
+    # plus the current item in memory. Bytes are decoded as latin-1 so string
+    # offsets equal file offsets; items containing non-ASCII bytes are parsed
+    # again from their raw UTF-8 bytes.
+    decoder = json.JSONDecoder()
+    with open(path, 'rb') as f:
+        if start_offset is not None:
+            f.seek(start_offset)
+        buf = ''
+        base = start_offset or 0
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            # Appends a chunk, dropping text already consumed.
+            nonlocal buf, base, pos, eof
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk.decode('latin-1')
+            base += pos
+            pos = 0
+            return True
+
+        if start_offset is None:
+            pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+            while True:
+                match = pattern.search(buf)
+                if match:
+                    pos = match.end()
+                    break
+                # Keep a tail in case the key straddles two chunks.
+                pos = max(0, len(buf) - len(key) - 16)
+                if not fill():
+                    return
+
+        while True:
+            while True:
+                while pos < len(buf) and buf[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    break
+            if pos >= len(buf) or buf[pos] == ']':
+                return
+            if buf[pos] == ',':
+                pos += 1
+                continue
+
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    if end == len(buf) and not eof and isinstance(item, (int, float)):
+                        # A number may continue in the next chunk.
+                        raise ValueError
+                    break
+                except ValueError:
+                    if not fill():
+                        raise
+            raw = buf[pos:end]
+            if not raw.isascii():
+                item = json.loads(raw.encode('latin-1'))
+            pos = end
+            yield item, base + end
+
+
+def iter_jsonl(path: Path, start_offset: Optional[int] = None) -> Iterator[Tuple[dict, int]]:
+    # (record, byte offset just past the line); skips headers and torn lines.
+    with open(path, 'rb') as f:
+        if start_offset:
+            f.seek(start_offset)
+        offset = f.tell()
+        for line in f:
+            offset += len(line)
+            if not line.strip() or not line.endswith(b'\n'):
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if is_header(record):
+                continue
+            yield record, offset
+
+
+def _signature(path: Path) -> list:
+    st = os.stat(path)
+    return [str(path), st.st_mtime_ns, st.st_size]
+
+
+def _resumable_rewrite(source: Path, target: Path,
+                       read_items: Callable[[Path, Optional[int]], Iterator[Tuple[object, int]]],
+                       encode_item: Callable[[object], bytes],
+                       prefix: bytes = b'', suffix: bytes = b'', separator: bytes = b'') -> int:
+    # Copies items from source into target.migrating, checkpointing the
+    # source offset and output length every CHECKPOINT_EVERY items. A rerun
+    # after a crash truncates the temp file back to the last checkpoint and
+    # continues from there; the target only appears via an atomic rename.
+    tmp_path = target.with_name(target.name + '.migrating')
+    progress_path = target.with_name(target.name + '.migrating.json')
+    signature = _signature(source)
+
+    state = None
+    try:
+        with open(progress_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    if state and state.get('source') == signature and tmp_path.exists():
+        out = open(tmp_path, 'r+b')
+        out.truncate(state['target_bytes'])
+        out.seek(state['target_bytes'])
+        offset, count = state['source_offset'], state['items']
+    else:
+        out = open(tmp_path, 'wb')
+        out.write(prefix)
+        offset, count = None, 0
+
+    with out:
+        for item, end_offset in read_items(source, offset):
+            if count and separator:
+                out.write(separator)
+            out.write(encode_item(item))
+            count += 1
+            if count % CHECKPOINT_EVERY == 0:
+                out.flush()
+                os.fsync(out.fileno())
+                atomic_write(progress_path, json.dumps({
+                    'source': signature,
+                    'source_offset': end_offset,
+                    'target_bytes': out.tell(),
+                    'items': count,
+                }).encode('utf-8'))
+        out.write(suffix)
+        out.flush()
+        os.fsync(out.fileno())
+
+    os.replace(tmp_path, target)
+    _remove(progress_path)
+    return count
+
+
+def _remove(path: Path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _cleanup_partial(target: Path):
+    _remove(target.with_name(target.name + '.migrating'))
+    _remove(target.with_name(target.name + '.migrating.json'))
+
+
+def encode_session_line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _encode_task(record: dict) -> bytes:
+    return b'    ' + json.dumps(record, ensure_ascii=False).encode('utf-8')
+
+
+def migrate_sessions(log_path: Path, legacy_path: Optional[Path] = None) -> bool:
+    if log_path.exists():
+        if legacy_path is not None and legacy_path.exists():
+            # Crashed after the rename but before retiring the legacy file.
+            os.replace(legacy_path, legacy_path.with_suffix('.json.bak'))
+        if session_log_version(log_path) >= SCHEMA_VERSION:
+            _cleanup_partial(log_path)
+            return False
+        _resumable_rewrite(log_path, log_path, iter_jsonl, encode_session_line,
+                           prefix=SESSION_LOG_HEADER)
+        return True
+
+    if legacy_path is None or not legacy_path.exists():
+        return False
+    _resumable_rewrite(legacy_path, log_path,
+                       lambda path, offset: iter_json_array(path, 'sessions', offset),
+                       encode_session_line, prefix=SESSION_LOG_HEADER)
+    os.replace(legacy_path, legacy_path.with_suffix('.json.bak'))
+    return True
+
+
+def migrate_tasks(path: Path) -> bool:
+    version = json_file_version(path)
+    if version is None or version >= SCHEMA_VERSION:
+        _cleanup_partial(path)
+        return False
+    _resumable_rewrite(path, path,
+                       lambda p, offset: iter_json_array(p, 'tasks', offset),
+                       _encode_task,
+                       prefix=b'{\n  "version": %d,\n  "tasks": [\n' % SCHEMA_VERSION,
+                       suffix=b'\n  ]\n}', separator=b',\n')
+    return True
+
+
+def migrate_config(path: Path) -> bool:
+    from ..core.config import CONFIG_VERSION
+    version = json_file_version(path)
+    if version is None or version >= CONFIG_VERSION:
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        return False
+    data = {'version': CONFIG_VERSION, **{k: v for k, v in data.items() if k != 'version'}}
+    atomic_write(path, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+    return True
+
+
+def iter_session_records(path: Path) -> Iterator[dict]:
+    # Session dicts (SessionData.to_dict() format) from any supported store.
+    if path.suffix == '.jsonl':
+        for record, _ in iter_jsonl(path):
+            yield record
+    elif path.suffix == '.json':
+        for record, _ in iter_json_array(path, 'sessions'):
+            yield record
+    elif path.suffix == '.db':
+        from .sqlite_storage import SqliteDatabase, SqliteSessionStorage
+        db = SqliteDatabase(path, read_only=True)
+        try:
+            for session in SqliteSessionStorage(db).iter_sessions():
+                yield session.to_dict()
+        finally:
+            db.close()
+    elif path.suffix == '.psar':
+        from .archive import SessionArchive
+        for session in SessionArchive(path, read_only=True).iter_sessions():
+            yield session.to_dict()
+    else:
+        raise ValueError(f'Unsupported session store: {path}')
+
+
+def convert_sessions(source: Path, target: Path) -> int:
+    from ..core.session import SessionData
+    if target.exists():
+        raise FileExistsError(target)
+    records = iter_session_records(source)
+
+    if target.suffix == '.jsonl':
+        return _write_all(target, records, encode_session_line, prefix=SESSION_LOG_HEADER)
+    if target.suffix == '.json':
+        return _write_all(target, records,
+                          lambda r: b'    ' + json.dumps(r, ensure_ascii=False).encode('utf-8'),
+                          prefix=b'{\n  "sessions": [\n', suffix=b'\n  ]\n}', separator=b',\n')
+    if target.suffix == '.db':
+        from .sqlite_storage import SqliteDatabase, insert_session_records
+        db = SqliteDatabase(target)
+        try:
+            return insert_session_records(db, records)
+        finally:
+            db.close()
+    if target.suffix == '.psar':
+        from .archive import SessionArchive
+        return SessionArchive(target).import_from(SessionData.from_dict(r) for r in records)
+    raise ValueError(f'Unsupported session store: {target}')
+
+
+def _write_all(target: Path, records, encode, prefix=b'', suffix=b'', separator=b'') -> int:
+    tmp_path = target.with_name(target.name + '.tmp')
+    count = 0
+    with open(tmp_path, 'wb') as out:
+        out.write(prefix)
+        for record in records:
+            if count and separator:
+                out.write(separator)
+            out.write(encode(record))
+            count += 1
+        out.write(suffix)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, target)
+    return count
+
+
+class MigrationRunner:
+    # Upgrades every store in data_dir. start() runs it on a background
+    # thread so the window can appear immediately; storages call wait()
+    # before their first access to the files.
+    def __init__(self, data_dir: Path = None):
+        if data_dir is None:
+            data_dir = Path(__file__).parent.parent / 'data'
+        self.data_dir = data_dir
+        self.error: Optional[BaseException] = None
+        self.migrated = []
+        self._done = threading.Event()
+        self._thread = None
+
+    def run(self):
+        try:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            if migrate_sessions(self.data_dir / 'sessions.jsonl', self.data_dir / 'sessions.json'):
+                self.migrated.append('sessions')
+            if migrate_tasks(self.data_dir / 'tasks.json'):
+                self.migrated.append('tasks')
+            if migrate_config(self.data_dir / 'config.json'):
+                self.migrated.append('config')
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def start(self) -> 'MigrationRunner':
+        self._thread = threading.Thread(target=self.run, name='MigrationRunner', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is None and not self._done.is_set():
+            self.run()
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upgrade or convert Pomodoro data files")
+    parser.add_argument("--data-dir", type=Path)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("upgrade")
+    convert = sub.add_parser("convert", help="convert sessions between .json/.jsonl/.db/.psar")
+    convert.add_argument("source", type=Path)
+    convert.add_argument("target", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        runner = MigrationRunner(args.data_dir)
+        runner.run()
+        if runner.error is not None:
+            print(f"migration failed: {runner.error}", file=sys.stderr)
+            return 1
+        print(f"upgraded: {', '.join(runner.migrated) or 'nothing to do'}")
+        return 0
+
+    count = convert_sessions(args.source, args.target)
+    print(f"converted {count} sessions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
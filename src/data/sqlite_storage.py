@@ -0,0 +1,363 @@
+import sqlite3
+import threading
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from ..core.session import SessionData
+from ..core.session_table import SessionTable
+from ..core.task import Task
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_type TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    planned_duration INTEGER NOT NULL DEFAULT 0,
+    actual_duration INTEGER NOT NULL DEFAULT 0,
+    pause_count INTEGER NOT NULL DEFAULT 0,
+    was_skipped INTEGER NOT NULL DEFAULT 0,
+    was_completed INTEGER NOT NULL DEFAULT 0,
+    task_id TEXT,
+    task_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions(start_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_session_type ON sessions(session_type);
+CREATE INDEX IF NOT EXISTS idx_sessions_task_id ON sessions(task_id);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    target_seconds INTEGER NOT NULL,
+    total_seconds INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    completed_at TEXT,
+    is_completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_is_completed ON tasks(is_completed);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+SESSION_COLUMNS = ('session_type', 'start_time', 'end_time', 'planned_duration',
+                   'actual_duration', 'pause_count', 'was_skipped', 'was_completed',
+                   'task_id', 'task_name')
+TASK_COLUMNS = ('task_id', 'name', 'target_seconds', 'total_seconds',
+                'created_at', 'completed_at', 'is_completed')
+
+
+class _ThreadConnection:
+    # Weakly referenceable, unlike the connection itself, so a finished
+    # thread's connection is closed along with its thread locals.
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class SqliteDatabase:
+    # read_only opens an existing database as it is: no schema setup,
+    # journal mode or version bump, and every write fails.
+    def __init__(self, db_path: Path = None, read_only: bool = False):
+        if db_path is None:
+            db_path = Path(__file__).parent.parent / 'data' / 'pomodoro.db'
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        if read_only:
+            # Fails here, not on first use, when there is no database.
+            self.conn
+            return
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.conn
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread: a connection may only be used by the
+        # thread that opened it, and analytics, the analysis dialog and the
+        # predictor read on worker threads. WAL lets them read while the
+        # window writes.
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            # close() may come from another thread than the connection's.
+            if self.read_only:
+                holder = _ThreadConnection(sqlite3.connect(_read_only_uri(self.db_path), uri=True,
+                                                           check_same_thread=False))
+            else:
+                holder = _ThreadConnection(sqlite3.connect(str(self.db_path), check_same_thread=False))
+                holder.conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.holder = holder
+            self._connections.add(holder)
+        return holder.conn
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute(
+            'INSERT INTO meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def close(self):
+        for holder in list(self._connections):
+            holder.conn.close()
+        self._local = threading.local()
+
+
+class SqliteSessionStorage:
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    def save_session(self, session: SessionData):
+        with self.db.conn:
+            self.db.conn.execute(_insert_sql('sessions', SESSION_COLUMNS),
+                                 _session_row(session.to_dict()))
+
+    def load_sessions(self) -> List[SessionData]:
+        rows = self.db.conn.execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions ORDER BY id")
+        return [_session_from_row(r) for r in rows]
+
+    def load_sessions_between(self, start: Optional[datetime] = None,
+                              end: Optional[datetime] = None) -> List[SessionData]:
+        return list(self.iter_sessions(since=start, until=end, order_by_start=True))
+
+    def iter_sessions(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      session_type: Optional[str] = None, reverse: bool = False,
+                      limit: Optional[int] = None,
+                      order_by_start: bool = False) -> Iterator[SessionData]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('start_time >= ?')
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append('start_time < ?')
+            params.append(until.isoformat())
+        if session_type is not None:
+            clauses.append('session_type = ?')
+            params.append(session_type)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        direction = 'DESC' if reverse else 'ASC'
+        order = f'start_time {direction}, id {direction}' if order_by_start else f'id {direction}'
+        sql = f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions{where} ORDER BY {order}"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(max(limit, 0))
+        for row in self.db.conn.execute(sql, params):
+            yield _session_from_row(row)
+
+    def load_table(self) -> SessionTable:
+        return SessionTable.from_sessions(self.iter_sessions())
+
+    def iter_sessions_from(self, position: Optional[int] = None) -> Iterator[Tuple[SessionData, int]]:
+        # Same contract as SessionStorage.iter_sessions_from(); positions are
+        # row ids, which AUTOINCREMENT never reuses.
+        rows = self.db.conn.execute(
+            f"SELECT id, {', '.join(SESSION_COLUMNS)} FROM sessions WHERE id > ? ORDER BY id", (position or 0,))
+        for row in rows:
+            yield _session_from_row(row[1:]), row[0]
+
+    def position_check(self, position: Optional[int]):
+        if not position:
+            return 0
+        count, last = self.db.conn.execute(
+            'SELECT COUNT(*), MAX(id) FROM sessions WHERE id <= ?', (position,)).fetchone()
+        return f'{count}:{last}'
+
+    def count_sessions(self) -> int:
+        return self.db.conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def generation(self) -> str:
+        # AUTOINCREMENT ids are never reused, so the highest id handed out
+        # plus the row count changes on every insert and every delete.
+        row = self.db.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sessions'").fetchone()
+        return f'sqlite:{self.count_sessions()}:{row[0] if row else 0}'
+
+    def clear_all_sessions(self):
+        with self.db.conn:
+            self.db.conn.execute('DELETE FROM sessions')
+
+
+class SqliteTaskStorage:
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    def save_task(self, task: Task):
+        with self.db.conn:
+            self.db.conn.execute(_upsert_task_sql(), _task_row(task.to_dict()))
+
+    def save_tasks(self, tasks: List[Task]):
+        with self.db.conn:
+            self.db.conn.executemany(_upsert_task_sql(), (_task_row(t.to_dict()) for t in tasks))
+
+    def load_tasks(self, include_completed: bool = False) -> List[Task]:
+        sql = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks"
+        if not include_completed:
+            sql += ' WHERE is_completed = 0'
+        rows = self.db.conn.execute(sql + ' ORDER BY rowid')
+        return [_task_from_row(r) for r in rows]
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        row = self.db.conn.execute(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE task_id = ?",
+            (task_id,)).fetchone()
+        return _task_from_row(row) if row else None
+
+    def delete_task(self, task_id: str):
+        with self.db.conn:
+            self.db.conn.execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+
+
+def import_json_files(db: SqliteDatabase, sessions_path: Optional[Path] = None,
+                      tasks_path: Optional[Path] = None) -> dict:
+    # Brings the database up to date with the JSON backend's files, so
+    # switching backends back and forth loses nothing. A session log is read
+    # from where the last import stopped (all of it if it was rewritten
+    # since), and a session already present, by start time and type, is
+    # never added twice. tasks.json is upserted whenever it changed. Runs in
+    # one transaction.
+    from .migrations import iter_json_array
+    counts = {'sessions': 0, 'tasks': 0}
+    with db.conn:
+        if sessions_path is not None and sessions_path.exists():
+            counts['sessions'] = _import_sessions(db, sessions_path)
+        if tasks_path is not None and tasks_path.exists():
+            tasks = (t for t, _ in iter_json_array(tasks_path, 'tasks'))
+            cur = db.conn.executemany(_upsert_task_sql(), (_task_row(t) for t in tasks))
+            counts['tasks'] = cur.rowcount
+            db.set_meta('json_tasks_file', _file_signature(tasks_path))
+    return counts
+
+
+def json_import_pending(db: SqliteDatabase, sessions_path: Optional[Path] = None,
+                        tasks_path: Optional[Path] = None) -> bool:
+    # Whether either file changed since import_json_files() last read it.
+    for path, key in ((sessions_path, 'json_sessions_file'), (tasks_path, 'json_tasks_file')):
+        if path is not None and path.exists() and db.get_meta(key) != _file_signature(path):
+            return True
+    return False
+
+
+def _import_sessions(db: SqliteDatabase, path: Path) -> int:
+    from .migrations import iter_jsonl, iter_session_records
+    from .storage import log_check
+    if path.suffix != '.jsonl':
+        count = _insert_new_sessions(db, iter_session_records(path))
+    else:
+        offset = int(db.get_meta('json_sessions_offset') or 0)
+        if offset and str(log_check(path, offset)) != db.get_meta('json_sessions_check'):
+            # Rewritten since (history cleared in JSON mode): read it all.
+            offset = 0
+        end = offset
+
+        def records():
+            nonlocal end
+            for record, end in iter_jsonl(path, offset):
+                yield record
+
+        count = _insert_new_sessions(db, records())
+        db.set_meta('json_sessions_offset', str(end))
+        db.set_meta('json_sessions_check', str(log_check(path, end)))
+    db.set_meta('json_sessions_file', _file_signature(path))
+    return count
+
+
+def _insert_new_sessions(db: SqliteDatabase, records) -> int:
+    # Skips sessions already in the table.
+    sql = (f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}) "
+           f"SELECT {', '.join('?' for _ in SESSION_COLUMNS)} WHERE NOT EXISTS "
+           f"(SELECT 1 FROM sessions WHERE start_time = ? AND session_type = ?)")
+    rows = ((*row, row[1], row[0]) for row in (_session_row(s) for s in records))
+    return db.conn.executemany(sql, rows).rowcount
+
+
+def _file_signature(path: Path) -> str:
+    st = path.stat()
+    return f'{st.st_size}:{st.st_mtime_ns}'
+
+
+def _read_only_uri(db_path: Path) -> str:
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+    if not Path(f'{db_path}-wal').exists():
+        # Closed cleanly, so all of it is in the main file; reading it as
+        # immutable keeps SQLite from creating -wal and -shm files beside it.
+        uri += '&immutable=1'
+    return uri
+
+
+def insert_session_records(db: SqliteDatabase, records) -> int:
+    with db.conn:
+        return _insert_sessions(db, records)
+
+
+def _insert_sessions(db: SqliteDatabase, records) -> int:
+    rows = (_session_row(s) for s in records)
+    return db.conn.executemany(_insert_sql('sessions', SESSION_COLUMNS), rows).rowcount
+
+
+def _insert_sql(table: str, columns) -> str:
+    return (f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})")
+
+
+def _upsert_task_sql() -> str:
+    updates = ', '.join(f'{c} = excluded.{c}' for c in TASK_COLUMNS if c != 'task_id')
+    return _insert_sql('tasks', TASK_COLUMNS) + f' ON CONFLICT(task_id) DO UPDATE SET {updates}'
+
+
+def _session_row(data: dict) -> tuple:
+    return (
+        data['session_type'], data['start_time'], data.get('end_time'),
+        data.get('planned_duration', 0), data.get('actual_duration', 0),
+        data.get('pause_count', 0), int(bool(data.get('was_skipped'))),
+        int(bool(data.get('was_completed'))), data.get('task_id'), data.get('task_name'),
+    )
+
+
+def _session_from_row(row) -> SessionData:
+    return SessionData(
+        session_type=row[0],
+        start_time=datetime.fromisoformat(row[1]),
+        end_time=datetime.fromisoformat(row[2]) if row[2] else None,
+        planned_duration=row[3],
+        actual_duration=row[4],
+        pause_count=row[5],
+        was_skipped=bool(row[6]),
+        was_completed=bool(row[7]),
+        task_id=row[8],
+        task_name=row[9],
+    )
+
+
+def _task_row(data: dict) -> tuple:
+    return (
+        data['task_id'], data['name'], data['target_seconds'],
+        data.get('total_seconds', 0), data['created_at'], data.get('completed_at'),
+        int(bool(data.get('is_completed'))),
+    )
+
+
+def _task_from_row(row) -> Task:
+    return Task(
+        task_id=row[0],
+        name=row[1],
+        target_seconds=row[2],
+        total_seconds=row[3],
+        created_at=datetime.fromisoformat(row[4]),
+        completed_at=datetime.fromisoformat(row[5]) if row[5] else None,
+        is_completed=bool(row[6]),
+    )
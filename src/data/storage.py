@@ -1,44 +1,259 @@
 import json
+import os
+import zlib
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from ..core.session import SessionData
+from ..core.session_table import SessionTable
+from .migrations import SESSION_LOG_HEADER, MigrationRunner, is_header, iter_jsonl, migrate_sessions
+from .writer import PersistenceWriter
+
+
+READ_BLOCK_SIZE = 64 * 1024
+# Bytes before a remembered offset that must be unchanged for the offset to
+# still mean the same place in the log: several whole records, since the
+# tail of one record is the same in most of them.
+CHECK_BYTES = 4096
+
 
 class SessionStorage:
-    def __init__(self, storage_path: Path = None):
+    # read_only reads the log as it is, for quick looks that must not change
+    # anything: it is neither migrated nor created, a missing log reads as
+    # empty, and saving fails.
+    def __init__(self, storage_path: Path = None, legacy_path: Path = None,
+                 writer: Optional[PersistenceWriter] = None,
+                 migrations: Optional[MigrationRunner] = None, read_only: bool = False):
         if storage_path is None:
-            storage_path = Path(__file__).parent.parent / 'data' / 'sessions.json'
+            storage_path = Path(__file__).parent.parent / 'data' / 'sessions.jsonl'
+        if legacy_path is None:
+            legacy_path = storage_path.with_suffix('.json')
         self.storage_path = storage_path
-        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        
+        self.legacy_path = legacy_path
+        self.writer = writer
+        self.migrations = migrations
+        self.read_only = read_only
+        if not read_only:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self._tail_checked = False
+        self._ready = read_only
+        # (offset of the last complete line counted, check of the bytes
+        # before it, records before it) for count_sessions().
+        self._counted = (0, 0, 0)
+
+        # With a runner the files are upgraded in the background and we only
+        # wait for it on first access; standalone storages upgrade right away.
+        if migrations is None:
+            self._ensure_ready()
+
+    def _ensure_ready(self):
+        if self._ready:
+            return
+        if self.migrations is not None:
+            self.migrations.wait()
+        else:
+            migrate_sessions(self.storage_path, self.legacy_path)
         if not self.storage_path.exists():
             self._init_storage()
-    
+        self._ready = True
+
     def _init_storage(self):
-        with open(self.storage_path, 'w', encoding='utf-8') as f:
-            json.dump({'sessions': []}, f, indent=2)
-            
+        with open(self.storage_path, 'wb') as f:
+            f.write(SESSION_LOG_HEADER)
+
     def save_session(self, session: SessionData):
-        data = self._load_data()
-        data['sessions'].append(session.to_dict())
-        self._save_data(data)
-    
+        self._check_writable()
+        self._ensure_ready()
+        line = self._encode(session.to_dict())
+        if not self._tail_checked:
+            if self._has_torn_tail():
+                line = '\n' + line
+            self._tail_checked = True
+        if self.writer is not None:
+            self.writer.submit_append(self.storage_path, line.encode('utf-8'))
+            return
+        with open(self.storage_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
     def load_sessions(self) -> List[SessionData]:
-        data = self._load_data()
-        return [SessionData.from_dict(s) for s in data['sessions']]
-    
+        return [SessionData.from_dict(s) for s in self._iter_records()]
+
+    def iter_sessions(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      session_type: Optional[str] = None, reverse: bool = False,
+                      limit: Optional[int] = None) -> Iterator[SessionData]:
+        # Streams records in log order (newest first with reverse=True). since
+        # is inclusive and until exclusive, both on start_time. A reverse read
+        # walks the file backwards in blocks, so the last N records cost O(N).
+        if limit is not None and limit <= 0:
+            return
+        yielded = 0
+        for record in self._iter_records(reverse=reverse):
+            if session_type is not None and record.get('session_type') != session_type:
+                continue
+            if since is not None or until is not None:
+                start_time = datetime.fromisoformat(record['start_time'])
+                if since is not None and start_time < since:
+                    continue
+                if until is not None and start_time >= until:
+                    continue
+            yield SessionData.from_dict(record)
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    def load_table(self) -> SessionTable:
+        return SessionTable.from_dicts(self._iter_records())
+
+    def iter_sessions_from(self, position: Optional[int] = None) -> Iterator[Tuple[SessionData, int]]:
+        # Sessions saved after `position` (a position this yielded before;
+        # None: the start), each with the position just past it. A line still
+        # being written is left for a later call.
+        self._flush_pending()
+        try:
+            for record, offset in iter_jsonl(self.storage_path, position):
+                yield SessionData.from_dict(record), offset
+        except FileNotFoundError:
+            return
+
+    def position_check(self, position: Optional[int]):
+        # Equal for equal log contents up to `position`, so a log rewritten
+        # since (cleared history) is noticed; None when it no longer reaches
+        # that far.
+        if not position:
+            return 0
+        self._flush_pending()
+        return log_check(self.storage_path, position)
+
+    def count_sessions(self) -> int:
+        # The number of records iter_sessions() yields: blank lines and torn
+        # appends are not sessions. That takes parsing every line, so the
+        # count up to the last complete line is kept and the next call only
+        # reads what was appended since, unless the log was rewritten.
+        self._flush_pending()
+        try:
+            f = open(self.storage_path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            offset, check, count = self._counted
+            if offset and _check_bytes(f, offset) != check:
+                offset, count = 0, 0
+            f.seek(offset)
+            tail = 0
+            for line in f:
+                if line.endswith(b'\n'):
+                    offset += len(line)
+                    count += _parse_line(line) is not None
+                else:
+                    # Counted while unfinished, like iter_sessions() does.
+                    tail = _parse_line(line) is not None
+            self._counted = (offset, _check_bytes(f, offset), count)
+        return count + tail
+
+    def generation(self) -> str:
+        # Changes whenever the log is appended to or rewritten.
+        self._flush_pending()
+        try:
+            st = os.stat(self.storage_path)
+        except FileNotFoundError:
+            return 'jsonl:missing'
+        return f'jsonl:{st.st_size}:{st.st_mtime_ns}'
+
     def clear_all_sessions(self):
-        self._save_data({'sessions': []})
-        
-    def _load_data(self) -> dict:
+        self._check_writable()
+        self._ensure_ready()
+        self._tail_checked = True
+        if self.writer is not None:
+            self.writer.submit_replace(self.storage_path, SESSION_LOG_HEADER)
+            return
+        self._init_storage()
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f'{self.storage_path} is open read-only')
+
+    def _has_torn_tail(self) -> bool:
+        try:
+            with open(self.storage_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except FileNotFoundError:
+            return False
+
+    def flush(self):
+        # Make every queued write visible to readers of the file itself.
+        self._flush_pending()
+
+    def _flush_pending(self):
+        self._ensure_ready()
+        if self.writer is not None:
+            self.writer.flush(self.storage_path)
+
+    def _iter_records(self, reverse: bool = False) -> Iterator[dict]:
+        self._flush_pending()
         try:
-            with open(self.storage_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {'sessions': []}
-        
-    def _save_data(self, data: dict):
-        with open(self.storage_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            
-            
\ No newline at end of file
+            with open(self.storage_path, 'rb') as f:
+                lines = _iter_lines_reversed(f) if reverse else f
+                for line in lines:
+                    record = _parse_line(line)
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _encode(record: dict) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _parse_line(line: bytes) -> Optional[dict]:
+    # The session record on a log line; None for blank lines, the header and
+    # torn fragments of an interrupted append.
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or is_header(record):
+        return None
+    return record
+
+
+def log_check(path: Path, offset: int) -> Optional[int]:
+    # Identifies a log's content up to `offset`; None when the file is
+    # missing or shorter.
+    try:
+        with open(path, 'rb') as f:
+            return _check_bytes(f, offset)
+    except FileNotFoundError:
+        return None
+
+
+def _check_bytes(f, offset: int) -> Optional[int]:
+    # CRC of the bytes just before `offset`; None if the file is shorter.
+    start = max(0, offset - CHECK_BYTES)
+    f.seek(start)
+    data = f.read(offset - start)
+    if len(data) < offset - start:
+        return None
+    return zlib.crc32(data)
+
+
+def _iter_lines_reversed(f) -> Iterator[bytes]:
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    remainder = b''
+    while position > 0:
+        size = min(READ_BLOCK_SIZE, position)
+        position -= size
+        f.seek(position)
+        block = f.read(size) + remainder
+        lines = block.split(b'\n')
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            yield line
+    yield remainder
@@ -1,56 +1,119 @@
+import copy
 import json
+import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from ..core.task import Task
+from .migrations import SCHEMA_VERSION, MigrationRunner
+from .writer import PersistenceWriter, atomic_write
 
 
 class TaskStorage:
-    def __init__(self, storage_path: Path = None):
+    # read_only: see SessionStorage.
+    def __init__(self, storage_path: Path = None, writer: Optional[PersistenceWriter] = None,
+                 migrations: Optional[MigrationRunner] = None, read_only: bool = False):
         if storage_path is None:
             storage_path = Path(__file__).parent.parent / 'data' / 'tasks.json'
         self.storage_path = storage_path
-        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self.read_only = read_only
+        if not read_only:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self.writer = writer
+        self.migrations = migrations
 
-        if not self.storage_path.exists():
+        # task_id -> Task, in file order. Reloaded only when the file's
+        # (mtime, size) signature changes behind our back.
+        self._tasks: Dict[str, Task] = {}
+        self._active_ids: Dict[str, None] = {}
+        self._signature = None
+
+        if migrations is None and not read_only and not self.storage_path.exists():
             self._init_storage()
 
     def _init_storage(self):
         with open(self.storage_path, 'w', encoding='utf-8') as f:
-            json.dump({"tasks": []}, f, indent=2)
+            json.dump({"version": SCHEMA_VERSION, "tasks": []}, f, indent=2)
 
     def save_task(self, task: Task):
-        data = self._load_data()
-        existing_index = None
-        for i, t in enumerate(data['tasks']):
-            if t['task_id'] == task.task_id:
-                existing_index = i
-                break
-
-        if existing_index is not None:
-            data['tasks'][existing_index] = task.to_dict()
+        self._ensure_loaded()
+        self._tasks[task.task_id] = copy.copy(task)
+        if task.is_completed:
+            self._active_ids.pop(task.task_id, None)
         else:
-            data['tasks'].append(task.to_dict())
+            self._active_ids[task.task_id] = None
+        self._write_through()
 
-        self._save_data(data)
+    def save_tasks(self, tasks: List[Task]):
+        # Bulk update: one file write however many tasks change.
+        self._ensure_loaded()
+        for task in tasks:
+            self._tasks[task.task_id] = copy.copy(task)
+            if task.is_completed:
+                self._active_ids.pop(task.task_id, None)
+            else:
+                self._active_ids[task.task_id] = None
+        self._write_through()
 
     def load_tasks(self, include_completed: bool = False) -> List[Task]:
-        data = self._load_data()
-        tasks = [Task.from_dict(t) for t in data['tasks']]
-        if not include_completed:
-            tasks = [t for t in tasks if not t.is_completed]
-        return tasks
+        self._ensure_loaded()
+        if include_completed:
+            return [copy.copy(t) for t in self._tasks.values()]
+        return [copy.copy(self._tasks[task_id]) for task_id in self._active_ids]
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        tasks = self.load_tasks(include_completed=True)
-        for task in tasks:
-            if task.task_id == task_id:
-                return task
-        return None
+        self._ensure_loaded()
+        task = self._tasks.get(task_id)
+        return copy.copy(task) if task is not None else None
 
     def delete_task(self, task_id: str):
+        self._ensure_loaded()
+        if self._tasks.pop(task_id, None) is not None:
+            self._active_ids.pop(task_id, None)
+            self._write_through()
+
+    def _ensure_loaded(self):
+        if self.migrations is not None:
+            self.migrations.wait()
+            self.migrations = None
+            if not self.storage_path.exists():
+                self._init_storage()
+        if self.writer is not None and self.writer.is_pending(self.storage_path):
+            # Our own write is queued or in flight; the cache is authoritative.
+            return
+        signature = self._stat_signature()
+        if signature is not None and signature == self._signature:
+            return
+
         data = self._load_data()
-        data['tasks'] = [t for t in data['tasks'] if t['task_id'] != task_id]
+        self._tasks = {}
+        self._active_ids = {}
+        for t in data['tasks']:
+            task = Task.from_dict(t)
+            self._tasks[task.task_id] = task
+            if not task.is_completed:
+                self._active_ids[task.task_id] = None
+        self._signature = signature
+
+    def _write_through(self):
+        if self.read_only:
+            raise PermissionError(f'{self.storage_path} is open read-only')
+        data = {"version": SCHEMA_VERSION, "tasks": [t.to_dict() for t in self._tasks.values()]}
+        if self.writer is not None:
+            self.writer.submit_replace(self.storage_path, lambda: _encode(data),
+                                       on_written=self._on_written)
+            return
         self._save_data(data)
+        self._signature = self._stat_signature()
+
+    def _on_written(self):
+        self._signature = self._stat_signature()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.storage_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
     def _load_data(self) -> dict:
         try:
@@ -60,5 +123,8 @@ class TaskStorage:
             return {"tasks": []}
 
     def _save_data(self, data: dict):
-        with open(self.storage_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        atomic_write(self.storage_path, _encode(data))
+
+
+def _encode(data: dict) -> bytes:
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+from ..core.fileio import atomic_write
+
+logger = logging.getLogger(__name__)
+
+REPLACE = 'replace'
+APPEND = 'append'
+
+
+def append_bytes(path: Path, data: bytes):
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class _PendingWrite:
+    __slots__ = ('mode', 'payload', 'tail', 'on_written')
+
+    def __init__(self, mode: str, payload, tail: bytes, on_written: Optional[Callable]):
+        self.mode = mode
+        self.payload = payload
+        self.tail = tail
+        self.on_written = on_written
+
+    def resolve(self) -> bytes:
+        payload = self.payload() if callable(self.payload) else self.payload
+        return payload + self.tail
+
+
+def _chained(first: Optional[Callable], second: Optional[Callable]) -> Optional[Callable]:
+    if first is None or second is None:
+        return first or second
+
+    def both():
+        first()
+        second()
+    return both
+
+
+class PersistenceWriter:
+    # Writes are queued per path and coalesced: a replace supersedes anything
+    # still pending for that path, and appends are concatenated onto whatever
+    # is pending. Each path therefore needs at most one disk operation per
+    # wakeup no matter how many writes were submitted. A replace payload may be
+    # a callable so serialization also happens on the writer thread. A failed
+    # write is logged, and raised again by the next flush() covering its path.
+    def __init__(self):
+        self._pending: Dict[Path, _PendingWrite] = {}
+        self._in_flight: Dict[Path, None] = {}
+        self._errors: Dict[Path, BaseException] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.writes_completed = 0
+        self.writes_coalesced = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+        self.last_error: Optional[BaseException] = None
+
+        self._thread = threading.Thread(target=self._run, name='PersistenceWriter', daemon=True)
+        self._thread.start()
+
+    def submit_replace(self, path: Path, data: Union[bytes, Callable[[], bytes]],
+                       on_written: Optional[Callable] = None):
+        with self._cond:
+            self._check_open()
+            if path in self._pending:
+                self.writes_coalesced += 1
+            self._pending[path] = _PendingWrite(REPLACE, data, b'', on_written)
+            self._cond.notify()
+
+    def submit_append(self, path: Path, data: bytes, on_written: Optional[Callable] = None):
+        with self._cond:
+            self._check_open()
+            pending = self._pending.get(path)
+            if pending is None:
+                self._pending[path] = _PendingWrite(APPEND, b'', data, on_written)
+            else:
+                pending.tail += data
+                pending.on_written = _chained(pending.on_written, on_written)
+                self.writes_coalesced += 1
+            self._cond.notify()
+
+    def is_pending(self, path: Path) -> bool:
+        with self._cond:
+            return path in self._pending or path in self._in_flight
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def average_latency(self) -> float:
+        if self.writes_completed == 0:
+            return 0.0
+        return self.total_latency / self.writes_completed
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue_depth(),
+            'writes_completed': self.writes_completed,
+            'writes_coalesced': self.writes_coalesced,
+            'last_latency': self.last_latency,
+            'average_latency': self.average_latency(),
+        }
+
+    def flush(self, path: Optional[Path] = None, timeout: Optional[float] = None) -> bool:
+        # False on timeout. Raises the first write to `path` (or any path)
+        # that failed since the last flush, once.
+        def done():
+            if path is None:
+                return not self._pending and not self._in_flight
+            return path not in self._pending and path not in self._in_flight
+
+        with self._cond:
+            flushed = self._cond.wait_for(done, timeout)
+            if path is None:
+                error = next(iter(self._errors.values()), None)
+                self._errors.clear()
+            else:
+                error = self._errors.pop(path, None)
+        if error is not None:
+            raise error
+        return flushed
+
+    def close(self, timeout: Optional[float] = None):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError('PersistenceWriter is closed')
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending and self._closed:
+                    return
+                path, pending = next(iter(self._pending.items()))
+                del self._pending[path]
+                self._in_flight[path] = None
+
+            start = time.perf_counter()
+            try:
+                if pending.mode == REPLACE:
+                    atomic_write(path, pending.resolve())
+                else:
+                    append_bytes(path, pending.tail)
+                if pending.on_written is not None:
+                    pending.on_written()
+            except Exception as e:
+                logger.exception("Writing %s failed", path)
+                error = e
+            else:
+                error = None
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                if error is not None:
+                    self.last_error = error
+                    self._errors.setdefault(path, error)
+                del self._in_flight[path]
+                self.writes_completed += 1
+                self.last_latency = elapsed
+                self.total_latency += elapsed
+                self._cond.notify_all()
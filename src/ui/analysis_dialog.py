@@ -1,56 +1,168 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QPushButton
-from PySide6.QtCore import Qt
-from ..analysis.analyzer import FocusAnalyzer
+import threading
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QTextEdit, QPushButton, QProgressBar, QLabel
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from ..analysis.cache import CachedAnalyzer
 from ..analysis.suggestions import SuggestionGenerator
-from ..core.session import SessionData
-from typing import List
+from typing import Optional
+
+SECTIONS = [
+    ("Completion", "completion_insights"),
+    ("Time of Day", "time_of_day_insights"),
+    ("Weekly Pattern", "weekly_insights"),
+    ("Pauses", "pause_insights"),
+    ("Duration", "duration_insights"),
+    ("Session Length", "length_insights"),
+    ("Consistency", "consistency_insights"),
+    ("Recommendations", "generate_recommendations"),
+]
+
+
+class AnalysisSignals(QObject):
+    counted = Signal(int, int)
+    section_ready = Signal(str, list)
+    progress = Signal(int, str)
+    finished = Signal()
+    failed = Signal(str)
+
+
+class AnalysisWorker(QRunnable):
+    # Runs the analysis off the GUI thread, one section at a time. cancel()
+    # takes effect between sections; a section already running completes
+    # but is not reported.
+    def __init__(self, analyzer, total_sessions: Optional[int] = None, predictor=None,
+                 planned_duration: int = 25 * 60):
+        super().__init__()
+        self.analyzer = analyzer
+        self.total_sessions = total_sessions
+        self.predictor = predictor
+        self.planned_duration = planned_duration
+        self.signals = AnalysisSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            if self._cancelled.is_set():
+                return
+            try:
+                self.signals.failed.emit(str(e))
+            except RuntimeError:
+                # The application quit while the worker was still running.
+                pass
+
+    def _run(self):
+        steps = len(SECTIONS) + 1
+        self.signals.progress.emit(0, "Loading history...")
+        analyzer = self.analyzer
+        work_sessions = analyzer.work_session_count
+        total = self.total_sessions
+        if total is None:
+            total = getattr(analyzer, "session_count", work_sessions)
+        if self._cancelled.is_set():
+            return
+        self.signals.counted.emit(total, work_sessions)
+        if total < 5:
+            self.signals.finished.emit()
+            return
+
+        generator = SuggestionGenerator(analyzer, self.predictor, self.planned_duration)
+        for done, (title, method) in enumerate(SECTIONS, 1):
+            self.signals.progress.emit(done * 100 // steps, f"Analyzing {title.lower()}...")
+            lines = getattr(generator, method)()
+            if self._cancelled.is_set():
+                return
+            self.signals.section_ready.emit(title, lines)
+
+        if isinstance(analyzer, CachedAnalyzer):
+            analyzer.save()
+        self.signals.progress.emit(100, "Done")
+        self.signals.finished.emit()
 
 
 class AnalysisDialog(QDialog):
-    def __init__(self, sessions: List[SessionData], parent=None):
+    # Takes anything with the FocusAnalyzer API: a FocusAnalyzer, a
+    # ColumnarFocusAnalyzer, the incremental FocusAggregates or a
+    # CachedAnalyzer that builds one of those lazily. The analysis runs on
+    # the global thread pool so the main window keeps ticking.
+    def __init__(self, analyzer, parent=None, total_sessions: Optional[int] = None,
+                 predictor=None, planned_duration: int = 25 * 60):
         super().__init__(parent)
-        self.sessions = sessions
+        if not isinstance(analyzer, CachedAnalyzer):
+            # Insights and recommendations share most of their inputs.
+            analyzer = CachedAnalyzer(analyzer)
+        self.analyzer = analyzer
+        self.total_sessions = total_sessions
+        self.predictor = predictor
+        self.planned_duration = planned_duration
         self.setWindowTitle("Focus Analysis")
         self.setMinimumSize(500, 400)
         self._setup_ui()
+        self._start_worker()
 
     def _setup_ui(self):
         layout = QVBoxLayout()
 
+        self.status_label = QLabel("Loading history...")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+
         self.text_view = QTextEdit()
         self.text_view.setReadOnly(True)
 
-        if len(self.sessions) < 5:
-            self.text_view.setPlainText("Not enough data for analysis.\n\nComplete at least 5 sessions to see insights.")
-        else:
-            analysis_text = self._generate_analysis()
-            self.text_view.setPlainText(analysis_text)
-
         close_btn = QPushButton("Close")
         close_btn.clicked.connect(self.accept)
 
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.progress_bar)
         layout.addWidget(self.text_view)
         layout.addWidget(close_btn)
 
         self.setLayout(layout)
 
-    def _generate_analysis(self) -> str:
-        analyzer = FocusAnalyzer(self.sessions)
-        suggestion_gen = SuggestionGenerator(analyzer)
-
-        insights = suggestion_gen.generate_insights()
-        recommendations = suggestion_gen.generate_recommendations()
+    def _start_worker(self):
+        self.worker = AnalysisWorker(self.analyzer, self.total_sessions, self.predictor, self.planned_duration)
+        self.worker.signals.counted.connect(self._on_counted)
+        self.worker.signals.section_ready.connect(self._on_section_ready)
+        self.worker.signals.progress.connect(self._on_progress)
+        self.worker.signals.finished.connect(self._on_finished)
+        self.worker.signals.failed.connect(self._on_failed)
+        QThreadPool.globalInstance().start(self.worker)
 
+    def _on_counted(self, total_sessions: int, work_sessions: int):
+        self.total_sessions = total_sessions
+        if total_sessions < 5:
+            self.text_view.setPlainText("Not enough data for analysis.\n\nComplete at least 5 sessions to see insights.")
+            return
         text = "=== FOCUS ANALYSIS ===\n\n"
-        text += f"Total sessions analyzed: {len(self.sessions)}\n"
-        text += f"Work sessions: {len(analyzer.work_sessions)}\n\n"
+        text += f"Total sessions analyzed: {total_sessions}\n"
+        text += f"Work sessions: {work_sessions}"
+        self.text_view.setPlainText(text)
+
+    def _on_section_ready(self, title: str, lines: list):
+        if not lines:
+            return
+        text = f"\n--- {title} ---\n"
+        for line in lines:
+            text += f"• {line}\n"
+        self.text_view.append(text.rstrip("\n"))
+
+    def _on_progress(self, percent: int, message: str):
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(message)
 
-        text += "--- Key Insights ---\n"
-        for insight in insights:
-            text += f"• {insight}\n"
+    def _on_finished(self):
+        self.progress_bar.hide()
+        self.status_label.hide()
 
-        text += "\n--- Recommendations ---\n"
-        for rec in recommendations:
-            text += f"• {rec}\n"
+    def _on_failed(self, message: str):
+        self.progress_bar.hide()
+        self.status_label.setText(f"Analysis failed: {message}")
 
-        return text
+    def done(self, result: int):
+        # Covers Close, Escape and the window's close button.
+        self.worker.cancel()
+        super().done(result)
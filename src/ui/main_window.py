@@ -1,5 +1,6 @@
 from PySide6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QMenuBar, QMenu
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QEvent, Qt, QThreadPool, QTimer
+from datetime import datetime
 from PySide6.QtGui import QAction
 from ..core.timer import PomodoroTimer
 from ..core.config import PomodoroConfig, ConfigManager
@@ -8,8 +9,12 @@ from .controls import TimerControls
 from .analog_clock import AnalogClockWidget
 from .settings_dialog import SettingsDialog
 from .task_dialog import TaskDialog
-from ..data.storage import SessionStorage
-from ..data.task_storage import TaskStorage
+from ..analysis.aggregates import AggregateStore
+from ..analysis.predictor import CompletionPredictor
+from ..data.backends import create_storages
+from ..data.journal import TimerJournal
+from ..data.migrations import MigrationRunner
+from ..data.writer import PersistenceWriter
 
 
 class MainWindow(QMainWindow):
@@ -18,10 +23,20 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Pomodoro Timer")
         self.setMinimumSize(500, 600)
 
-        self.config_manager = ConfigManager()
+        self.migrations = MigrationRunner().start()
+        self.writer = PersistenceWriter()
+        self.config_manager = ConfigManager(writer=self.writer)
         self.config = self.config_manager.load()
-        self.storage = SessionStorage()
-        self.task_storage = TaskStorage()
+        self.storage, self.task_storage = create_storages(
+            self.config, writer=self.writer, migrations=self.migrations)
+        self.analytics = AggregateStore(self.storage, writer=self.writer,
+                                        workers=self.config.analysis_workers)
+        # Warm the aggregates (and per-task stats) without holding up startup.
+        QThreadPool.globalInstance().start(self.analytics.load)
+        # predict() only reads the exported weights; the training thread (and
+        # with it sklearn) starts once the window is up.
+        self.predictor = CompletionPredictor()
+        QTimer.singleShot(5000, lambda: self.predictor.start(self.storage))
         self.current_task = None
 
         self.timer = PomodoroTimer(self.config)
@@ -32,6 +47,25 @@ class MainWindow(QMainWindow):
         self._setup_menu()
         self._setup_ui()
 
+        self.journal = TimerJournal()
+        self._restore_timer()
+        self.journal.attach(self.timer.machine,
+                            lambda: self.current_task.task_id if self.current_task else None)
+
+    def _restore_timer(self):
+        # Pick up the session a crashed (or closed) run left in flight; one
+        # that should have ended meanwhile completes on the next wakeup.
+        record = self.journal.last_record()
+        if record is None:
+            return
+        if record.task_id is not None:
+            self.current_task = self.task_storage.get_task(record.task_id)
+            if self.current_task:
+                self.task_label.setText(f"Task: {self.current_task.name}")
+        self.journal.restore(self.timer.machine, record)
+        self.controls.set_running_state(self.timer.is_running)
+        self.journal.compact()
+
     def _setup_menu(self):
         menubar = self.menuBar()
         menubar.setNativeMenuBar(False)
@@ -177,11 +211,11 @@ class MainWindow(QMainWindow):
 
     def on_start(self):
         if self.timer.get_current_phase() == "work" and self.current_task is None:
-            dialog = TaskDialog(self)
+            dialog = TaskDialog(self.task_storage, self, task_stats=self.analytics.task_stats)
             if dialog.exec():
                 self.current_task = dialog.get_selected_task()
                 if self.current_task:
-                    self.task_label.setText(f"Task: {self.current_task.name}")
+                    self.task_label.setText(f"Task: {self.current_task.name}{self._completion_hint()}")
                     self.timer.start()
                     self.controls.set_running_state(True)
             else:
@@ -190,6 +224,10 @@ class MainWindow(QMainWindow):
             self.timer.start()
             self.controls.set_running_state(True)
 
+    def _completion_hint(self) -> str:
+        chance = self.predictor.predict(datetime.now(), self.timer.total_seconds, self.current_task.task_id)
+        return f" ({chance * 100:.0f}% likely to complete)" if chance is not None else ""
+
     def on_pause(self):
         self.timer.pause()
         self.controls.set_running_state(False)
@@ -226,6 +264,9 @@ class MainWindow(QMainWindow):
             self.task_label.setText("No task selected")
 
         self.storage.save_session(session)
+        # Reads the log back, which waits for the writer: not on this thread.
+        QThreadPool.globalInstance().start(self.analytics.sync)
+        self.predictor.observe(session)
 
     def show_settings(self):
         dialog = SettingsDialog(self.config, self)
@@ -236,18 +277,21 @@ class MainWindow(QMainWindow):
         self.config = new_config
         self.config_manager.save(new_config)
         self.timer.config = new_config
+        self.analytics.workers = new_config.analysis_workers
         self.timer.reset()
         self.update_time_display(self.timer.get_remaining_time())
     
     def show_history(self):
-        sessions = self.storage.load_sessions()
+        total = self.storage.count_sessions()
+        recent = list(self.storage.iter_sessions(reverse=True, limit=10))
+        recent.reverse()
         from PySide6.QtWidgets import QMessageBox
         msg = QMessageBox(self)
         msg.setWindowTitle("Session History")
-        msg.setText(f"Total sessions: {len(sessions)}")
+        msg.setText(f"Total sessions: {total}")
         
         details = []
-        for i, session in enumerate(sessions[-10:], 1):
+        for i, session in enumerate(recent, 1):
             status = "Completed" if session.was_completed else "Skipped"
             task_info = f" - {session.task_name}" if session.task_name else ""
             details.append(f"{i}. {session.session_type} - {status}{task_info} - {session.start_time.strftime('%Y-%m-%d %H:%M')}")
@@ -265,14 +309,41 @@ class MainWindow(QMainWindow):
         )
         if reply == QMessageBox.Yes:
             self.storage.clear_all_sessions()
+            self.analytics.reset()
             QMessageBox.information(self, "Success", "Session history cleared.")
 
     def show_task_manager(self):
-        dialog = TaskDialog(self)
+        dialog = TaskDialog(self.task_storage, self, task_stats=self.analytics.task_stats)
         dialog.exec()
 
     def show_analysis(self):
         from .analysis_dialog import AnalysisDialog
-        sessions = self.storage.load_sessions()
-        dialog = AnalysisDialog(sessions, self)
+        from ..analysis.cache import CachedAnalyzer
+        # The aggregates are loaded (or rebuilt) by the dialog's worker thread,
+        # and only on a cache miss. The cache key is read there too: it waits
+        # for queued session writes.
+        analyzer = CachedAnalyzer(self.analytics.snapshot, key=self.storage.generation, writer=self.writer)
+        dialog = AnalysisDialog(analyzer, self, predictor=self.predictor,
+                                planned_duration=self.config.work_duration * 60)
         dialog.exec()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._update_timer_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._update_timer_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self._update_timer_visibility()
+
+    def _update_timer_visibility(self):
+        self.timer.set_display_visible(self.isVisible() and not self.isMinimized())
+
+    def closeEvent(self, event):
+        self.journal.close()
+        self.writer.close()
+        super().closeEvent(event)
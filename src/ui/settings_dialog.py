@@ -1,7 +1,9 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-                               QSpinBox, QPushButton, QFormLayout)
+                               QSpinBox, QPushButton, QFormLayout, QComboBox)
 from PySide6.QtCore import Signal
+from dataclasses import replace
 from ..core.config import PomodoroConfig
+from ..data.backends import BACKENDS
 
 
 class SettingsDialog(QDialog):
@@ -42,6 +44,19 @@ class SettingsDialog(QDialog):
         self.sessions_spin.setValue(self.config.sessions_before_long_break)
         form_layout.addRow("Sessions Before Long Break:", self.sessions_spin)
 
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(BACKENDS)
+        self.backend_combo.setCurrentText(self.config.storage_backend)
+        self.backend_combo.setToolTip("Takes effect after restarting the app")
+        form_layout.addRow("Storage Backend:", self.backend_combo)
+
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 64)
+        self.workers_spin.setSpecialValueText("Auto")
+        self.workers_spin.setValue(self.config.analysis_workers)
+        self.workers_spin.setToolTip("Processes used to rebuild analysis over the full history")
+        form_layout.addRow("Analysis Workers:", self.workers_spin)
+
         layout.addLayout(form_layout)
 
         button_layout = QHBoxLayout()
@@ -58,11 +73,14 @@ class SettingsDialog(QDialog):
         self.setLayout(layout)
 
     def on_apply(self):
-        new_config = PomodoroConfig(
+        new_config = replace(
+            self.config,
             work_duration=self.work_duration_spin.value(),
             short_break=self.short_break_spin.value(),
             long_break=self.long_break_spin.value(),
-            sessions_before_long_break=self.sessions_spin.value()
+            sessions_before_long_break=self.sessions_spin.value(),
+            storage_backend=self.backend_combo.currentText(),
+            analysis_workers=self.workers_spin.value()
         )
         self.settings_changed.emit(new_config)
         self.accept()
@@ -9,11 +9,13 @@ from ..data.task_storage import TaskStorage
 class TaskDialog(QDialog):
     task_selected = Signal(Task)
 
-    def __init__(self, parent=None):
+    def __init__(self, task_storage: TaskStorage = None, parent=None, task_stats=None):
         super().__init__(parent)
         self.setWindowTitle("Select or Create Task")
         self.setMinimumSize(500, 400)
-        self.task_storage = TaskStorage()
+        self.task_storage = task_storage if task_storage is not None else TaskStorage()
+        # Optional task_id -> TaskStats lookup, e.g. AggregateStore.task_stats.
+        self.task_stats = task_stats
         self.selected_task = None
         self._setup_ui()
 
@@ -98,7 +100,13 @@ class TaskDialog(QDialog):
             worked_min = task.total_seconds // 60
             target_min = task.target_seconds // 60
             item_text = f"{task.name} ({worked_min}/{target_min} min) - {progress:.0f}%"
+            stats = self.task_stats(task.task_id) if self.task_stats is not None else None
+            if stats is not None:
+                item_text += f" - {stats.sessions} sessions, {stats.completion_rate * 100:.0f}% completed"
             item = QListWidgetItem(item_text)
+            if stats is not None:
+                last_worked = stats.last_worked.strftime('%Y-%m-%d %H:%M') if stats.last_worked else "never"
+                item.setToolTip(f"Average pauses: {stats.average_pauses:.1f}\nLast worked: {last_worked}")
             item.setData(256, task.task_id)
             self.task_list.addItem(item)
 
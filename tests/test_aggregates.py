@@ -0,0 +1,241 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.analysis.aggregates import AggregateStore
+from src.data.sqlite_storage import SqliteDatabase, SqliteSessionStorage
+from src.data.storage import SessionStorage
+
+from .test_storage import make_session
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def open_storage(request, tmp_path):
+    # Opens the data dir's session log; every call is a separate handle, as
+    # another process (the control daemon, a restart) would have.
+    if request.param == "jsonl":
+        return lambda: SessionStorage(tmp_path / "sessions.jsonl")
+    return lambda: SqliteSessionStorage(SqliteDatabase(tmp_path / "pomodoro.db"))
+
+
+def open_store(storage, tmp_path):
+    return AggregateStore(storage, tmp_path / "analytics.json")
+
+
+def test_load_rebuild_and_verify(open_storage, tmp_path):
+    storage = open_storage()
+    for i in range(5):
+        storage.save_session(make_session(i, duration=60 * (i + 1)))
+    store = open_store(storage, tmp_path)
+    loaded = store.load()
+    assert loaded.session_count == 5 and loaded.duration_sum == 900
+    assert store.verify() == []
+
+    rebuilt = store.rebuild()
+    assert rebuilt.to_dict() == loaded.to_dict()
+    assert store.verify() == []
+
+
+def test_load_replays_sessions_saved_after_the_snapshot(open_storage, tmp_path):
+    storage = open_storage()
+    for i in range(3):
+        storage.save_session(make_session(i, duration=600))
+    open_store(storage, tmp_path).load()
+
+    # Saved while no store was running (a crash before the snapshot, or
+    # another process).
+    storage.save_session(make_session(3, duration=100))
+    storage.save_session(make_session(4, duration=200))
+    store = open_store(open_storage(), tmp_path)
+    aggregates = store.load()
+    assert aggregates.session_count == 5 and aggregates.duration_sum == 2100
+    assert store.verify() == []
+
+
+def test_sync_folds_in_sessions_saved_by_another_process(open_storage, tmp_path):
+    # The window and the control daemon both append to one log.
+    window, daemon = open_storage(), open_storage()
+    store = open_store(window, tmp_path)
+    store.load()
+    daemon.save_session(make_session(0, duration=100))
+    window.save_session(make_session(1, duration=1000))
+    store.sync()
+    assert store.snapshot().session_count == 2 and store.snapshot().duration_sum == 1100
+
+    aggregates = open_store(open_storage(), tmp_path).load()
+    assert aggregates.session_count == 2 and aggregates.duration_sum == 1100
+
+
+def test_torn_tail_is_not_counted(tmp_path):
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    for i in range(3):
+        storage.save_session(make_session(i, duration=200))
+    with open(storage.storage_path, "ab") as f:
+        f.write(b'{"session_type": "wo')
+    store = open_store(storage, tmp_path)
+    aggregates = store.load()
+    assert aggregates.session_count == 3 and aggregates.duration_sum == 600
+
+    # After a restart the fragment ends as a line of its own, never a session.
+    storage = SessionStorage(storage.storage_path)
+    storage.save_session(make_session(3, duration=100))
+    store = open_store(storage, tmp_path)
+    aggregates = store.load()
+    assert aggregates.session_count == 4 and aggregates.duration_sum == 700
+    assert store.verify() == []
+
+
+def test_cleared_log_triggers_a_rebuild(open_storage, tmp_path):
+    storage = open_storage()
+    for i in range(3):
+        storage.save_session(make_session(i))
+    open_store(storage, tmp_path).load()
+
+    # Cleared and refilled past the snapshot's position behind its back.
+    storage.clear_all_sessions()
+    for i in range(4):
+        storage.save_session(make_session(i, duration=50))
+    store = open_store(open_storage(), tmp_path)
+    aggregates = store.load()
+    assert aggregates.session_count == 4 and aggregates.duration_sum == 200
+    assert store.verify() == []
+
+
+def test_log_refilled_to_the_same_length_triggers_a_rebuild(open_storage, tmp_path):
+    storage = open_storage()
+    for i in range(3):
+        storage.save_session(make_session(i))
+    open_store(storage, tmp_path).load()
+
+    # Cleared and refilled behind its back with as many records of the same
+    # length, then one more.
+    storage.clear_all_sessions()
+    for i in range(5, 9):
+        storage.save_session(make_session(i, duration=200))
+    store = open_store(open_storage(), tmp_path)
+    aggregates = store.load()
+    assert aggregates.session_count == 4 and aggregates.duration_sum == 800
+    assert store.verify() == []
+
+
+def test_reset_then_sync(open_storage, tmp_path):
+    storage = open_storage()
+    store = open_store(storage, tmp_path)
+    storage.save_session(make_session(0))
+    store.sync()
+    store.load()
+    storage.clear_all_sessions()
+    store.reset()
+    storage.save_session(make_session(1, duration=30))
+    store.sync()
+    assert store.snapshot().session_count == 1 and store.snapshot().duration_sum == 30
+    assert open_store(open_storage(), tmp_path).load().session_count == 1
+
+
+def test_parallel_build_stops_at_the_last_complete_line(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.analysis.parallel.PARALLEL_MIN_BYTES", 0)
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    for i in range(20):
+        storage.save_session(make_session(i, duration=10 * i))
+    with open(storage.storage_path, "ab") as f:
+        f.write(b'{"session_type": "wo')
+    store = AggregateStore(storage, tmp_path / "analytics.json", workers=2)
+    aggregates = store.rebuild()
+    assert aggregates.session_count == 20 and aggregates.duration_sum == 1900
+    assert store.verify() == []
+
+    storage = SessionStorage(storage.storage_path)
+    storage.save_session(make_session(20, duration=100))
+    store = AggregateStore(storage, tmp_path / "analytics.json", workers=2)
+    assert store.load().session_count == 21
+    assert store.verify() == []
+
+
+def test_snapshot_includes_sessions_the_daemon_saved(tmp_path):
+    from src.cli.daemon import ControlDaemon
+    window = SessionStorage(tmp_path / "sessions.jsonl")
+    store = open_store(window, tmp_path)
+    window.save_session(make_session(0, duration=1000))
+    store.sync()
+    assert store.load().session_count == 1
+
+    loop = asyncio.new_event_loop()
+    try:
+        daemon = ControlDaemon(tmp_path, loop)
+        daemon._on_session_completed(make_session(1, duration=100))
+        loop.run_until_complete(daemon.close())
+    finally:
+        loop.close()
+    aggregates = store.snapshot()
+    assert aggregates.session_count == 2 and aggregates.duration_sum == 1100
+    assert store.verify() == []
+
+
+def test_load_on_a_worker_thread(tmp_path):
+    # As the window does: the storage is opened on one thread and the
+    # analytics load on a pool thread.
+    storage = SqliteSessionStorage(SqliteDatabase(tmp_path / "pomodoro.db"))
+    for i in range(3):
+        storage.save_session(make_session(i))
+    store = open_store(storage, tmp_path)
+    errors = []
+
+    def load():
+        try:
+            store.load()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=load)
+    thread.start()
+    thread.join()
+    assert errors == []
+    storage.save_session(make_session(3))
+    store.sync()
+    assert store.snapshot().session_count == 4
+    storage.db.close()
+
+
+def test_sync_reads_the_log_without_holding_the_lock(tmp_path):
+    # The window runs sync() on a pool thread; task_stats() on the GUI
+    # thread must not wait for it to read the log.
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    store = open_store(storage, tmp_path)
+    store.load()
+    storage.save_session(make_session(0, duration=100))
+    read = storage.iter_sessions_from
+    locked = []
+
+    def iter_sessions_from(position):
+        locked.append(store._lock.locked())
+        return read(position)
+
+    storage.iter_sessions_from = iter_sessions_from
+    store.sync()
+    assert locked == [False]
+    assert store.snapshot().session_count == 1
+
+
+def test_snapshot_queued_on_the_writer_is_not_changed_by_later_sessions(tmp_path):
+    from src.data.writer import PersistenceWriter
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    storage.save_session(make_session(0, duration=100))
+    writer = PersistenceWriter()
+    store = AggregateStore(storage, tmp_path / "analytics.json", writer=writer)
+    store.load()
+    writer.flush()
+
+    # Hold the writer busy so the next snapshot is still queued, unencoded,
+    # while sessions on later days are folded in.
+    release = threading.Event()
+    writer.submit_replace(tmp_path / "blocker", lambda: release.wait() and b"")
+    storage.save_session(make_session(1, duration=200))
+    store.sync()
+    store._aggregates.add(make_session(48, duration=300))
+    release.set()
+    writer.close()
+
+    saved = AggregateStore(SessionStorage(storage.storage_path), tmp_path / "analytics.json")._load_snapshot()[0]
+    assert saved.session_count == 2 and saved.duration_sum == 300
+    assert saved.days.totals == [2]
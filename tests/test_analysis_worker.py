@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import Qt
+
+from src.analysis.aggregates import AggregateStore
+from src.analysis.cache import CachedAnalyzer
+from src.data.sqlite_storage import SqliteDatabase, SqliteSessionStorage
+from src.ui.analysis_dialog import SECTIONS, AnalysisWorker
+
+from .test_storage import make_session
+
+
+def test_worker_reads_sqlite_history_off_the_opening_thread(tmp_path):
+    # As show_analysis() does: storage opened on the GUI thread, the
+    # history read by the worker on a pool thread.
+    storage = SqliteSessionStorage(SqliteDatabase(tmp_path / "pomodoro.db"))
+    for i in range(6):
+        storage.save_session(make_session(i, duration=60 * 25))
+    store = AggregateStore(storage, tmp_path / "analytics.json")
+    analyzer = CachedAnalyzer(store.snapshot, key=storage.generation(),
+                              cache_path=tmp_path / "analysis_cache.json")
+    worker = AnalysisWorker(analyzer)
+    counted, sections, failed, finished = [], [], [], []
+    # Direct: there is no event loop here to deliver queued signals.
+    direct = Qt.ConnectionType.DirectConnection
+    worker.signals.counted.connect(lambda total, work: counted.append((total, work)), direct)
+    worker.signals.section_ready.connect(lambda title, lines: sections.append(title), direct)
+    worker.signals.failed.connect(lambda message: failed.append(message), direct)
+    worker.signals.finished.connect(lambda: finished.append(True), direct)
+
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    thread.join()
+    assert failed == []
+    assert counted == [(6, 6)] and finished == [True]
+    assert set(sections) <= {title for title, _ in SECTIONS}
+    storage.db.close()
@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.analysis.analyzer import FocusAnalyzer
+from src.core.session import SessionData
+
+from .test_storage import make_session
+
+
+def test_add_session_leaves_the_callers_list_alone():
+    sessions = [make_session(i) for i in range(3)]
+    analyzer = FocusAnalyzer(sessions)
+    analyzer.add_session(make_session(3))
+    assert len(sessions) == 3
+    assert analyzer.session_count == 4 and analyzer.work_session_count == 4
+
+
+def test_columnar_rolling_windows_reuse_the_day_buckets():
+    from src.analysis.columnar import ColumnarFocusAnalyzer
+    analyzer = ColumnarFocusAnalyzer.from_sessions([make_session(i * 12, duration=60) for i in range(6)])
+    first = analyzer.analyze_rolling_windows()
+    buckets = analyzer._day_buckets()
+    assert analyzer.analyze_rolling_windows() == first
+    assert analyzer.analyze_rolling_windows(windows=(3,)) == buckets.rolling_windows(windows=(3,))
+    assert analyzer._day_buckets() is buckets
+    assert first["completed"] == [2, 2, 2]
+
+
+def generated_history(days: int = 40, seed: int = 7):
+    # Work sessions and breaks over several weeks: completed, skipped and
+    # abandoned, paused or not, with and without a task, and idle days.
+    rng = random.Random(seed)
+    sessions = []
+    for day in range(days):
+        if rng.random() < 0.2:
+            continue
+        start = datetime(2024, 3, 1, 7) + timedelta(days=day, minutes=rng.randrange(0, 240))
+        for _ in range(rng.randrange(1, 9)):
+            planned = rng.choice((15, 25, 25, 50)) * 60
+            completed = rng.random() < 0.7
+            skipped = not completed and rng.random() < 0.5
+            actual = planned if completed else rng.randrange(30, planned)
+            task = rng.choice((None, "a", "b"))
+            sessions.append(SessionData(
+                session_type="work", start_time=start, end_time=start + timedelta(seconds=actual),
+                planned_duration=planned, actual_duration=actual, pause_count=rng.choice((0, 0, 1, 3)),
+                was_skipped=skipped, was_completed=completed,
+                task_id=task, task_name=task and f"Task {task}"))
+            start += timedelta(seconds=actual + 60)
+            sessions.append(SessionData(
+                session_type=rng.choice(("short_break", "long_break")), start_time=start,
+                planned_duration=300, actual_duration=300, was_completed=True))
+            start += timedelta(minutes=rng.randrange(6, 90))
+    return sessions
+
+
+@pytest.mark.parametrize("build", ["sessions", "table"])
+def test_columnar_analyzer_matches_the_loop_version(build):
+    from src.analysis.aggregates import ANALYSIS_METHODS
+    from src.analysis.columnar import ColumnarFocusAnalyzer
+    from src.core.session_table import SessionTable
+    sessions = generated_history()
+    expected = FocusAnalyzer(sessions)
+    if build == "sessions":
+        columnar = ColumnarFocusAnalyzer.from_sessions(sessions)
+    else:
+        columnar = ColumnarFocusAnalyzer.from_table(SessionTable.from_sessions(sessions))
+
+    assert columnar.work_session_count == expected.work_session_count
+    for name in ANALYSIS_METHODS:
+        assert getattr(columnar, name)() == getattr(expected, name)(), name
+    today = sessions[-1].start_time.date() + timedelta(days=3)
+    assert (columnar.analyze_rolling_windows((3, 14), today)
+            == expected.analyze_rolling_windows((3, 14), today))
@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+import pytest
+
+from src.analysis.aggregates import ANALYSIS_METHODS
+from src.analysis.analyzer import FocusAnalyzer
+from src.analysis.columnar import ColumnarFocusAnalyzer
+from src.cli.__main__ import main
+from src.core.session_table import datetime_to_us
+from src.data.archive import HEADER, RECORD, SessionArchive
+
+from .test_analyzer import generated_history
+from .test_storage import make_session
+
+
+def mixed_sessions():
+    sessions = generated_history(days=10)
+    # Unicode and task ids without names (or the reverse) survive the
+    # string table; no end time survives the flags.
+    sessions[0].task_id, sessions[0].task_name = "t1", "Café ☕ 日本"
+    sessions[1].task_id, sessions[1].task_name = None, "name only"
+    sessions[2].task_id, sessions[2].task_name = "id only", None
+    sessions[3].end_time = None
+    return sessions
+
+
+def test_roundtrip_through_a_reopened_archive(tmp_path):
+    sessions = mixed_sessions()
+    archive = SessionArchive(tmp_path / "sessions.psar")
+    assert archive.import_from(sessions, batch_size=7) == len(sessions)
+
+    archive = SessionArchive(tmp_path / "sessions.psar")
+    assert len(archive) == len(sessions)
+    assert list(archive.iter_sessions()) == sessions
+    assert list(archive.to_table()) == sessions
+    # Each distinct task is stored once.
+    tasks = {(s.task_id, s.task_name) for s in sessions} - {(None, None)}
+    assert len(archive.tasks) == len(tasks)
+    assert len((tmp_path / "sessions.psar.strings").read_text(encoding="utf-8").splitlines()) == len(tasks)
+
+
+def test_reverse_limit_and_since(tmp_path):
+    sessions = [make_session(i) for i in range(10)]
+    archive = SessionArchive(tmp_path / "sessions.psar")
+    archive.extend(sessions)
+
+    assert list(archive.iter_sessions(reverse=True)) == sessions[::-1]
+    assert list(archive.iter_sessions(reverse=True, limit=3)) == sessions[:-4:-1]
+    assert list(archive.iter_sessions(limit=3)) == sessions[:3]
+    assert list(archive.iter_sessions(limit=50)) == sessions
+    assert list(archive.iter_sessions(limit=0)) == []
+    since = sessions[6].start_time
+    assert list(archive.iter_sessions(since=since)) == sessions[6:]
+    assert list(archive.iter_sessions(since=since, reverse=True, limit=2)) == sessions[:-3:-1]
+    assert list(archive.iter_sessions(since=since + timedelta(days=1))) == []
+    assert list(SessionArchive(tmp_path / "empty.psar").iter_sessions(reverse=True)) == []
+
+
+def test_records_are_a_view_of_the_mapped_file(tmp_path):
+    sessions = mixed_sessions()
+    archive = SessionArchive(tmp_path / "sessions.psar")
+    archive.extend(sessions)
+
+    records = archive.records()
+    assert not records.flags.owndata and not records.flags.writeable
+    assert records.dtype.itemsize == RECORD.size
+    assert len(records) == len(sessions)
+    assert records["start_us"].tolist() == [datetime_to_us(s.start_time) for s in sessions]
+    assert records["actual_duration"].tolist() == [s.actual_duration for s in sessions]
+
+    # The same results as the loop analyzer, straight from the mapping.
+    columnar, expected = ColumnarFocusAnalyzer.from_records(records), FocusAnalyzer(sessions)
+    assert columnar.work_session_count == expected.work_session_count
+    for name in ANALYSIS_METHODS:
+        assert getattr(columnar, name)() == getattr(expected, name)(), name
+
+    # A view covers the records that existed when it was taken.
+    archive.append(make_session(100))
+    assert len(records) == len(sessions)
+    assert len(archive.records()) == len(sessions) + 1
+    assert len(SessionArchive(tmp_path / "empty.psar").records()) == 0
+
+
+def test_torn_append_is_truncated_on_open(tmp_path):
+    path = tmp_path / "sessions.psar"
+    archive = SessionArchive(path)
+    archive.extend([make_session(i) for i in range(3)])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD.size // 2))
+    with open(archive.strings_path, "ab") as f:
+        f.write('["torn", "ta'.encode("utf-8"))
+
+    # Read-only skips the torn tail without touching the files.
+    size = path.stat().st_size
+    reader = SessionArchive(path, read_only=True)
+    assert len(reader) == 3 and len(list(reader.iter_sessions())) == 3
+    assert path.stat().st_size == size
+    with pytest.raises(PermissionError):
+        reader.append(make_session(3))
+
+    archive = SessionArchive(path)
+    assert path.stat().st_size == HEADER.size + 3 * RECORD.size
+    session = make_session(3)
+    session.task_id, session.task_name = "t", "after the tear"
+    archive.append(session)
+    assert list(SessionArchive(path).iter_sessions())[-1] == session
+
+
+def test_unknown_session_type_is_rejected_before_writing(tmp_path):
+    archive = SessionArchive(tmp_path / "sessions.psar")
+    archive.append(make_session(0))
+    bad = make_session(1)
+    bad.session_type, bad.task_id, bad.task_name = "nap", "t", "never stored"
+    with pytest.raises(ValueError, match="Unknown session type 'nap'"):
+        archive.extend([make_session(2), bad])
+    assert len(archive) == 1 and archive.tasks == []
+    assert (tmp_path / "sessions.psar.strings").read_bytes() == b""
+
+
+def test_missing_or_foreign_file_read_only(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SessionArchive(tmp_path / "missing.psar", read_only=True)
+    assert not (tmp_path / "missing.psar").exists()
+    (tmp_path / "sessions.jsonl").write_text("{}\n" * 10)
+    with pytest.raises(ValueError, match="not a session archive"):
+        SessionArchive(tmp_path / "sessions.jsonl", read_only=True)
+
+
+def test_cli_reads_an_archive(tmp_path, capsys):
+    path = tmp_path / "sessions.psar"
+    sessions = [make_session(i, duration=600) for i in range(5)]
+    SessionArchive(path).extend(sessions)
+    data_dir = tmp_path / "data"
+
+    assert main(["--data-dir", str(data_dir), "log", "--archive", str(path), "-n", "2"]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
+    since = sessions[2].start_time.isoformat()
+    assert main(["--data-dir", str(data_dir), "stats", "--archive", str(path), "--since", since]) == 0
+    assert "3 sessions, 3 work" in capsys.readouterr().out
+    assert main(["--data-dir", str(data_dir), "stats", "--archive", str(tmp_path / "none.psar")]) == 1
+    assert "no session archive" in capsys.readouterr().err
+    assert not data_dir.exists()
@@ -0,0 +1,44 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.suite import TIERS, analyzer_methods, compare_results, run_suite, write_results
+
+# Only the 1k tier runs by default. Larger tiers are opt-in, e.g.
+#   POMODORO_BENCH_TIERS=1k,100k,1m python -m pytest tests/test_benchmarks.py
+# Set POMODORO_BENCH_OUTPUT to keep the JSON report and POMODORO_BENCH_BASELINE
+# to fail on regressions against an earlier report.
+BENCH_TIERS = [t for t in os.environ.get("POMODORO_BENCH_TIERS", "1k").split(",") if t]
+
+
+@pytest.mark.parametrize("tier", BENCH_TIERS)
+def test_benchmark_tier(tier, tmp_path):
+    assert tier in TIERS
+    report = run_suite([tier], tmp_path, repeat=1, trace_memory=tier == "1k")
+
+    names = {r["name"] for r in report["results"]}
+    for expected in ("save_session", "load_sessions", "save_task", "get_task",
+                     "SuggestionGenerator.generate_insights",
+                     "SuggestionGenerator.generate_recommendations"):
+        assert expected in names
+    for method in analyzer_methods():
+        assert f"FocusAnalyzer.{method}" in names
+    assert all(r["seconds"] >= 0 for r in report["results"])
+
+    output = os.environ.get("POMODORO_BENCH_OUTPUT")
+    path = write_results(report, tmp_path / "report.json" if not output else None)
+    assert json.loads(path.read_text())["results"]
+
+    baseline = os.environ.get("POMODORO_BENCH_BASELINE")
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare_results(json.load(f), report)
+        assert not regressions, regressions
+
+
+def test_compare_results_flags_slowdowns():
+    baseline = {"results": [{"name": "load_sessions", "tier": "1k", "seconds": 1.0}]}
+    current = {"results": [{"name": "load_sessions", "tier": "1k", "seconds": 1.5}]}
+    assert compare_results(baseline, current, tolerance=0.25)[0]["ratio"] == 1.5
+    assert compare_results(baseline, current, tolerance=0.6) == []
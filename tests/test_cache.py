@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from src.analysis.aggregates import ANALYSIS_METHODS
+from src.analysis.analyzer import FocusAnalyzer
+from src.analysis.cache import CACHE_VERSION, CachedAnalyzer
+from src.data.storage import SessionStorage
+from src.data.writer import PersistenceWriter
+
+from .test_analyzer import generated_history
+from .test_storage import make_session
+
+
+def results(analyzer) -> dict:
+    values = {name: getattr(analyzer, name)() for name in ANALYSIS_METHODS}
+    values["work_session_count"] = analyzer.work_session_count
+    return values
+
+
+class Builds:
+    # The analyzer factory CachedAnalyzer gets; counts cache misses.
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return FocusAnalyzer(self.sessions)
+
+
+def test_results_round_trip_through_the_cache_file(tmp_path):
+    sessions = generated_history(days=20)
+    expected = results(FocusAnalyzer(sessions))
+    cache_path = tmp_path / "analysis_cache.json"
+    builds = Builds(sessions)
+
+    cached = CachedAnalyzer(builds, key="g1", cache_path=cache_path)
+    assert results(cached) == expected and builds.count == 1
+    cached.save()
+    assert json.loads(cache_path.read_text())["key"] == "g1"
+
+    # Int dict keys (hours, weekdays, windows), nested dicts and floats all
+    # come back as they were, without building the analyzer.
+    reloaded = CachedAnalyzer(builds, key="g1", cache_path=cache_path)
+    assert results(reloaded) == expected
+    assert list(reloaded.analyze_weekly_pattern()) == list(expected["analyze_weekly_pattern"])
+    assert builds.count == 1
+
+
+def test_a_new_key_invalidates_the_cache(tmp_path):
+    cache_path = tmp_path / "analysis_cache.json"
+    old, new = Builds([make_session(i) for i in range(3)]), Builds([make_session(i) for i in range(5)])
+    cached = CachedAnalyzer(old, key="g1", cache_path=cache_path)
+    assert cached.work_session_count == 3
+    cached.save()
+    assert CachedAnalyzer(old, key="g1", cache_path=cache_path).work_session_count == 3
+    assert old.count == 1
+
+    cached = CachedAnalyzer(new, key="g2", cache_path=cache_path)
+    assert cached.work_session_count == 5 and new.count == 1
+    cached.save()
+    # Only the latest key is kept.
+    assert CachedAnalyzer(old, key="g1", cache_path=cache_path).work_session_count == 3
+    assert old.count == 2
+
+
+def test_storage_generation_as_the_key(tmp_path):
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    for i in range(3):
+        storage.save_session(make_session(i))
+    cache_path = tmp_path / "analysis_cache.json"
+
+    def build():
+        builds.append(True)
+        return FocusAnalyzer(storage.iter_sessions())
+
+    builds = []
+    # Resolved on first use, not when the analyzer is created.
+    cached = CachedAnalyzer(build, key=storage.generation, cache_path=cache_path)
+    assert cached.key == storage.generation
+    assert cached.work_session_count == 3 and cached.key == storage.generation()
+    cached.save()
+    assert CachedAnalyzer(build, key=storage.generation, cache_path=cache_path).work_session_count == 3
+    assert len(builds) == 1
+
+    storage.save_session(make_session(3))
+    assert CachedAnalyzer(build, key=storage.generation, cache_path=cache_path).work_session_count == 4
+    assert len(builds) == 2
+
+
+def test_no_key_means_no_cache_file(tmp_path):
+    cache_path = tmp_path / "analysis_cache.json"
+    for key in (None, lambda: None):
+        cached = CachedAnalyzer(Builds([make_session(0)]), key=key, cache_path=cache_path)
+        assert cached.work_session_count == 1
+        cached.save()
+    assert not cache_path.exists()
+
+
+@pytest.mark.parametrize("content", [
+    b"{not json",
+    b"\xff\xfe",
+    json.dumps({"version": CACHE_VERSION + 1, "key": "g1", "results": {}}).encode(),
+    json.dumps({"version": CACHE_VERSION, "key": "g1", "results": {"x": {"bad": 1}}}).encode(),
+    b"[]",
+])
+def test_unreadable_cache_is_a_miss(tmp_path, content):
+    cache_path = tmp_path / "analysis_cache.json"
+    cache_path.write_bytes(content)
+    builds = Builds([make_session(0)])
+    cached = CachedAnalyzer(builds, key="g1", cache_path=cache_path)
+    assert cached.work_session_count == 1 and builds.count == 1
+    cached.save()
+    assert CachedAnalyzer(builds, key="g1", cache_path=cache_path).work_session_count == 1
+    assert builds.count == 1
+
+
+def test_save_through_the_writer(tmp_path):
+    cache_path = tmp_path / "analysis_cache.json"
+    writer = PersistenceWriter()
+    try:
+        cached = CachedAnalyzer(Builds([make_session(0)]), key="g1", cache_path=cache_path, writer=writer)
+        assert cached.calculate_completion_rate() == 1.0
+        cached.save()
+        writer.flush(cache_path)
+    finally:
+        writer.close()
+    reloaded = CachedAnalyzer(lambda: pytest.fail("cache miss"), key="g1", cache_path=cache_path)
+    assert reloaded.calculate_completion_rate() == 1.0
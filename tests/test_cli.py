@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.cli.__main__ import main
+from src.core.config import PomodoroConfig
+from src.data.backends import create_storages
+
+from .test_storage import make_session
+
+
+def tree(path):
+    return sorted((p.relative_to(path), p.stat().st_size, p.stat().st_mtime_ns) for p in path.rglob("*"))
+
+
+@pytest.mark.parametrize("command", [["status"], ["log"], ["stats"]])
+def test_reads_create_nothing(command, tmp_path, capsys):
+    empty = tmp_path / "empty"
+    assert main(["--data-dir", str(empty), *command]) == 0
+    assert not empty.exists()
+    empty.mkdir()
+    assert main(["--data-dir", str(empty), *command]) == 0
+    assert list(empty.iterdir()) == []
+    out = capsys.readouterr().out
+    assert any(text in out for text in ("no timer has run yet", "no sessions", "0 sessions"))
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_log_leaves_the_data_dir_untouched(backend, tmp_path, capsys):
+    config = PomodoroConfig(storage_backend=backend)
+    (tmp_path / "config.json").write_text(json.dumps(config.to_dict()))
+    sessions, _ = create_storages(config, tmp_path)
+    for i in range(3):
+        sessions.save_session(make_session(i))
+    if backend == "sqlite":
+        sessions.db.close()
+    before = tree(tmp_path)
+
+    assert main(["--data-dir", str(tmp_path), "log", "-n", "2"]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
+    assert main(["--data-dir", str(tmp_path), "stats"]) == 0
+    assert "3 sessions" in capsys.readouterr().out
+    assert tree(tmp_path) == before
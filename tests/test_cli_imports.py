@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.core.config import PomodoroConfig
+from src.core.timer_engine import PomodoroStateMachine
+from src.data.journal import TimerJournal
+
+ROOT = Path(__file__).parent.parent
+# Imports `python -m src.cli status` may spend, in ms of -X importtime
+# cumulative time past interpreter startup (best of a few runs). Set
+# POMODORO_IMPORT_BUDGET_MS on unusually slow machines.
+IMPORT_BUDGET_MS = float(os.environ.get("POMODORO_IMPORT_BUDGET_MS", "60"))
+HEAVY = ("PySide6", "numpy", "pandas", "sklearn", "asyncio", "src.ui")
+
+
+def import_times(*args):
+    # {module: cumulative us} for everything imported after site, plus the
+    # names of every module imported at all.
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "src.cli", *args],
+                            cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    top_level, names, started = {}, set(), False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # One space after the bar, then two more per nesting level.
+        name = name[1:]
+        names.add(name.strip())
+        if name.startswith(" "):
+            continue
+        if started:
+            top_level[name] = int(cumulative)
+        started = started or name == "site"
+    return top_level, names
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # A journal with a paused session, so status parses a record.
+    journal = TimerJournal(tmp_path / "timer.journal")
+    machine = PomodoroStateMachine(PomodoroConfig())
+    journal.attach(machine)
+    machine.start()
+    machine.pause()
+    journal.close()
+    return tmp_path
+
+
+@pytest.mark.parametrize("command", [["status"], ["log"], ["stats", "--since", "2024-01-01"]])
+def test_cli_never_imports_heavy_modules(command, data_dir):
+    _, names = import_times("--data-dir", str(data_dir), *command)
+    heavy = sorted(n for n in names if n.split(".")[0] in HEAVY or n.startswith(HEAVY))
+    assert not heavy, heavy
+
+
+def test_status_import_budget(data_dir):
+    runs = [import_times("--data-dir", str(data_dir), "status") for _ in range(3)]
+    best, names = min(runs, key=lambda run: sum(run[0].values()))
+    assert "src.data.journal" in names
+    # dataclasses alone (through inspect) costs more than the rest of status.
+    assert "dataclasses" not in names and "src.analysis" not in names, sorted(best)
+    total_ms = sum(best.values()) / 1000
+    slowest = sorted(best.items(), key=lambda item: -item[1])[:5]
+    assert total_ms <= IMPORT_BUDGET_MS, f"{total_ms:.1f} ms of imports; slowest: {slowest}"
+
+
+def test_core_does_not_import_the_data_layer():
+    code = ("import sys, src.core.config, src.core.scheduler, src.core.session_table, src.core.task, "
+            "src.core.timer_engine; print(sorted(m for m in sys.modules if m.startswith(('src.data', 'src.analysis'))))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+import socket
+import threading
+
+import pytest
+
+from src.cli.daemon import ControlDaemon
+from src.cli.rpc import (INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, MAX_MESSAGE, METHOD_NOT_FOUND,
+                         PARSE_ERROR, RpcClient, RpcError, encode)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    loop = asyncio.new_event_loop()
+    daemon = ControlDaemon(tmp_path, loop)
+    yield daemon
+    loop.run_until_complete(daemon.close())
+    loop.close()
+
+
+def handle(daemon: ControlDaemon, message):
+    line = message if isinstance(message, bytes) else json.dumps(message).encode("utf-8")
+    response = daemon.handle_message(line)
+    return None if response is None else json.loads(response)
+
+
+def request(method: str, request_id=1, **params) -> dict:
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params:
+        message["params"] = params
+    return message
+
+
+def notification(method: str, **params) -> dict:
+    message = request(method, **params)
+    del message["id"]
+    return message
+
+
+def error_code(response: dict) -> int:
+    assert "result" not in response
+    return response["error"]["code"]
+
+
+def test_request_and_response(daemon):
+    response = handle(daemon, request("timer.status", request_id="a"))
+    assert response["jsonrpc"] == "2.0" and response["id"] == "a"
+    assert response["result"]["phase"] == "work" and not response["result"]["running"]
+
+    task = handle(daemon, request("tasks.create", name="Write", target_minutes=50))["result"]
+    listed = handle(daemon, {"jsonrpc": "2.0", "id": 2, "method": "tasks.list", "params": []})
+    assert [t["task_id"] for t in listed["result"]] == [task["task_id"]]
+
+    assert error_code(handle(daemon, request("timer.nope"))) == METHOD_NOT_FOUND
+    assert error_code(handle(daemon, request("tasks.create", name="x"))) == INVALID_PARAMS
+    assert error_code(handle(daemon, request("tasks.create", name="x", target_minutes=True))) == INVALID_PARAMS
+    response = handle(daemon, request("tasks.get", request_id=7, task_id="missing"))
+    assert response["id"] == 7 and "missing" in response["error"]["message"]
+
+
+def test_notifications_are_never_answered(daemon, monkeypatch, caplog):
+    assert handle(daemon, notification("timer.start")) is None
+    assert daemon.timer.is_running
+
+    # Not even when they fail.
+    assert handle(daemon, notification("timer.nope")) is None
+    assert handle(daemon, notification("tasks.create", name="x")) is None
+    assert handle(daemon, notification("tasks.get", task_id="missing")) is None
+
+    def broken():
+        raise OSError("disk gone")
+
+    monkeypatch.setitem(daemon.methods, "timer.pause", broken)
+    with caplog.at_level(logging.ERROR, logger="src.cli.daemon"):
+        assert handle(daemon, notification("timer.pause")) is None
+    assert "timer.pause failed" in caplog.text
+    response = handle(daemon, request("timer.pause", request_id=3))
+    assert response["id"] == 3 and error_code(response) == INTERNAL_ERROR
+
+    # "id": null is a request, not a notification.
+    assert handle(daemon, request("timer.status", request_id=None))["id"] is None
+
+
+def test_batch(daemon):
+    responses = handle(daemon, [
+        request("timer.status", request_id=1),
+        notification("timer.start"),
+        request("timer.nope", request_id=2),
+        notification("timer.nope"),
+        42,
+        request("timer.status", request_id=3),
+    ])
+    assert [r["id"] for r in responses] == [1, 2, None, 3]
+    assert not responses[0]["result"]["running"] and responses[3]["result"]["running"]
+    assert error_code(responses[1]) == METHOD_NOT_FOUND
+    assert error_code(responses[2]) == INVALID_REQUEST
+
+    # Only notifications: nothing at all comes back.
+    assert handle(daemon, [notification("timer.pause"), notification("timer.nope")]) is None
+    assert not daemon.timer.is_running
+    response = handle(daemon, [])
+    assert response["id"] is None and error_code(response) == INVALID_REQUEST
+
+
+@pytest.mark.parametrize("line, code", [
+    (b'{"jsonrpc": "2.0", "id": 1, "method": ', PARSE_ERROR),
+    (b'\xff\xfe', PARSE_ERROR),
+    (b'"timer.status"', INVALID_REQUEST),
+    (b'{"id": 1, "method": "timer.status"}', INVALID_REQUEST),
+    (b'{"jsonrpc": "1.0", "id": 1, "method": "timer.status"}', INVALID_REQUEST),
+    (b'{"jsonrpc": "2.0", "id": 1, "method": 5}', INVALID_REQUEST),
+    (b'{"jsonrpc": "2.0", "id": 1, "method": "timer.status", "params": "x"}', INVALID_REQUEST),
+])
+def test_malformed_messages(daemon, line, code):
+    response = handle(daemon, line)
+    assert error_code(response) == code
+    if code == PARSE_ERROR:
+        assert response["id"] is None
+
+
+def test_blank_lines_are_ignored(daemon):
+    assert daemon.handle_message(b"  \n") is None
+
+
+@pytest.fixture
+def served(daemon):
+    # The daemon's loop on a thread of its own, listening on a loopback port.
+    loop = daemon.engine.loop
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(daemon.start(("127.0.0.1", 0)), loop).result(5)
+    yield daemon
+    asyncio.run_coroutine_threadsafe(daemon.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_over_a_connection(served):
+    with RpcClient(served.address) as client:
+        assert client.call("timer.status")["running"] is False
+        # A notification first: the next line back answers the request.
+        client.sock.sendall(encode(notification("timer.nope")))
+        client.sock.sendall(encode(request("timer.start", request_id=99)))
+        assert client.receive()["id"] == 99
+        with pytest.raises(RpcError) as raised:
+            client.call("tasks.get", task_id="missing")
+        assert "missing" in raised.value.message
+        assert client.call("timer.pause")["running"] is False
+
+    # An over-long line gets an error and the connection is closed.
+    with socket.create_connection(served.address, timeout=5) as sock:
+        sock.sendall(b"x" * (MAX_MESSAGE + 10) + b"\n")
+        lines = sock.makefile("rb").read().splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["error"]["code"] == INVALID_REQUEST
@@ -0,0 +1,143 @@
+import time
+from datetime import datetime, timedelta
+
+from src.core.config import PomodoroConfig
+from src.core.timer_engine import PomodoroStateMachine
+from src.data import journal as journal_module
+from src.data.journal import HEADER, RECORD, JournalRecord, TimerJournal
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def journaled_machine(tmp_path):
+    clock = FakeClock()
+    machine = PomodoroStateMachine(PomodoroConfig(), clock)
+    journal = TimerJournal(tmp_path / "timer.journal")
+    journal.attach(machine)
+    return machine, journal, clock
+
+
+def record_count(journal: TimerJournal) -> int:
+    return (journal.journal_path.stat().st_size - HEADER.size) // RECORD.size
+
+
+def test_torn_tail_is_skipped_and_truncated_on_next_append(tmp_path):
+    machine, journal, clock = journaled_machine(tmp_path)
+    machine.start()
+    clock.now += 60
+    machine.pause()
+    journal.close()
+    with open(journal.journal_path, "ab") as f:
+        f.write(b"\x01" * (RECORD.size // 2))
+
+    journal = TimerJournal(journal.journal_path)
+    assert journal.last_record().kind == "pause"
+    assert [r.kind for r in journal.records()] == ["start", "pause"]
+    # The next run's machine appends after the intact records.
+    machine = PomodoroStateMachine(PomodoroConfig(), clock)
+    journal.attach(machine)
+    machine.start()
+    journal.close()
+    assert (journal.journal_path.stat().st_size - HEADER.size) % RECORD.size == 0
+    assert [r.kind for r in journal.records()] == ["start", "pause", "start"]
+
+
+def test_corrupt_tail_record_is_skipped(tmp_path):
+    machine, journal, clock = journaled_machine(tmp_path)
+    machine.start()
+    machine.pause()
+    journal.close()
+    with open(journal.journal_path, "r+b") as f:
+        f.seek(-3, 2)
+        f.write(b"\xff\xff\xff")
+
+    journal = TimerJournal(journal.journal_path)
+    assert journal.last_record().kind == "start"
+    machine = PomodoroStateMachine(PomodoroConfig(), clock)
+    journal.attach(machine)
+    machine.start()
+    machine.pause()
+    journal.close()
+    assert journal.last_record().kind == "pause"
+    assert [r.kind for r in journal.records()] == ["start", "start", "pause"]
+
+
+def test_compaction_keeps_only_the_last_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "COMPACT_RECORDS", 4)
+    machine, journal, clock = journaled_machine(tmp_path)
+    for _ in range(2):
+        machine.start()
+        machine.pause()
+    assert record_count(journal) == 1
+    assert journal.last_record().kind == "pause" and journal.last_record().pause_count == 2
+    machine.start()
+    journal.close()
+    assert [r.kind for r in journal.records()] == ["pause", "resume"]
+
+    # Explicitly, as on startup, from a journal not appended to this run.
+    journal = TimerJournal(journal.journal_path)
+    journal.compact()
+    assert record_count(journal) == 1
+    record = journal.last_record()
+    assert record.kind == "resume" and record.pause_count == 2
+
+
+def restored(journal: TimerJournal, record: JournalRecord, now: float) -> PomodoroStateMachine:
+    # Into a fresh machine whose monotonic clock has nothing in common with
+    # the old one's, as after a restart.
+    machine = PomodoroStateMachine(PomodoroConfig(), FakeClock(5000.0))
+    journal.restore(machine, record, now=now)
+    return machine
+
+
+def test_restore_running_session(tmp_path):
+    machine, journal, clock = journaled_machine(tmp_path)
+    machine.start()
+    journal.close()
+    record = journal.last_record()
+
+    restarted = restored(journal, record, now=record.recorded_at + 60)
+    assert restarted.is_running
+    assert abs(restarted.exact_remaining - (machine.total_seconds - 60)) < 1e-3
+    assert restarted.current_session.start_time == record.session_start
+    assert abs((record.session_start - machine.current_session.start_time).total_seconds()) < 1e-3
+
+
+def test_restore_paused_session(tmp_path):
+    machine, journal, clock = journaled_machine(tmp_path)
+    machine.start()
+    clock.now += 100
+    machine.pause()
+    journal.close()
+
+    # Time spent paused, or with the app closed, does not count.
+    record = journal.last_record()
+    restarted = restored(journal, record, now=record.recorded_at + 3600)
+    assert not restarted.is_running
+    assert restarted.exact_remaining == machine.total_seconds - 100
+    assert restarted.pause_count == 1 and restarted.current_session is not None
+
+
+def test_restore_overdue_session_completes_at_its_deadline(tmp_path):
+    total = PomodoroConfig().work_duration * 60
+    overdue = 100
+    now = time.time()
+    start = datetime.fromtimestamp(now) - timedelta(seconds=total + overdue)
+    # Started and journaled total + overdue seconds ago, then the app died.
+    record = JournalRecord("start", "work", 0, 0, start.timestamp(), total, total, start, None)
+
+    machine = restored(TimerJournal(tmp_path / "timer.journal"), record, now=now)
+    completed = []
+    machine.session_completed.connect(completed.append)
+    machine.wake()
+    assert len(completed) == 1
+    session = completed[0]
+    assert session.was_completed and session.actual_duration == total
+    assert abs((session.end_time - (start + timedelta(seconds=total))).total_seconds()) < 1.0
+    assert machine.current_phase == "short_break" and not machine.is_running
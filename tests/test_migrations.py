@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from src.data import migrations
+from src.data.migrations import (SESSION_LOG_HEADER, iter_json_array, iter_jsonl, json_file_version,
+                                 migrate_sessions, migrate_tasks)
+
+from .test_storage import make_session
+
+# Strings that are awkward to split: escapes, brackets and commas inside
+# strings, and multi-byte UTF-8.
+TRICKY_NAMES = ['plain', 'quote \\" and \\\\ backslash', 'in ] a [ string, too', '\\u00e9 escaped',
+                'café', '日本語', 'emoji \U0001f345', '']
+
+
+def tricky_records(count: int):
+    records = []
+    for i in range(count):
+        record = make_session(i).to_dict()
+        record["task_name"] = json.loads('"%s"' % TRICKY_NAMES[i % len(TRICKY_NAMES)])
+        record["task_id"] = None if i % 3 else f"t{i}"
+        records.append(record)
+    return records
+
+
+def write_legacy(path, key: str, records, ensure_ascii: bool = False, **extra):
+    data = {**extra, key: records}
+    path.write_bytes(json.dumps(data, ensure_ascii=ensure_ascii, indent=1).encode("utf-8"))
+
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+def test_iter_json_array_across_chunk_boundaries(tmp_path, monkeypatch, chunk_size, ensure_ascii):
+    monkeypatch.setattr(migrations, "READ_CHUNK_SIZE", chunk_size)
+    path = tmp_path / "sessions.json"
+    records = tricky_records(len(TRICKY_NAMES) * 2)
+    # A key after the array name's first mention inside a string, and numbers
+    # that can be cut in the middle.
+    write_legacy(path, "sessions", records, ensure_ascii,
+                 note='"sessions": [] is not it', total=1234567.25)
+
+    items = list(iter_json_array(path, "sessions"))
+    assert [item for item, _ in items] == records
+
+    # Offsets are file byte offsets to resume from.
+    data = path.read_bytes()
+    for i, (item, offset) in enumerate(items):
+        assert data[:offset].decode("utf-8").rstrip().endswith("}")
+        rest = [item for item, _ in iter_json_array(path, "sessions", offset)]
+        assert rest == records[i + 1:]
+
+
+def test_iter_json_array_missing_key_and_empty_array(tmp_path):
+    path = tmp_path / "tasks.json"
+    path.write_text('{"other": [1, 2]}')
+    assert list(iter_json_array(path, "tasks")) == []
+    path.write_text('{"tasks": [ ]}')
+    assert list(iter_json_array(path, "tasks")) == []
+
+
+class Crash(Exception):
+    pass
+
+
+def crashing_after(count: int, read):
+    def read_items(*args, **kwargs):
+        for n, item in enumerate(read(*args, **kwargs)):
+            if n == count:
+                raise Crash
+            yield item
+    return read_items
+
+
+@pytest.mark.parametrize("crash_at", [4, 8, 10])
+def test_legacy_sessions_migration_resumes_from_its_checkpoint(tmp_path, monkeypatch, crash_at):
+    monkeypatch.setattr(migrations, "CHECKPOINT_EVERY", 4)
+    legacy, log = tmp_path / "sessions.json", tmp_path / "sessions.jsonl"
+    records = tricky_records(18)
+    write_legacy(legacy, "sessions", records)
+
+    monkeypatch.setattr(migrations, "iter_json_array", crashing_after(crash_at, iter_json_array))
+    with pytest.raises(Crash):
+        migrate_sessions(log, legacy)
+    progress = json.loads((tmp_path / "sessions.jsonl.migrating.json").read_text())
+    assert progress["items"] == crash_at // 4 * 4
+    assert not log.exists() and legacy.exists()
+
+    # The rerun starts from the checkpoint, not the beginning.
+    offsets = []
+
+    def resumed(path, key, start_offset=None):
+        offsets.append(start_offset)
+        return iter_json_array(path, key, start_offset)
+
+    monkeypatch.setattr(migrations, "iter_json_array", resumed)
+    assert migrate_sessions(log, legacy)
+    assert offsets == [progress["source_offset"]]
+    assert log.read_bytes().startswith(SESSION_LOG_HEADER)
+    assert [record for record, _ in iter_jsonl(log)] == records
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["sessions.json.bak", "sessions.jsonl"]
+
+
+def test_log_rewrite_restarts_when_the_source_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "CHECKPOINT_EVERY", 2)
+    log = tmp_path / "sessions.jsonl"
+    records = tricky_records(9)
+    log.write_bytes(b"".join(migrations.encode_session_line(r) for r in records))
+
+    monkeypatch.setattr(migrations, "iter_jsonl", crashing_after(5, iter_jsonl))
+    with pytest.raises(Crash):
+        migrate_sessions(log)
+    assert (tmp_path / "sessions.jsonl.migrating.json").exists()
+
+    # Appended to before the rerun: the checkpoint no longer applies.
+    extra = make_session(20).to_dict()
+    with open(log, "ab") as f:
+        f.write(migrations.encode_session_line(extra))
+    monkeypatch.undo()
+    assert migrate_sessions(log)
+    assert [record for record, _ in iter_jsonl(log)] == records + [extra]
+    assert not migrate_sessions(log)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["sessions.jsonl"]
+
+
+def test_task_migration_keeps_non_ascii_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "READ_CHUNK_SIZE", 5)
+    path = tmp_path / "tasks.json"
+    tasks = [{"id": str(i), "name": name, "notes": "über — \U0001f345"}
+             for i, name in enumerate(json.loads('"%s"' % name) for name in TRICKY_NAMES)]
+    write_legacy(path, "tasks", tasks)
+    assert json_file_version(path) == 1
+
+    assert migrate_tasks(path)
+    data = json.loads(path.read_bytes().decode("utf-8"))
+    assert data == {"version": migrations.SCHEMA_VERSION, "tasks": tasks}
+    assert json_file_version(path) == migrations.SCHEMA_VERSION
+    assert not migrate_tasks(path)
+
+
+def test_json_file_version_with_version_anywhere(tmp_path):
+    path = tmp_path / "config.json"
+    assert json_file_version(path) is None
+    path.write_text('{"version": 2, "work_duration": 25}')
+    assert json_file_version(path) == 2
+    path.write_text(json.dumps({"work_duration": 25, "theme": "x" * 300, "version": 3}, indent=2))
+    assert json_file_version(path) == 3
+    path.write_text('{"work_duration": 25, "nested": {"version": 5}}')
+    assert json_file_version(path) == 1
+    path.write_text('{"version": "2"}')
+    assert json_file_version(path) == 1
+    path.write_text('{"version": 2')
+    assert json_file_version(path) == 1
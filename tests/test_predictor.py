@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("sklearn")
+
+from src.analysis.predictor import CompletionPredictor
+from src.data.sqlite_storage import SqliteDatabase, SqliteSessionStorage
+
+from .test_storage import make_session
+
+
+def test_initial_training_covers_sessions_observed_before_start(tmp_path):
+    # As the window does: the storage is opened on the GUI thread, sessions
+    # are observed right after being saved, and training starts later on
+    # the predictor's own thread.
+    storage = SqliteSessionStorage(SqliteDatabase(tmp_path / "pomodoro.db"))
+    predictor = CompletionPredictor(tmp_path / "completion_model.json")
+    for i in range(8):
+        session = make_session(i)
+        storage.save_session(session)
+        predictor.observe(session)
+    predictor.start(storage)
+    predictor.wait_idle()
+    assert predictor.trained_sessions == 8
+
+    session = make_session(8)
+    storage.save_session(session)
+    predictor.observe(session)
+    predictor.wait_idle()
+    assert predictor.trained_sessions == 9
+    storage.db.close()
+
+
+@pytest.mark.parametrize("history", ["empty", "breaks"])
+def test_training_without_work_sessions(tmp_path, caplog, history):
+    storage = SqliteSessionStorage(SqliteDatabase(tmp_path / "pomodoro.db"))
+    if history == "breaks":
+        for i in range(3):
+            session = make_session(i)
+            session.session_type = "short_break"
+            storage.save_session(session)
+    predictor = CompletionPredictor(tmp_path / "completion_model.json")
+    assert predictor.train(storage.iter_sessions()) is None
+    assert predictor.predict(make_session(0).start_time, 1500) is None
+
+    predictor.start(storage)
+    session = make_session(3)
+    storage.save_session(session)
+    predictor.observe(session)
+    predictor.wait_idle()
+    assert "failed" not in caplog.text
+    assert predictor.trained_sessions == 1
+    assert predictor.predict(session.start_time, 1500) is not None
+    storage.db.close()
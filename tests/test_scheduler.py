@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from src.core.config import PomodoroConfig
+from src.core.scheduler import COMPACT_MIN, COMPACT_RATIO, TimerScheduler
+from src.core.timer_engine import PomodoroStateMachine
+
+from .test_journal import FakeClock
+
+
+def make_scheduler(coalesce: float = 0.0):
+    clock = FakeClock()
+    scheduler = TimerScheduler(clock, coalesce)
+    armed = []
+    scheduler.on_rearm = armed.append
+    return scheduler, clock, armed
+
+
+def make_machine(scheduler: TimerScheduler, clock: FakeClock, visible: bool = False) -> PomodoroStateMachine:
+    machine = PomodoroStateMachine(PomodoroConfig(), clock)
+    machine.set_display_visible(visible)
+    scheduler.add(machine)
+    return machine
+
+
+def live_entries(scheduler: TimerScheduler):
+    return sorted((when, sequence) for sequence, when in scheduler._live.values())
+
+
+def test_pause_skip_and_reset_remove_the_live_entry():
+    scheduler, clock, armed = make_scheduler()
+    machine = make_machine(scheduler, clock)
+    for stop in (machine.pause, machine.skip, machine.reset):
+        machine.start()
+        assert scheduler.pending == 1
+        assert scheduler.next_wakeup() == machine.deadline
+        stop()
+        assert scheduler.pending == 0
+        assert scheduler.next_wakeup() is None and armed[-1] is None
+    # Stale entries are never dispatched.
+    clock.now += 3600
+    assert scheduler.run_due() == 0
+
+
+def test_compaction_keeps_exactly_the_live_entries():
+    scheduler, clock, _ = make_scheduler()
+    machines = [make_machine(scheduler, clock) for _ in range(10)]
+    for machine in machines:
+        machine.start()
+    machines[1].pause()
+    compactions = 0
+    for _ in range(200):
+        clock.now += 1
+        size = len(scheduler._heap)
+        machines[0].pause()
+        machines[0].start()
+        assert len(scheduler._heap) <= COMPACT_RATIO * scheduler.pending + COMPACT_MIN
+        if len(scheduler._heap) < size:
+            compactions += 1
+            assert sorted((when, sequence) for when, sequence, _ in scheduler._heap) == live_entries(scheduler)
+    assert compactions > 0
+    assert scheduler.pending == 9
+    assert scheduler.next_wakeup() == min(m.deadline for m in machines if m.is_running)
+
+
+def test_coalesced_wakeups_complete_at_exact_deadlines():
+    scheduler, clock, armed = make_scheduler(coalesce=5.0)
+    machines = []
+    for _ in range(6):
+        machines.append(make_machine(scheduler, clock))
+        machines[-1].start()
+        clock.now += 1.5
+    deadlines = {machine: machine.deadline for machine in machines}
+    completed = {}
+    for machine in machines:
+        # Overdue as the machine sees it, in wall-clock seconds.
+        machine.session_completed.connect(
+            lambda session, machine=machine: completed.setdefault(
+                machine, (datetime.now() - session.end_time).total_seconds() - (clock.now - deadlines[machine])))
+
+    while armed[-1] is not None:
+        clock.now = armed[-1]
+        scheduler.run_due()
+        # Breaks are not started; only the work sessions run.
+        if len(completed) == len(machines):
+            break
+    assert len(completed) == len(machines)
+    assert all(abs(error) < 0.5 for error in completed.values())
+    assert scheduler.wakeups < len(machines)
+    assert scheduler.dispatched == len(machines)
+
+
+def test_remove_while_an_entry_is_pending():
+    scheduler, clock, armed = make_scheduler()
+    kept, removed = make_machine(scheduler, clock), make_machine(scheduler, clock)
+    removed.start()
+    clock.now += 60
+    kept.start()
+    assert scheduler.pending == 2 and armed[-1] == removed.deadline
+
+    scheduler.remove(removed)
+    assert scheduler.pending == 1 and len(scheduler) == 1
+    assert armed[-1] == kept.deadline
+    clock.now = kept.deadline
+    assert scheduler.run_due() == 1
+    assert not kept.is_running and scheduler.next_wakeup() is None
+    # Still running on its own, but no longer driven.
+    assert removed.is_running
+    removed.pause()
+    removed.start()
+    assert scheduler.pending == 0
@@ -0,0 +1,91 @@
+import bisect
+import random
+
+import pytest
+
+from src.analysis.sketch import QuantileSketch, merged
+
+QS = [i / 100 for i in range(1, 100)]
+
+
+def rank_error(sketch: QuantileSketch, values: list) -> float:
+    # Worst distance, as a fraction of the inputs, between a requested rank
+    # and the exact rank range of what the sketch answered, over quantile()
+    # and rank() both. Duplicates make the exact rank a range.
+    exact = sorted(values)
+    n = len(exact)
+
+    def exact_ranks(value):
+        return bisect.bisect_left(exact, value) / n, bisect.bisect_right(exact, value) / n
+
+    worst = 0.0
+    for q in QS:
+        low, high = exact_ranks(sketch.quantile(q))
+        worst = max(worst, low - q, q - high)
+    for value in exact[::max(1, n // 200)]:
+        low, high = exact_ranks(value)
+        estimate = sketch.rank(value)
+        worst = max(worst, low - estimate, estimate - high)
+    return worst
+
+
+def inputs(kind: str, n: int = 20_000):
+    rng = random.Random(kind)
+    if kind == "uniform":
+        return [rng.random() for _ in range(n)]
+    if kind == "durations":
+        return [rng.randrange(60, 3600) for _ in range(n)]
+    if kind == "duplicates":
+        return [rng.randrange(12) for _ in range(n)]
+    if kind == "ascending":
+        return list(range(n))
+    return list(range(n, 0, -1))
+
+
+KINDS = ["uniform", "durations", "duplicates", "ascending", "descending"]
+
+
+@pytest.mark.parametrize("k", [64, 128])
+@pytest.mark.parametrize("kind", KINDS)
+def test_quantiles_within_the_stated_error(kind, k):
+    values = inputs(kind)
+    sketch = QuantileSketch(k)
+    sketch.update(values)
+    assert len(sketch) == len(values)
+    assert sum(len(level) for level in sketch.levels) < 4 * k
+    assert rank_error(sketch, values) <= 1.7 / k
+
+
+@pytest.mark.parametrize("k", [64, 128])
+@pytest.mark.parametrize("kind", KINDS)
+def test_merged_quantiles_within_the_stated_error(kind, k):
+    # Uneven parts, as per-day or per-worker sketches are; some go through
+    # their serialized form first.
+    values = inputs(kind)
+    rng = random.Random(k)
+    parts, start = [], 0
+    while start < len(values):
+        end = start + rng.randrange(1, 5000)
+        part = QuantileSketch(k)
+        part.update(values[start:end])
+        if len(parts) % 2:
+            part = QuantileSketch.from_dict(part.to_dict())
+        parts.append(part)
+        start = end
+    sketch = merged(parts, k)
+    assert len(sketch) == len(values)
+    assert rank_error(sketch, values) <= 1.7 / k
+
+
+def test_small_inputs_are_exact():
+    values = [5, 1, 4, 2, 3]
+    sketch = QuantileSketch(16)
+    sketch.update(values)
+    assert sketch.quantiles([0.2, 0.5, 1.0]) == [1, 3, 5]
+    assert rank_error(sketch, values) == 0
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_merge_requires_the_same_k():
+    with pytest.raises(ValueError):
+        QuantileSketch(64).merge(QuantileSketch(128))
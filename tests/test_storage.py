@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from src.core.config import PomodoroConfig
+from src.core.session import SessionData
+from src.core.task import Task
+from src.data.backends import create_storages
+from src.data.migrations import iter_session_records
+from src.data.sqlite_storage import SqliteDatabase, SqliteSessionStorage
+from src.data.storage import SessionStorage
+
+
+def make_session(i: int, duration: int = 100) -> SessionData:
+    return SessionData(session_type="work", start_time=datetime(2024, 5, 1, 9) + timedelta(hours=i),
+                       planned_duration=duration, actual_duration=duration, was_completed=True)
+
+
+def test_count_sessions_matches_iter_sessions(tmp_path):
+    storage = SessionStorage(tmp_path / "sessions.jsonl")
+    for i in range(3):
+        storage.save_session(make_session(i))
+    with open(storage.storage_path, "ab") as f:
+        f.write(b"\n   \n")
+        f.write(b'{"session_type": "wo')
+    assert storage.count_sessions() == len(list(storage.iter_sessions())) == 3
+
+    # After a restart the torn fragment is ended as a line of its own,
+    # still not a session.
+    storage = SessionStorage(storage.storage_path)
+    assert storage.count_sessions() == 3
+    storage.save_session(make_session(3))
+    assert storage.count_sessions() == len(list(storage.iter_sessions())) == 4
+
+    storage.clear_all_sessions()
+    storage.save_session(make_session(4))
+    assert storage.count_sessions() == len(list(storage.iter_sessions())) == 1
+
+
+def test_reading_a_collected_database_leaves_it_untouched(tmp_path):
+    path = tmp_path / "profile" / "pomodoro.db"
+    db = SqliteDatabase(path)
+    storage = SqliteSessionStorage(db)
+    for i in range(3):
+        storage.save_session(make_session(i))
+    # As written by an older version.
+    db.conn.execute("PRAGMA user_version = 1")
+    db.conn.execute("PRAGMA journal_mode = DELETE")
+    db.close()
+    before = path.read_bytes()
+
+    records = list(iter_session_records(path))
+    assert [r["start_time"] for r in records] == [make_session(i).start_time.isoformat() for i in range(3)]
+    assert path.read_bytes() == before
+    assert sorted(p.name for p in path.parent.iterdir()) == ["pomodoro.db"]
+
+
+def test_sessions_saved_in_json_mode_reach_sqlite(tmp_path):
+    json_config, sqlite_config = PomodoroConfig(), PomodoroConfig(storage_backend="sqlite")
+
+    def switch(config):
+        storages = create_storages(config, tmp_path)
+        if config is sqlite_config:
+            # Closed as the app would on exit; the next switch reopens it.
+            storages[0].db.close()
+        return storages
+
+    sessions, tasks = switch(json_config)
+    sessions.save_session(make_session(0))
+    task = Task.create("Write", 60)
+    tasks.save_task(task)
+    switch(sqlite_config)
+
+    # Back in JSON mode after the first import.
+    sessions, tasks = switch(json_config)
+    sessions.save_session(make_session(1))
+    task.add_session(600)
+    tasks.save_task(task)
+    sessions, tasks = create_storages(sqlite_config, tmp_path)
+    assert [s.start_time for s in sessions.iter_sessions()] == [make_session(i).start_time for i in range(2)]
+    assert tasks.get_task(task.task_id).total_seconds == 600
+    sessions.db.close()
+
+    # History cleared in JSON mode: nothing already imported comes back twice.
+    sessions, _ = switch(json_config)
+    sessions.clear_all_sessions()
+    sessions.save_session(make_session(1))
+    sessions.save_session(make_session(2))
+    sessions, _ = create_storages(sqlite_config, tmp_path)
+    assert sessions.count_sessions() == 3
+    sessions.db.close()
+    sessions, _ = create_storages(sqlite_config, tmp_path)
+    assert sessions.count_sessions() == 3
+    sessions.db.close()
@@ -0,0 +1,87 @@
+import math
+import random
+from datetime import datetime
+
+from src.core.config import PomodoroConfig
+from src.core.timer_engine import PomodoroStateMachine
+
+from .test_journal import FakeClock
+
+
+def driven_machine():
+    # A machine whose requested wakeups are recorded, for the test to deliver
+    # late or not at all, as a stalled or busy event loop would.
+    clock = FakeClock()
+    machine = PomodoroStateMachine(PomodoroConfig(), clock)
+    wakeups, shown, completed = [], [], []
+    machine.wakeup_changed.connect(wakeups.append)
+    machine.time_updated.connect(shown.append)
+    machine.session_completed.connect(
+        lambda session: completed.append((session, datetime.now(), clock.now)))
+    return machine, clock, wakeups, shown, completed
+
+
+def test_late_and_skipped_ticks_do_not_drift():
+    machine, clock, wakeups, shown, completed = driven_machine()
+    total = machine.total_seconds
+    rng = random.Random(3)
+    machine.start()
+    started = clock.now
+    deadline = machine.deadline
+    assert deadline == started + total
+
+    paused_for = 0.0
+    while not completed:
+        wakeup = wakeups[-1]
+        if rng.random() < 0.1:
+            # Several ticks missed outright.
+            clock.now = wakeup + rng.uniform(5, 90)
+        else:
+            clock.now = wakeup + rng.uniform(0, 0.9)
+        if rng.random() < 0.02 and clock.now < machine.deadline:
+            machine.pause()
+            clock.now += 600
+            paused_for += 600
+            machine.start()
+            assert machine.deadline == deadline + paused_for
+        machine.wake()
+        if completed:
+            break
+        # Always the time actually left, however late the tick was.
+        elapsed = clock.now - started - paused_for
+        assert abs(machine.exact_remaining - (total - elapsed)) < 1e-6
+        assert machine.remaining_seconds == math.ceil(total - elapsed - 1e-9)
+        assert shown[-1] == machine.remaining_seconds
+        assert shown == sorted(shown, reverse=True)
+        # The next wakeup is the next displayed change, never past the deadline.
+        assert clock.now < wakeups[-1] <= machine.deadline + 0.01
+
+    assert paused_for > 0
+    session, wall_now, completed_at = completed[0]
+    assert session.was_completed and session.actual_duration == total and session.pause_count > 0
+    # Recorded as ending at the deadline, not at the late wakeup that saw it.
+    overdue = completed_at - (deadline + paused_for)
+    assert overdue >= 0
+    assert abs((wall_now - session.end_time).total_seconds() - overdue) < 0.5
+    assert machine.current_phase == "short_break" and not machine.is_running
+
+
+def test_hidden_timer_wakes_once_at_the_deadline():
+    machine, clock, wakeups, shown, completed = driven_machine()
+    machine.set_display_visible(False)
+    machine.start()
+    assert wakeups[-1] == machine.deadline and shown == []
+
+    # Woken early (a spurious wakeup): nothing happens, the deadline stands.
+    deadline = machine.deadline
+    clock.now = deadline - 100.5
+    machine.wake()
+    assert wakeups[-1] == deadline and not completed
+    assert machine.remaining_seconds == 101
+
+    # Woken an hour late: completes as of the deadline.
+    clock.now = deadline + 3600
+    machine.wake()
+    session, wall_now, _ = completed[0]
+    assert abs((wall_now - session.end_time).total_seconds() - 3600) < 0.5
+    assert wakeups[-1] is None
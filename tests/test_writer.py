@@ -0,0 +1,100 @@
+import logging
+import threading
+
+import pytest
+
+from src.core import fileio
+from src.data.writer import PersistenceWriter
+
+
+@pytest.fixture
+def writer():
+    writer = PersistenceWriter()
+    yield writer
+    writer.close()
+
+
+def hold(writer: PersistenceWriter, tmp_path) -> threading.Event:
+    # Keeps the writer thread busy until the returned event is set, so
+    # writes submitted meanwhile stay queued.
+    release, started = threading.Event(), threading.Event()
+
+    def payload():
+        started.set()
+        release.wait()
+        return b""
+
+    writer.submit_replace(tmp_path / "blocker", payload)
+    started.wait()
+    return release
+
+
+def test_appends_coalesce_and_run_every_callback(writer, tmp_path):
+    path = tmp_path / "log"
+    release = hold(writer, tmp_path)
+    written = []
+    for i in range(3):
+        writer.submit_append(path, b"%d\n" % i, on_written=lambda i=i: written.append(i))
+    writer.submit_append(path, b"3\n")
+    assert writer.is_pending(path) and writer.writes_coalesced == 3
+    release.set()
+
+    assert writer.flush(path)
+    assert path.read_bytes() == b"0\n1\n2\n3\n"
+    assert written == [0, 1, 2]
+    # The blocker and one append.
+    assert writer.writes_completed == 2
+
+
+def test_replace_supersedes_pending_writes(writer, tmp_path):
+    path = tmp_path / "snapshot"
+    release = hold(writer, tmp_path)
+    encoded = []
+    writer.submit_append(path, b"lost")
+    for i in range(3):
+        writer.submit_replace(path, lambda i=i: encoded.append(i) or b"v%d" % i)
+    writer.submit_append(path, b"+tail")
+    release.set()
+
+    assert writer.flush()
+    assert path.read_bytes() == b"v2+tail"
+    # Only the surviving payload is encoded.
+    assert encoded == [2]
+
+
+def test_flush_waits_only_for_its_path(writer, tmp_path):
+    release = hold(writer, tmp_path)
+    writer.submit_append(tmp_path / "queued", b"x")
+    assert writer.flush(tmp_path / "other", timeout=0.01)
+    assert not writer.flush(tmp_path / "queued", timeout=0.01)
+    assert not writer.flush(timeout=0.01)
+    release.set()
+    assert writer.flush(tmp_path / "queued")
+    assert writer.queue_depth() == 0
+    assert (tmp_path / "queued").read_bytes() == b"x"
+
+
+def test_failed_replace_keeps_the_old_file_and_is_reported(writer, tmp_path, monkeypatch, caplog):
+    path = tmp_path / "config.json"
+    writer.submit_replace(path, b"old")
+    writer.flush(path)
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(fileio.os, "replace", failing_replace)
+    with caplog.at_level(logging.ERROR, logger="src.data.writer"):
+        writer.submit_replace(path, b"new")
+        with pytest.raises(OSError, match="disk full"):
+            writer.flush(path)
+    assert "Writing" in caplog.text and str(path) in caplog.text
+    assert path.read_bytes() == b"old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["config.json"]
+    assert isinstance(writer.last_error, OSError)
+
+    # Reported once; later writes go through again.
+    monkeypatch.undo()
+    assert writer.flush(path)
+    writer.submit_replace(path, b"new")
+    assert writer.flush()
+    assert path.read_bytes() == b"new"